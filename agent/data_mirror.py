@@ -0,0 +1,54 @@
+# Local data mirror module
+import bisect
+import threading
+
+
+class DataMirror:
+    """Client-side copy of the data table, kept current from /changes.
+
+    ``version`` is the server version the copy reflects; feeding it back as
+    ``since`` returns only what changed after it, so refreshing an
+    up-to-date mirror is one small request. Rows are held by id with a
+    sorted id list for paging in id order, as /list_data pages.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._rows = {}
+        self._ids = []
+        self._lock = threading.Lock()
+        # Held for a whole fetch-and-apply so two refreshes never interleave
+        self.sync_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def apply(self, feed):
+        """Apply one /changes response; returns the number of rows touched."""
+        with self._lock:
+            if feed.get("reset"):
+                self._rows.clear()
+                self._ids.clear()
+            for change in feed["changes"]:
+                data_id = change["id"]
+                if data_id not in self._rows:
+                    # New ids are almost always the largest, so this appends
+                    bisect.insort(self._ids, data_id)
+                self._rows[data_id] = change["content"]
+            for data_id in feed["deleted"]:
+                if self._rows.pop(data_id, None) is not None:
+                    del self._ids[bisect.bisect_left(self._ids, data_id)]
+            self.version = feed["version"]
+        return len(feed["changes"]) + len(feed["deleted"])
+
+    def get(self, data_id):
+        return self._rows.get(data_id)
+
+    def page(self, after_id=0, limit=None):
+        """Rows after ``after_id`` in id order, shaped like a /list_data response."""
+        with self._lock:
+            start = bisect.bisect_right(self._ids, after_id)
+            ids = self._ids[start:] if limit is None else self._ids[start:start + limit]
+            rows = [{"id": data_id, "content": self._rows[data_id]} for data_id in ids]
+        next_after_id = ids[-1] if limit is not None and len(ids) == limit else None
+        return {"data": rows, "next_after_id": next_after_id}
@@ -0,0 +1,209 @@
+# Guardrail module
+#
+# Policies are JSON files:
+#
+#   {
+#     "max_chars": 1200,
+#     "rules": [
+#       {"name": "violence", "words": ["kill", "violence"], "match": "prefix"},
+#       {"name": "ssn", "pattern": "\\d{3}-\\d{2}-\\d{4}", "max_length": 11,
+#        "message": "Response contains an SSN"}
+#     ]
+#   }
+#
+# "match" is "word" (whole words), "prefix" (words starting with the term,
+# the default: "kill" blocks "killing" but not "skill") or "substring".
+# Rules are case-insensitive unless "case_sensitive" is true. Word lists are
+# compiled into one prefix-factored regular expression, so a response is
+# scanned once however many terms there are.
+import json
+import os
+import re
+
+from server import metrics
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "guardrail_policy.json")
+MATCH_MODES = ("word", "prefix", "substring")
+DEFAULT_PATTERN_MAX_LENGTH = 200
+
+
+class GuardrailViolation(Exception):
+    def __init__(self, violation):
+        super().__init__(f"Guardrail: {violation['message']}")
+        self.violation = violation
+
+
+def _fold(text):
+    # lower() keeps offsets for every character but U+0130 (İ -> i + dot)
+    if "\u0130" in text:
+        text = text.replace("\u0130", "i")
+    return text.lower()
+
+
+def _trie_source(words):
+    """Regex matching any of ``words``, factored by common prefix.
+
+    Python's re tries alternatives one by one at each position; factored,
+    it follows a single branch, so many terms cost little more than one.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        source = branches[0] if len(branches) == 1 else "(?:{})".format("|".join(branches))
+        return f"(?:{source})?" if "" in node else source
+
+    return build(trie)
+
+
+def _rule_regex(rule):
+    """(regex source, longest possible match, folded) for one policy rule.
+
+    Folded rules are matched against lower-cased text, which is much faster
+    than re.IGNORECASE; case-sensitive word lists and regex patterns are
+    matched against the text as is.
+    """
+    case_sensitive = bool(rule.get("case_sensitive"))
+    if "pattern" in rule:
+        source, length = rule["pattern"], int(rule.get("max_length", DEFAULT_PATTERN_MAX_LENGTH))
+        re.compile(source)
+        return (source if case_sensitive else f"(?i:{source})"), length, False
+    words = {w if case_sensitive else w.lower() for w in rule.get("words", ()) if w}
+    if not words:
+        raise ValueError(f"Guardrail rule {rule.get('name')!r} needs 'words' or 'pattern'")
+    match = rule.get("match", "prefix")
+    if match not in MATCH_MODES:
+        raise ValueError(f"Guardrail rule {rule.get('name')!r}: match must be one of {MATCH_MODES}")
+    source = {"word": r"\b{}\b", "prefix": r"\b{}", "substring": "{}"}[match].format(_trie_source(words))
+    return source, max(len(w) for w in words), not case_sensitive
+
+
+class Guardrails:
+    """A compiled policy; ``scanner()`` checks one streamed response."""
+
+    def __init__(self, policy):
+        self.max_chars = policy.get("max_chars")
+        self.rules = []
+        alternatives = {True: [], False: []}
+        longest = 1
+        for index, rule in enumerate(policy.get("rules", ())):
+            source, length, folded = _rule_regex(rule)
+            name = rule.get("name") or f"rule-{index}"
+            self.rules.append((name, rule.get("message") or f"Response blocked due to inappropriate content ({name})"))
+            alternatives[folded].append(f"(?P<r{index}>{source})")
+            longest = max(longest, length)
+        # (regex, run on lower-cased text) pairs
+        self.regexes = [(re.compile("|".join(sources)), folded) for folded, sources in alternatives.items() if sources]
+        # Text kept between chunks: the longest match plus one character of
+        # left context for \b
+        self.carry = longest + 1
+
+    @classmethod
+    def from_files(cls, paths):
+        """Merge policy files: rules add up, the smallest max_chars wins."""
+        merged = {"max_chars": None, "rules": []}
+        for path in paths:
+            with open(path) as f:
+                policy = json.load(f)
+            merged["rules"].extend(policy.get("rules", ()))
+            if policy.get("max_chars") and (merged["max_chars"] is None or policy["max_chars"] < merged["max_chars"]):
+                merged["max_chars"] = policy["max_chars"]
+        return cls(merged)
+
+    def scanner(self):
+        return GuardrailScanner(self)
+
+    def check(self, text):
+        """Violation dict for a complete response, or None."""
+        scanner = self.scanner()
+        return scanner.feed(text) or scanner.finish()
+
+
+class GuardrailScanner:
+    """Incremental scan of one response, chunk by chunk.
+
+    Only the tail of the text seen so far is kept, so a term split across
+    chunks is still found and each character is scanned a bounded number of
+    times. A match that touches the end of the text so far is not reported
+    until the next chunk shows whether the word goes on ("kill" vs
+    "kills" under whole-word matching) or the response ends.
+    """
+
+    def __init__(self, guardrails):
+        self.guardrails = guardrails
+        self.violation = None
+        self._tail = ""
+        # Absolute offset of _tail[0] in the response
+        self._offset = 0
+        self._chars = 0
+
+    def feed(self, chunk):
+        """Violation dict once the response breaks the policy, else None."""
+        if self.violation is not None:
+            return self.violation
+        self._chars += len(chunk)
+        window = self._tail + chunk
+        violation = self._search(window, final=False)
+        max_chars = self.guardrails.max_chars
+        if violation is None and max_chars and self._chars > max_chars:
+            violation = {
+                "rule": "max_chars",
+                "message": f"Response too long (>{max_chars} characters).",
+                "match": None,
+                "offset": max_chars,
+            }
+        if violation is not None:
+            return self._violated(violation)
+        keep = self.guardrails.carry
+        if len(window) > keep:
+            self._offset += len(window) - keep
+            window = window[-keep:]
+        self._tail = window
+        return None
+
+    def finish(self):
+        """Check what is left once the stream has ended."""
+        if self.violation is None:
+            violation = self._search(self._tail, final=True)
+            if violation is not None:
+                self._violated(violation)
+        return self.violation
+
+    def _search(self, window, final):
+        first = None
+        for regex, folded in self.guardrails.regexes:
+            for match in regex.finditer(_fold(window) if folded else window):
+                if match.start() == 0 and self._offset:
+                    continue  # its left context was dropped; seen in an earlier window
+                if match.end() == len(window) and not final:
+                    continue  # may continue in the next chunk
+                if first is None or match.start() < first.start():
+                    first = match
+                break
+        if first is None:
+            return None
+        name, message = self.guardrails.rules[int(first.lastgroup[1:])]
+        return {
+            "rule": name,
+            "message": message,
+            "match": window[first.start():first.end()],
+            "offset": self._offset + first.start(),
+        }
+
+    def _violated(self, violation):
+        self.violation = violation
+        metrics.GUARDRAIL_VIOLATIONS.inc(violation["rule"])
+        return violation
+
+
+def load_guardrails(paths=None):
+    """Guardrails from ``paths`` (os.pathsep-separated), MCP_GUARDRAIL_POLICY or the bundled policy."""
+    paths = paths or os.environ.get("MCP_GUARDRAIL_POLICY") or DEFAULT_POLICY_PATH
+    return Guardrails.from_files([path for path in paths.split(os.pathsep) if path])
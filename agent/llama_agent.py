@@ -4,46 +4,394 @@
 
 import requests
 import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from agent.data_mirror import DataMirror
+from agent.guardrails import GuardrailViolation
+from agent.prompt_builder import DEFAULT_TOKEN_BUDGET, build_prompt, estimate_tokens
+from agent.response_cache import cache_key
+from agent.scheduler import PRIORITY_INTERACTIVE
+from server import metrics
+
+# Base URL of the Ollama server; point it at benchmarks.fake_ollama for
+# offline runs.
+OLLAMA_URL = os.environ.get("MCP_OLLAMA_URL", "http://localhost:11434").rstrip("/")
+
+# Stored rows retrieved per question in RAG mode.
+DEFAULT_RAG_K = 4
+
+# Items per /batch request; larger inputs are split automatically.
+BATCH_CHUNK_SIZE = 5000
+
+# Words per chunk when a cached answer is replayed to a streaming caller.
+REPLAY_CHUNK_WORDS = 4
+
+# /list_data pages list_page() keeps, with their ETags, for revalidation.
+PAGE_CACHE_SIZE = 32
+
+# Stores finished streamed answers off the caller's thread, one at a time so
+# transcripts keep their order.
+_PERSIST_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llama-agent-persist")
+
+
+def _record_generation(model, stats):
+    metrics.OLLAMA_GENERATIONS.inc(model, "ok")
+    if stats.get("ttft_s") is not None:
+        metrics.OLLAMA_TTFT.observe(model, value=stats["ttft_s"])
+    if stats.get("total_s") is not None:
+        metrics.OLLAMA_GENERATION.observe(model, value=stats["total_s"])
+    if stats.get("eval_count"):
+        metrics.OLLAMA_TOKENS.inc(model, amount=stats["eval_count"])
+    if stats.get("tokens_per_s"):
+        metrics.OLLAMA_TOKEN_RATE.observe(model, value=stats["tokens_per_s"])
+
+
+def _check_guardrails(scanner, stats, chunk=None):
+    """Feed ``chunk`` (or the end of the stream) to the scanner; raise on a violation."""
+    violation = scanner.feed(chunk) if chunk is not None else scanner.finish()
+    if violation is not None:
+        stats["guardrail"] = violation
+        raise GuardrailViolation(violation)
+
+
+def replay_chunks(text, words=REPLAY_CHUNK_WORDS):
+    """Split a finished answer into stream-sized pieces that join back exactly."""
+    pieces = re.findall(r"\s*\S+\s*", text) or [text]
+    for start in range(0, len(pieces), words):
+        yield "".join(pieces[start:start + words])
+
+
+def make_session(pool_size=10, retries=3, backoff_factor=0.3):
+    """requests.Session with keep-alive pooling and retry with backoff.
+
+    Connection failures are retried for every method; 502/503/504 responses
+    only for idempotent ones, so a POST is never sent twice.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 class LlamaAgent:
-    def __init__(self, server_url="http://127.0.0.1:8000", model="llama2"):
+    def __init__(
+        self,
+        server_url="http://127.0.0.1:8000",
+        model="llama2",
+        session=None,
+        timeout=10.0,
+        connect_timeout=3.05,
+        generate_timeout=300.0,
+        retries=3,
+        backoff_factor=0.3,
+        context_token_budget=DEFAULT_TOKEN_BUDGET,
+        cache=None,
+        ollama_url=OLLAMA_URL,
+        scheduler=None,
+        keep_alive=None,
+        guardrails=None,
+        mirror=None,
+    ):
         self.server_url = server_url
+        self.ollama_url = ollama_url.rstrip("/")
         self.model = model
+        self.last_generation_stats = {}
+        # One pooled session for both the MCP server and Ollama, so calls
+        # reuse keep-alive connections instead of opening a socket each time.
+        self.session = session or make_session(retries=retries, backoff_factor=backoff_factor)
+        self.timeout = (connect_timeout, timeout)
+        # Generation reads can legitimately stall for a long time between tokens.
+        self.generate_timeout = (connect_timeout, generate_timeout)
+        self.context_token_budget = context_token_budget
+        # Optional agent.response_cache.ResponseCache for finished generations.
+        self.cache = cache
+        # Optional agent.scheduler.GenerationScheduler, shared by every agent
+        # talking to the same Ollama.
+        self.scheduler = scheduler
+        # Sent with each generation; otherwise Ollama resets a model's
+        # residency to its own default (5 minutes) on every request.
+        self.keep_alive = keep_alive
+        # Optional agent.guardrails.Guardrails checked as answers stream in.
+        self.guardrails = guardrails
+        # Local copy of the data table for sync_data(); share one between
+        # agents talking to the same server.
+        self.mirror = mirror if mirror is not None else DataMirror()
+        # (after_id, limit) -> (ETag, page) for list_page(), oldest first
+        self._pages = OrderedDict()
+        self._pages_lock = threading.Lock()
 
-    def ollama_generate(self, prompt, model=None):
-        """Call local Ollama API for text generation (handles streaming JSON lines)."""
-        if model is None:
-            model = self.model
+    def _ollama_stream(self, prompt, model, stats, options=None, cancel=None):
+        """Yield response text pieces from Ollama's streaming NDJSON API.
+
+        ``stats`` is filled in as the stream progresses: time to first token,
+        total time, chunk count and, from Ollama's final line, eval_count and
+        tokens per second. Cancelling the optional CancelToken closes the
+        response, which makes Ollama stop generating.
+        """
+        started = time.perf_counter()
+        stats.update({"model": model, "ttft_s": None, "total_s": None, "chunks": 0})
+        payload = {"model": model, "prompt": prompt}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if options:
+            payload["options"] = options
         try:
-            resp = requests.post(
-                "http://localhost:11434/api/generate",
-                json={"model": model, "prompt": prompt},
-                stream=True
-            )
-            resp.raise_for_status()
-            responses = []
-            for line in resp.iter_lines():
-                if line:
-                    print(f"Ollama raw line: {line}")  # Debug print
+            with self.session.post(
+                f"{self.ollama_url}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=self.generate_timeout,
+            ) as resp:
+                resp.raise_for_status()
+                if cancel is not None:
+                    cancel.on_cancel(resp.close)
+                for line in resp.iter_lines():
+                    if cancel is not None and cancel.cancelled:
+                        break
+                    if not line:
+                        continue
                     try:
                         data = json.loads(line)
-                        # Only append non-empty responses
-                        if "response" in data and data["response"]:
-                            responses.append(data["response"])
-                    except Exception as e:
+                    except ValueError as e:
                         print(f"ollama_generate parse error: {e}\nLine: {line}")
-            answer = "".join(responses).strip()
+                        continue
+                    if data.get("error"):
+                        raise RuntimeError(data["error"])
+                    chunk = data.get("response")
+                    if chunk:
+                        if stats["ttft_s"] is None:
+                            stats["ttft_s"] = time.perf_counter() - started
+                        stats["chunks"] += 1
+                        yield chunk
+                    if data.get("done"):
+                        if data.get("eval_count") and data.get("eval_duration"):
+                            stats["eval_count"] = data["eval_count"]
+                            stats["tokens_per_s"] = data["eval_count"] / (data["eval_duration"] / 1e9)
+                        break
+        finally:
+            # Also when the caller closes the stream early or it fails
+            stats["total_s"] = time.perf_counter() - started
+
+    def _generate_stream(
+        self, prompt, model, stats, options=None, use_cache=True, priority=PRIORITY_INTERACTIVE, timeout=None, cancel=None
+    ):
+        """_ollama_stream behind the response cache, the scheduler and the guardrails.
+
+        A hit is replayed through the same chunked interface, so callers
+        cannot tell it apart except for ``stats["cached"]``. Only complete
+        answers are cached. ``priority``, ``timeout`` and ``cancel`` apply
+        when the agent has a scheduler. A guardrail violation stops the
+        upstream stream before the offending chunk is yielded and raises
+        GuardrailViolation; the violation is also in ``stats["guardrail"]``.
+        """
+        scanner = self.guardrails.scanner() if self.guardrails is not None else None
+        stats["guardrail"] = None
+        cache = self.cache
+        key = cache_key(model, prompt, options) if cache is not None else None
+        # A bypassed lookup still refreshes the cache with the new answer.
+        cached = cache.get(key) if cache is not None and use_cache else None
+        stats["cached"] = cached is not None
+        if cached is not None:
+            started = time.perf_counter()
+            stats.update({"model": model, "ttft_s": None, "total_s": None, "chunks": 0})
+            try:
+                for chunk in replay_chunks(cached):
+                    if scanner is not None:
+                        _check_guardrails(scanner, stats, chunk)
+                    if stats["ttft_s"] is None:
+                        stats["ttft_s"] = time.perf_counter() - started
+                    stats["chunks"] += 1
+                    yield chunk
+                if scanner is not None:
+                    _check_guardrails(scanner, stats)
+            finally:
+                stats["total_s"] = time.perf_counter() - started
+            metrics.OLLAMA_GENERATIONS.inc(model, "cached")
+            return
+        if self.scheduler is not None:
+            source = self.scheduler.stream(
+                (self.ollama_url, key or cache_key(model, prompt, options)),
+                model,
+                lambda flight_stats, flight_cancel: self._ollama_stream(
+                    prompt, model, flight_stats, options, flight_cancel
+                ),
+                priority,
+                timeout,
+                cancel,
+                stats,
+            )
+        else:
+            source = self._ollama_stream(prompt, model, stats, options, cancel)
+        chunks = []
+        try:
+            for chunk in source:
+                if scanner is not None:
+                    try:
+                        _check_guardrails(scanner, stats, chunk)
+                    except GuardrailViolation:
+                        # Closing the stream makes Ollama stop generating
+                        source.close()
+                        raise
+                chunks.append(chunk)
+                yield chunk
+            if scanner is not None:
+                _check_guardrails(scanner, stats)
+        except GuardrailViolation:
+            metrics.OLLAMA_GENERATIONS.inc(model, "blocked")
+            raise
+        except Exception:
+            metrics.OLLAMA_GENERATIONS.inc(model, "error")
+            raise
+        _record_generation(model, stats)
+        answer = "".join(chunks).strip()
+        if cache is not None and answer:
+            cache.put(key, model, answer)
+
+    def ollama_generate(
+        self,
+        prompt,
+        model=None,
+        options=None,
+        use_cache=True,
+        stats=None,
+        priority=PRIORITY_INTERACTIVE,
+        timeout=None,
+        cancel=None,
+    ):
+        """Call local Ollama API for text generation (handles streaming JSON lines).
+
+        ``options`` are passed through to Ollama (temperature, etc.) and are
+        part of the cache key; ``use_cache=False`` skips the cache lookup
+        and stores the fresh answer in its place. ``priority``, ``timeout``
+        (seconds, including time queued) and ``cancel`` (a CancelToken) are
+        for the scheduler.
+        """
+        if model is None:
+            model = self.model
+        if stats is None:
+            stats = {}
+        try:
+            answer = "".join(
+                self._generate_stream(prompt, model, stats, options, use_cache, priority, timeout, cancel)
+            ).strip()
+            self.last_generation_stats = stats
             if answer:
                 return answer
             else:
                 return "[Ollama returned no response for this prompt]"
+        except GuardrailViolation as e:
+            self.last_generation_stats = stats
+            return {"error": str(e), "guardrail": e.violation}
         except Exception as e:
             print(f"ollama_generate error: {e}")
             return {"error": str(e)}
 
+    def retrieve(self, query, k=DEFAULT_RAG_K):
+        """Top-k stored rows for ``query``: semantic search, else full-text search."""
+        try:
+            result = self.semantic_search(query, k=k)
+            if not isinstance(result, dict) or not result.get("data"):
+                result = self.search_data(query, limit=k)
+        except Exception as e:
+            print(f"retrieve error: {e}")
+            return []
+        if isinstance(result, dict) and "data" in result:
+            return result["data"]
+        return []
+
+    def prepare_prompt(self, query, conversation=None, rag=False, k=DEFAULT_RAG_K, token_budget=None):
+        """Build the prompt for ``query``; returns (prompt, info).
+
+        With ``rag`` the top-k stored rows are retrieved as context. Prior
+        ``conversation`` turns, as (user, ai) pairs, are kept newest first
+        within the token budget and older ones are summarized, so prompt size
+        stays bounded however long the conversation gets. ``info`` reports
+        the retrieval time, source ids and estimated prompt tokens.
+        """
+        passages, sources, retrieval_s = [], [], 0.0
+        if rag:
+            started = time.perf_counter()
+            rows = self.retrieve(query, k)
+            retrieval_s = time.perf_counter() - started
+            passages = [row["content"] for row in rows]
+            sources = [row["id"] for row in rows]
+        if passages or conversation:
+            prompt, info = build_prompt(query, conversation or (), passages, token_budget or self.context_token_budget)
+        else:
+            prompt, info = query, {"prompt_tokens": estimate_tokens(query)}
+        info.update(retrieval_s=retrieval_s, sources=sources)
+        return prompt, info
+
+    def stream_query(
+        self,
+        query,
+        model=None,
+        stats=None,
+        conversation=None,
+        rag=False,
+        k=DEFAULT_RAG_K,
+        options=None,
+        use_cache=True,
+        priority=PRIORITY_INTERACTIVE,
+        timeout=None,
+        cancel=None,
+    ):
+        """Yield the answer to ``query`` chunk by chunk as Ollama produces it.
+
+        Timings for the run go into ``stats`` (pass your own dict when the
+        agent is shared between users) and ``last_generation_stats``. Once
+        the stream completes, the Q/A pair is stored in the background so the
+        caller is not held up by the write. If generation fails the stream
+        ends early and ``stats["error"]`` holds the reason. ``conversation``,
+        ``rag`` and ``k`` are as for prepare_prompt(); the other options as
+        for ollama_generate().
+        """
+        if model is None:
+            model = self.model
+        if stats is None:
+            stats = {}
+        self.last_generation_stats = stats
+        prompt, info = self.prepare_prompt(query, conversation, rag, k)
+        stats["error"] = None
+        chunks = []
+        try:
+            for chunk in self._generate_stream(prompt, model, stats, options, use_cache, priority, timeout, cancel):
+                chunks.append(chunk)
+                yield chunk
+        except GuardrailViolation:
+            # Blocked answers are not stored; stats["guardrail"] says why
+            return
+        except Exception as e:
+            # Reported through stats so the error never reads as part of the answer
+            print(f"stream_query error: {e}")
+            stats["error"] = str(e)
+            return
+        finally:
+            stats.update(info)
+        answer = "".join(chunks).strip()
+        if answer:
+            _PERSIST_POOL.submit(self.add_data, f"Q: {query}\nA: {answer}")
+
     def update_data(self, data_id, content):
-        resp = requests.put(f"{self.server_url}/update_data", json={"id": data_id, "content": content})
+        resp = self.session.put(f"{self.server_url}/update_data", json={"id": data_id, "content": content}, timeout=self.timeout)
         try:
             return resp.json()
         except Exception as e:
@@ -51,48 +399,322 @@ class LlamaAgent:
             return {"error": str(e), "status": resp.status_code, "text": resp.text}
 
     def delete_data(self, data_id):
-        resp = requests.delete(f"{self.server_url}/delete_data/{data_id}")
+        resp = self.session.delete(f"{self.server_url}/delete_data/{data_id}", timeout=self.timeout)
         try:
             return resp.json()
         except Exception as e:
             print(f"delete_data error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
             return {"error": str(e), "status": resp.status_code, "text": resp.text}
 
-    def search_data(self, query):
-        resp = requests.get(f"{self.server_url}/search_data", params={"q": query})
+    def search_data(self, query, limit=None):
+        params = {"q": query}
+        if limit is not None:
+            params["limit"] = limit
+        resp = self.session.get(f"{self.server_url}/search_data", params=params, timeout=self.timeout)
         try:
             return resp.json()
         except Exception as e:
             print(f"search_data error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
             return {"error": str(e), "status": resp.status_code, "text": resp.text}
 
-    def list_data(self):
-        resp = requests.get(f"{self.server_url}/list_data")
+    def semantic_search(self, query, k=None):
+        params = {"q": query}
+        if k is not None:
+            params["k"] = k
+        resp = self.session.get(f"{self.server_url}/semantic_search", params=params, timeout=self.timeout)
+        try:
+            return resp.json()
+        except Exception as e:
+            print(f"semantic_search error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
+            return {"error": str(e), "status": resp.status_code, "text": resp.text}
+
+    def list_data(self, after_id=None, limit=None):
+        """Fetch one page; pass the returned ``next_after_id`` to get the next."""
+        params = {}
+        if after_id is not None:
+            params["after_id"] = after_id
+        if limit is not None:
+            params["limit"] = limit
+        resp = self.session.get(f"{self.server_url}/list_data", params=params, timeout=self.timeout)
         try:
             return resp.json()
         except Exception as e:
             print(f"list_data error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
             return {"error": str(e), "status": resp.status_code, "text": resp.text}
 
+    def sync_data(self, limit=None):
+        """Bring ``self.mirror`` up to date from /changes.
+
+        Returns {"version", "rows", "changed"}; when nothing changed this is
+        a single request with an empty answer.
+        """
+        params = {}
+        if limit is not None:
+            params["limit"] = limit
+        changed = 0
+        with self.mirror.sync_lock:
+            try:
+                while True:
+                    params["since"] = self.mirror.version
+                    resp = self.session.get(f"{self.server_url}/changes", params=params, timeout=self.timeout)
+                    resp.raise_for_status()
+                    feed = resp.json()
+                    changed += self.mirror.apply(feed)
+                    if not feed["more"] and not feed["reset"]:
+                        break
+            except Exception as e:
+                print(f"sync_data error: {e}")
+                return {"error": str(e)}
+        return {"version": self.mirror.version, "rows": len(self.mirror), "changed": changed}
+
+    def list_page(self, after_id=0, limit=None):
+        """list_data() that revalidates pages it has fetched before.
+
+        The last PAGE_CACHE_SIZE pages are kept with their ETag. Asking for
+        one again sends If-None-Match, so while the table is unchanged a
+        rerun costs a bodiless 304; only pages actually viewed are held.
+        """
+        key = (after_id or 0, limit)
+        with self._pages_lock:
+            cached = self._pages.get(key)
+        params = {"after_id": key[0]}
+        if limit is not None:
+            params["limit"] = limit
+        headers = {"If-None-Match": cached[0]} if cached is not None else {}
+        try:
+            resp = self.session.get(f"{self.server_url}/list_data", params=params, headers=headers, timeout=self.timeout)
+            if resp.status_code == 304 and cached is not None:
+                with self._pages_lock:
+                    if key in self._pages:
+                        self._pages.move_to_end(key)
+                return cached[1]
+            resp.raise_for_status()
+            page = resp.json()
+        except Exception as e:
+            print(f"list_page error: {e}")
+            return {"error": str(e)}
+        etag = resp.headers.get("ETag")
+        if etag:
+            with self._pages_lock:
+                self._pages[key] = (etag, page)
+                self._pages.move_to_end(key)
+                while len(self._pages) > PAGE_CACHE_SIZE:
+                    self._pages.popitem(last=False)
+        return page
+
+    def iter_data(self, after_id=0, chunk_size=None):
+        """Yield every stored row as a dict, streamed from /list_data/stream."""
+        params = {"after_id": after_id}
+        if chunk_size is not None:
+            params["chunk_size"] = chunk_size
+        with self.session.get(f"{self.server_url}/list_data/stream", params=params, stream=True, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def export_data(self, dest, fmt="csv", compression="none", min_id=None, max_id=None, query=None):
+        """Stream an /export download into the binary file object ``dest``."""
+        params = {"format": fmt, "compression": compression}
+        for name, value in (("min_id", min_id), ("max_id", max_id), ("q", query)):
+            if value:
+                params[name] = value
+        written = 0
+        with self.session.get(f"{self.server_url}/export", params=params, stream=True, timeout=self.timeout) as resp:
+            if resp.status_code != 200:
+                try:
+                    return {"error": resp.json().get("detail"), "status": resp.status_code}
+                except Exception:
+                    return {"error": resp.text, "status": resp.status_code}
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                dest.write(chunk)
+                written += len(chunk)
+            match = re.search(r'filename="([^"]+)"', resp.headers.get("Content-Disposition", ""))
+        return {"status": "success", "bytes": written, "filename": match.group(1) if match else f"data.{fmt}"}
+
+    def import_file(self, src, fmt=None, column="content", resume=True, progress=None):
+        """Upload a CSV/JSONL/text file to /import as a raw stream.
+
+        ``src`` is a local path or a binary file object with a ``name`` (such
+        as a Streamlit upload). An interrupted upload of the same file resumes
+        from the server's checkpoint; ``progress(bytes_done, bytes_total)``
+        runs after each block is sent.
+        """
+        # Only the Import page needs the importer (and csv/argparse)
+        from db.importer import READ_BLOCK_SIZE, detect_format, source_key
+
+        own_file = isinstance(src, str)
+        f = open(src, "rb") if own_file else src
+        try:
+            name = getattr(f, "name", "upload")
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            source = source_key(os.path.basename(name), size)
+            url = f"{self.server_url}/import/checkpoint"
+            if resume:
+                offset = self.session.get(url, params={"source": source}, timeout=self.timeout).json()["offset"]
+            else:
+                self.session.delete(url, params={"source": source}, timeout=self.timeout)
+                offset = 0
+            f.seek(offset)
+
+            def body():
+                done = offset
+                while True:
+                    block = f.read(READ_BLOCK_SIZE)
+                    if not block:
+                        return
+                    yield block
+                    done += len(block)
+                    if progress:
+                        progress(done, size)
+
+            params = {"format": fmt or detect_format(name), "source": source, "offset": offset, "column": column}
+            resp = self.session.post(f"{self.server_url}/import", params=params, data=body(), timeout=self.generate_timeout)
+        except requests.RequestException as e:
+            # The server keeps its checkpoint; calling again resumes
+            return {"error": str(e)}
+        finally:
+            if own_file:
+                f.close()
+        try:
+            return resp.json()
+        except Exception as e:
+            print(f"import_file error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
+            return {"error": str(e), "status": resp.status_code, "text": resp.text}
+
+    def upload_document(self, src, filename=None):
+        """Send a text/Markdown/PDF/DOCX file (path or binary file object)
+        to be chunked into the knowledge store."""
+        from db.importer import READ_BLOCK_SIZE
+
+        own_file = isinstance(src, str)
+        f = open(src, "rb") if own_file else src
+        try:
+            filename = filename or os.path.basename(getattr(f, "name", "upload.txt"))
+            resp = self.session.post(
+                f"{self.server_url}/documents", params={"filename": filename},
+                data=iter(lambda: f.read(READ_BLOCK_SIZE), b""), timeout=self.generate_timeout,
+            )
+        finally:
+            if own_file:
+                f.close()
+        try:
+            return resp.json()
+        except Exception as e:
+            print(f"upload_document error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
+            return {"error": str(e), "status": resp.status_code, "text": resp.text}
+
+    def list_documents(self, after_id=None, limit=None):
+        params = {}
+        if after_id is not None:
+            params["after_id"] = after_id
+        if limit is not None:
+            params["limit"] = limit
+        resp = self.session.get(f"{self.server_url}/documents", params=params, timeout=self.timeout)
+        try:
+            return resp.json()
+        except Exception as e:
+            print(f"list_documents error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
+            return {"error": str(e), "status": resp.status_code, "text": resp.text}
+
+    def read_document(self, document_id):
+        resp = self.session.get(f"{self.server_url}/documents/{document_id}", timeout=self.timeout)
+        try:
+            return resp.json()
+        except Exception as e:
+            print(f"read_document error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
+            return {"error": str(e), "status": resp.status_code, "text": resp.text}
+
+    def delete_document(self, document_id):
+        resp = self.session.delete(f"{self.server_url}/documents/{document_id}", timeout=self.timeout)
+        try:
+            return resp.json()
+        except Exception as e:
+            print(f"delete_document error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
+            return {"error": str(e), "status": resp.status_code, "text": resp.text}
+
     def add_data(self, content):
-        resp = requests.post(f"{self.server_url}/add_data", json={"content": content})
+        resp = self.session.post(f"{self.server_url}/add_data", json={"content": content}, timeout=self.timeout)
         try:
             return resp.json()
         except Exception as e:
             print(f"add_data error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
             return {"error": str(e), "status": resp.status_code, "text": resp.text}
 
+    def _batch(self, endpoint, items, chunk_size):
+        """POST items to /batch/<endpoint> in chunks and merge the results."""
+        items = iter(items)
+        results, offset = [], 0
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                break
+            resp = self.session.post(f"{self.server_url}/batch/{endpoint}", json={"items": chunk}, timeout=self.timeout)
+            try:
+                body = resp.json()
+                chunk_results = body["results"]
+            except Exception as e:
+                print(f"{endpoint} batch error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
+                chunk_results = [
+                    {"index": i, "status": "error", "error": str(e), "http_status": resp.status_code}
+                    for i in range(len(chunk))
+                ]
+            for result in chunk_results:
+                result["index"] += offset
+                results.append(result)
+            offset += len(chunk)
+        failed = sum(1 for result in results if result["status"] == "error")
+        return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+    def add_many(self, contents, chunk_size=BATCH_CHUNK_SIZE):
+        return self._batch("add_data", ({"content": c} for c in contents), chunk_size)
+
+    def update_many(self, updates, chunk_size=BATCH_CHUNK_SIZE):
+        """``updates`` is an iterable of (id, content) pairs."""
+        return self._batch("update_data", ({"id": i, "content": c} for i, c in updates), chunk_size)
+
+    def delete_many(self, data_ids, chunk_size=BATCH_CHUNK_SIZE):
+        return self._batch("delete_data", ({"id": i} for i in data_ids), chunk_size)
+
     def read_data(self, data_id):
-        resp = requests.get(f"{self.server_url}/read_data/{data_id}")
+        resp = self.session.get(f"{self.server_url}/read_data/{data_id}", timeout=self.timeout)
         try:
             return resp.json()
         except Exception as e:
             print(f"read_data error: {e}\nStatus: {resp.status_code}\nText: {resp.text}")
             return {"error": str(e), "status": resp.status_code, "text": resp.text}
 
-    def handle_query(self, query):
+    def close(self):
+        self.session.close()
+
+    def handle_query(
+        self,
+        query,
+        conversation=None,
+        rag=False,
+        k=DEFAULT_RAG_K,
+        options=None,
+        use_cache=True,
+        priority=PRIORITY_INTERACTIVE,
+        timeout=None,
+    ):
+        prompt, info = self.prepare_prompt(query, conversation, rag, k)
         # AI-powered response using Ollama
-        ai_response = self.ollama_generate(query)
-        # Store the query and AI response
-        self.add_data(f"Q: {query}\nA: {ai_response}")
-        return {"ai_response": ai_response}
+        started = time.perf_counter()
+        stats = {}
+        ai_response = self.ollama_generate(
+            prompt, options=options, use_cache=use_cache, stats=stats, priority=priority, timeout=timeout
+        )
+        generation_s = time.perf_counter() - started
+        # Store the query and AI response, unless a guardrail blocked it
+        if stats.get("guardrail") is None:
+            self.add_data(f"Q: {query}\nA: {ai_response}")
+        return {
+            "ai_response": ai_response,
+            "timings": {"retrieval_s": info["retrieval_s"], "generation_s": generation_s},
+            "sources": info["sources"],
+            "prompt_tokens": info["prompt_tokens"],
+            "cached": stats.get("cached", False),
+            "guardrail": stats.get("guardrail"),
+        }
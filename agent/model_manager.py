@@ -0,0 +1,236 @@
+# Model residency module
+import math
+import os
+import re
+import threading
+import time
+
+import requests
+
+from agent.llama_agent import OLLAMA_URL
+
+# How long Ollama keeps a model loaded after each request (Ollama syntax).
+DEFAULT_KEEP_ALIVE = os.environ.get("MCP_MODEL_KEEP_ALIVE", "30m")
+# Models unused for this long are unloaded; 0 leaves it to keep_alive.
+DEFAULT_IDLE_UNLOAD_S = float(os.environ.get("MCP_MODEL_IDLE_UNLOAD_S", 1800))
+# Total size of loaded models allowed before the least recently used are
+# unloaded; 0 means no budget.
+DEFAULT_MEMORY_BUDGET = int(float(os.environ.get("MCP_MODEL_MEMORY_GB", 0)) * 1024 ** 3)
+MAINTAIN_INTERVAL_S = 60.0
+TAGS_TTL_S = 30.0
+# After a failed load, use() waits this long before trying again.
+LOAD_RETRY_S = 30.0
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds(keep_alive):
+    """Ollama keep_alive ("30m", "1h30m", 300, "-1") in seconds; None means forever."""
+    try:
+        seconds = float(keep_alive)
+    except ValueError:
+        parts = re.findall(r"(-?[\d.]+)(ms|s|m|h)", keep_alive)
+        if not parts:
+            raise ValueError(f"Unrecognised keep_alive: {keep_alive!r}")
+        seconds = sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+    return None if seconds < 0 else seconds
+
+
+class ModelManager:
+    """Keeps the models people use loaded in Ollama, within a memory budget.
+
+    ``use(model)`` marks a model as in use and loads it in the background if
+    Ollama does not have it resident, so the first question after switching
+    models does not pay the cold load. A maintenance thread re-sends
+    keep-alives for recently used models and unloads idle ones, least
+    recently used first, when loaded models exceed the budget. Models it has
+    never seen used are left alone, though they count against the budget.
+    """
+
+    def __init__(
+        self,
+        ollama_url=OLLAMA_URL,
+        keep_alive=DEFAULT_KEEP_ALIVE,
+        idle_unload_s=DEFAULT_IDLE_UNLOAD_S,
+        memory_budget=DEFAULT_MEMORY_BUDGET,
+        interval=MAINTAIN_INTERVAL_S,
+        session=None,
+        timeout=(3.05, 300.0),
+    ):
+        self.ollama_url = ollama_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.keep_alive_s = keep_alive_seconds(keep_alive)
+        self.idle_unload_s = idle_unload_s
+        self.memory_budget = memory_budget
+        self.interval = interval
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._last_used = {}
+        # model -> {"state": loading|loaded|unloaded|error, "load_s", "error", "since"}
+        self._states = {}
+        self._tags = (0.0, [])
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, preload=None):
+        """Start maintenance and, if given, load ``preload`` in the background."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._maintain_loop, name="model-manager", daemon=True)
+            self._thread.start()
+        if preload:
+            self.use(preload)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def list_models(self):
+        """Local models from Ollama's tags API as (name, size) pairs, cached briefly."""
+        fetched_at, models = self._tags
+        if time.monotonic() - fetched_at < TAGS_TTL_S:
+            return models
+        try:
+            resp = self.session.get(f"{self.ollama_url}/api/tags", timeout=self.timeout)
+            resp.raise_for_status()
+            models = sorted((m["name"], m.get("size", 0)) for m in resp.json().get("models", []))
+        except Exception as e:
+            print(f"list_models error: {e}")
+        self._tags = (time.monotonic(), models)
+        return models
+
+    def resident(self):
+        """{name: {"size", "size_vram", "expires_at"}} for models Ollama has loaded."""
+        resp = self.session.get(f"{self.ollama_url}/api/ps", timeout=self.timeout)
+        resp.raise_for_status()
+        return {
+            m["name"]: {"size": m.get("size", 0), "size_vram": m.get("size_vram", 0), "expires_at": m.get("expires_at")}
+            for m in resp.json().get("models", [])
+        }
+
+    def use(self, model):
+        """Mark ``model`` as used now; start loading it if it is not loaded."""
+        with self._lock:
+            now = time.time()
+            self._last_used[model] = now
+            details = self._states.get(model, {})
+            if details.get("state") in ("loading", "loaded"):
+                return
+            # Don't hammer an Ollama that is down or lacks the model
+            if details.get("state") == "error" and now - details["since"] < LOAD_RETRY_S:
+                return
+            self._states[model] = {"state": "loading", "since": now}
+        threading.Thread(target=self.load, args=(model,), name=f"model-load-{model}", daemon=True).start()
+
+    def load(self, model):
+        """Load ``model`` (or refresh its keep-alive); blocks until Ollama has it."""
+        started = time.perf_counter()
+        try:
+            self._send(model, self.keep_alive)
+        except Exception as e:
+            print(f"model load error ({model}): {e}")
+            self._set_state(model, "error", error=str(e))
+            return False
+        self._set_state(model, "loaded", load_s=round(time.perf_counter() - started, 3))
+        return True
+
+    def unload(self, model):
+        try:
+            self._send(model, 0)
+        except Exception as e:
+            print(f"model unload error ({model}): {e}")
+            return False
+        self._set_state(model, "unloaded")
+        return True
+
+    def state(self, model):
+        """Last known state of ``model`` without asking Ollama."""
+        with self._lock:
+            return self._states.get(model, {}).get("state", "unloaded")
+
+    def _send(self, model, keep_alive):
+        # An empty prompt makes Ollama load (or, with keep_alive 0, unload) the model
+        resp = self.session.post(
+            f"{self.ollama_url}/api/generate",
+            json={"model": model, "keep_alive": keep_alive, "stream": False},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+
+    def _set_state(self, model, state, **details):
+        with self._lock:
+            self._states[model] = {"state": state, "since": time.time(), **details}
+
+    def _maintain_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"model maintenance error: {e}")
+
+    def maintain(self):
+        """One keep-alive / eviction pass; returns the models unloaded."""
+        loaded = self.resident()
+        now = time.time()
+        with self._lock:
+            last_used = dict(self._last_used)
+            for model, details in self._states.items():
+                # Ollama unloaded it on its own (keep_alive ran out, restart)
+                if details["state"] == "loaded" and model not in loaded:
+                    self._states[model] = {"state": "unloaded", "since": now}
+        by_recency = sorted(loaded, key=lambda name: last_used.get(name, 0), reverse=True)
+        evict = []
+        if self.idle_unload_s:
+            # Only models this manager has seen used; others belong to someone else
+            evict = [name for name in by_recency if name in last_used and now - last_used[name] > self.idle_unload_s]
+        if self.memory_budget:
+            # Everything resident counts against the budget, but only our own
+            # models are unloaded to make room
+            total = sum(loaded[name]["size"] for name in by_recency if name not in evict)
+            ours = [name for name in by_recency if name in last_used and name not in evict]
+            # Never evict the most recently used model to make room
+            while total > self.memory_budget and len(ours) > 1:
+                name = ours.pop()
+                evict.append(name)
+                total -= loaded[name]["size"]
+        for name in evict:
+            self.unload(name)
+        for name in by_recency:
+            # Keep each model loaded until keep_alive after its last use, then
+            # let Ollama's own timer expire it
+            if name in evict or name not in last_used or self.keep_alive_s is None:
+                continue
+            remaining = self.keep_alive_s - (now - last_used[name])
+            if remaining > 0:
+                self._send(name, math.ceil(remaining))
+        return evict
+
+    def status(self):
+        """One row per known model for the UI: residency, state and last use."""
+        try:
+            loaded = self.resident()
+        except Exception as e:
+            print(f"model status error: {e}")
+            loaded = {}
+        now = time.time()
+        with self._lock:
+            states = {model: dict(details) for model, details in self._states.items()}
+            last_used = dict(self._last_used)
+        rows = []
+        for name, size in self.list_models() or [(name, 0) for name in sorted(set(states) | set(loaded))]:
+            details = states.get(name, {})
+            state = "loaded" if name in loaded else details.get("state", "unloaded")
+            if state == "loaded" and name not in loaded:
+                state = "unloaded"
+            rows.append({
+                "model": name,
+                "state": state,
+                "memory_gb": round(loaded[name]["size"] / 1024 ** 3, 2) if name in loaded else None,
+                "disk_gb": round(size / 1024 ** 3, 2) if size else None,
+                "expires_at": loaded.get(name, {}).get("expires_at"),
+                "last_used_s_ago": round(now - last_used[name]) if name in last_used else None,
+                "load_s": details.get("load_s"),
+                "error": details.get("error"),
+            })
+        return rows
@@ -0,0 +1,105 @@
+# Prompt construction module
+import math
+import re
+
+# Rough English average; good enough to keep prompts under a budget without
+# shipping a tokenizer for every local model.
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 2048
+# Share of the budget retrieved passages may use; history gets what is left.
+CONTEXT_SHARE = 0.5
+SUMMARY_TOKENS = 128
+
+CONTEXT_HEADER = "Use the following context from the knowledge store if it is relevant to the question."
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, tokens):
+    """Cut ``text`` to roughly ``tokens`` tokens, at a word boundary if possible."""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + " ..."
+
+
+def _first_sentence(text):
+    return re.split(r"(?<=[.!?])\s|\n", text.strip(), maxsplit=1)[0]
+
+
+def summarize_turns(turns, tokens=SUMMARY_TOKENS):
+    """Compact one-line summary of (user, ai) turns that no longer fit verbatim.
+
+    Keeps the first sentence of each question, newest last, so the model still
+    knows what was discussed.
+    """
+    topics = [_first_sentence(user) for user, _ in turns if user.strip()]
+    summary = "; ".join(topics)
+    # Drop the oldest topics first when over budget.
+    while topics and estimate_tokens(summary) > tokens:
+        topics.pop(0)
+        summary = "; ".join(topics)
+    return truncate_to_tokens(summary, tokens) if summary else ""
+
+
+def build_prompt(query, conversation=(), passages=(), token_budget=DEFAULT_TOKEN_BUDGET):
+    """Assemble a prompt that stays within ``token_budget`` estimated tokens.
+
+    The question is always included. Retrieved ``passages`` (strings, best
+    first) get up to CONTEXT_SHARE of the budget. The newest conversation
+    turns fill the remainder verbatim, and older turns are folded into a
+    short summary. Returns (prompt, info) where info reports what was kept.
+    """
+    question = f"User: {truncate_to_tokens(query, token_budget // 2)}\nAI:"
+    remaining = token_budget - estimate_tokens(question)
+
+    context_lines = []
+    if passages:
+        context_budget = min(remaining, int(token_budget * CONTEXT_SHARE))
+        per_passage = max(32, context_budget // len(passages))
+        used = estimate_tokens(CONTEXT_HEADER)
+        for number, passage in enumerate(passages, start=1):
+            line = f"[{number}] {truncate_to_tokens(passage, per_passage)}"
+            cost = estimate_tokens(line)
+            if used + cost > context_budget:
+                break
+            context_lines.append(line)
+            used += cost
+        if context_lines:
+            remaining -= used
+
+    history_lines = []
+    kept = 0
+    turns = list(conversation)
+    reserve = SUMMARY_TOKENS if turns else 0
+    for user, ai in reversed(turns):
+        turn = f"User: {user}\nAI: {ai}"
+        cost = estimate_tokens(turn)
+        if cost > remaining - reserve:
+            break
+        history_lines.insert(0, turn)
+        remaining -= cost
+        kept += 1
+    summary = summarize_turns(turns[:len(turns) - kept], min(SUMMARY_TOKENS, max(0, remaining)))
+
+    parts = []
+    if context_lines:
+        parts.append(CONTEXT_HEADER + "\n" + "\n".join(context_lines))
+    if summary:
+        parts.append(f"Earlier conversation (summary): {summary}")
+    parts.extend(history_lines)
+    parts.append(question)
+    prompt = "\n\n".join(parts)
+    info = {
+        "prompt_tokens": estimate_tokens(prompt),
+        "passages_used": len(context_lines),
+        "turns_kept": kept,
+        "turns_summarized": len(turns) - kept,
+    }
+    return prompt, info
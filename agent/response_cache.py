@@ -0,0 +1,154 @@
+# LLM response cache module
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from db.sqlite_db import connect
+
+DEFAULT_CACHE_PATH = "llm_cache.db"
+
+CREATE_RESPONSES_TABLE = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+CREATE_LAST_ACCESS_INDEX = "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+SELECT_RESPONSE = "SELECT response, created_at FROM responses WHERE key = ?"
+TOUCH_RESPONSE = "UPDATE responses SET last_access = ? WHERE key = ?"
+UPSERT_RESPONSE = """
+INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+DELETE_RESPONSE = "DELETE FROM responses WHERE key = ?"
+DELETE_EXPIRED = "DELETE FROM responses WHERE created_at < ?"
+OLDEST_RESPONSES = "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT ?"
+TOTALS = "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so trivially different prompts share a key.
+
+    Case is kept: it can change the right answer (code, identifiers, "reply
+    in CAPS").
+    """
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def cache_key(model, prompt, options=None):
+    payload = json.dumps([model, normalize_prompt(prompt), options or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of finished generations.
+
+    An in-process LRU answers repeat questions without I/O, and a SQLite
+    file keeps answers across restarts. Entries expire after ``ttl`` seconds,
+    and the file tier evicts least recently used entries once it holds more
+    than ``max_bytes`` of responses.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, memory_items=256, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.memory_items = memory_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.conn = connect(db_path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(CREATE_RESPONSES_TABLE)
+            self.conn.execute(CREATE_LAST_ACCESS_INDEX)
+            self.conn.execute(DELETE_EXPIRED, (time.time() - ttl,))
+        self._disk_bytes = self.conn.execute(TOTALS).fetchone()[1]
+
+    def _remember(self, key, response, created_at):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+            row = self.conn.execute(SELECT_RESPONSE, (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            response, created_at = row
+            with self.conn:
+                if now - created_at > self.ttl:
+                    self.conn.execute(DELETE_RESPONSE, (key,))
+                    self._disk_bytes -= len(response.encode())
+                    self._stats["misses"] += 1
+                    return None
+                self.conn.execute(TOUCH_RESPONSE, (now, key))
+            self._remember(key, response, created_at)
+            self._stats["disk_hits"] += 1
+            return response
+
+    def put(self, key, model, response):
+        now = time.time()
+        size = len(response.encode())
+        with self._lock:
+            self._remember(key, response, now)
+            with self.conn:
+                previous = self.conn.execute(SELECT_RESPONSE, (key,)).fetchone()
+                if previous is not None:
+                    self._disk_bytes -= len(previous[0].encode())
+                self.conn.execute(UPSERT_RESPONSE, (key, model, response, size, now, now))
+                self._disk_bytes += size
+                self._evict()
+
+    def _evict(self):
+        while self._disk_bytes > self.max_bytes:
+            oldest = self.conn.execute(OLDEST_RESPONSES, (64,)).fetchall()
+            if not oldest:
+                self._disk_bytes = 0
+                return
+            for key, size in oldest:
+                self.conn.execute(DELETE_RESPONSE, (key,))
+                self._memory.pop(key, None)
+                self._disk_bytes -= size
+                self._stats["evictions"] += 1
+                if self._disk_bytes <= self.max_bytes:
+                    return
+
+    def stats(self):
+        with self._lock:
+            entries, disk_bytes = self.conn.execute(TOTALS).fetchone()
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats.update(
+            hits=hits,
+            hit_rate=hits / lookups if lookups else 0.0,
+            memory_entries=len(self._memory),
+            disk_entries=entries,
+            disk_bytes=disk_bytes,
+        )
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            with self.conn:
+                self.conn.execute("DELETE FROM responses")
+            self._disk_bytes = 0
+
+    def close(self):
+        self.conn.close()
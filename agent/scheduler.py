@@ -0,0 +1,275 @@
+# Generation scheduler module
+import collections
+import itertools
+import os
+import threading
+import time
+
+from server import metrics
+
+PRIORITY_ADMIN = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_ADMIN: "admin", PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+# Generations one model runs at once; match Ollama's OLLAMA_NUM_PARALLEL.
+DEFAULT_CONCURRENCY = int(os.environ.get("MCP_OLLAMA_CONCURRENCY", 2))
+DEFAULT_QUEUE_LIMIT = int(os.environ.get("MCP_OLLAMA_QUEUE_LIMIT", 64))
+DEFAULT_GENERATION_TIMEOUT = float(os.environ.get("MCP_GENERATION_TIMEOUT", 300))
+# Recent queue waits kept per model for the percentiles in stats().
+WAIT_SAMPLES = 1024
+
+
+class GenerationTimeout(TimeoutError):
+    pass
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class CancelToken:
+    """Cancels a generation from another thread.
+
+    Streams register cleanup with ``on_cancel`` (e.g. closing the HTTP
+    response), so a cancelled generation stops at once instead of at the
+    next token.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.cancelled = False
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"cancel callback error: {e}")
+
+    def on_cancel(self, callback):
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+class _Flight:
+    """One upstream generation, shared by every caller asking the same thing."""
+
+    def __init__(self, key, model, start, priority, seq, lock):
+        self.key = key
+        self.model = model
+        self.start = start
+        self.priority = priority
+        self.seq = seq
+        self.cond = threading.Condition(lock)
+        self.cancel = CancelToken()
+        self.chunks = []
+        self.stats = {}
+        self.subscribers = 1
+        self.done = False
+        self.error = None
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+
+
+class GenerationScheduler:
+    """Admits generations to Ollama with a per-model concurrency limit.
+
+    Waiting requests are started in priority order (PRIORITY_ADMIN first,
+    PRIORITY_BATCH last), oldest first within a priority. A request for a
+    prompt that is already queued or streaming joins that generation and
+    replays its chunks instead of starting another one. Each caller has its
+    own timeout and can cancel; the upstream stream is only aborted once no
+    caller is left. The per-model queue is bounded, so overload fails fast
+    with QueueFull rather than piling up.
+    """
+
+    def __init__(
+        self,
+        concurrency=DEFAULT_CONCURRENCY,
+        queue_limit=DEFAULT_QUEUE_LIMIT,
+        timeout=DEFAULT_GENERATION_TIMEOUT,
+        model_limits=None,
+    ):
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.model_limits = dict(model_limits or {})
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._flights = {}
+        self._pending = collections.defaultdict(list)
+        self._running = collections.Counter()
+        self._counts = collections.defaultdict(collections.Counter)
+        self._waits = collections.defaultdict(lambda: collections.deque(maxlen=WAIT_SAMPLES))
+
+    def limit(self, model):
+        return self.model_limits.get(model, self.concurrency)
+
+    def stream(self, key, model, start, priority=PRIORITY_INTERACTIVE, timeout=None, cancel=None, stats=None):
+        """Yield the chunks of ``start(stats, cancel_token)`` once a slot is free.
+
+        ``key`` identifies identical requests. ``stats`` receives this
+        caller's queue wait, time to first chunk and total time (all from
+        submission), whether it joined another request's generation, and
+        the upstream token counts.
+        """
+        stats = {} if stats is None else stats
+        timeout = self.timeout if timeout is None else timeout
+        submitted = time.perf_counter()
+        deadline = submitted + timeout
+        flight, joined = self._join(key, model, start, priority)
+        stats.update({"model": model, "ttft_s": None, "total_s": None, "chunks": 0, "queue_wait_s": None})
+        stats["deduplicated"] = joined
+        if cancel is not None:
+            cancel.on_cancel(lambda: self._notify(flight))
+        position = 0
+        try:
+            while True:
+                with self._lock:
+                    while position == len(flight.chunks) and not flight.done:
+                        if cancel is not None and cancel.cancelled:
+                            break
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            self._counts[model]["timeouts"] += 1
+                            metrics.GENERATION_REQUESTS.inc(model, "timeout")
+                            raise GenerationTimeout(f"Generation did not finish within {timeout:g}s")
+                        flight.cond.wait(remaining)
+                    if cancel is not None and cancel.cancelled:
+                        self._counts[model]["cancelled"] += 1
+                        metrics.GENERATION_REQUESTS.inc(model, "cancelled")
+                        raise GenerationCancelled("Generation cancelled")
+                    chunks = flight.chunks[position:]
+                    position += len(chunks)
+                    done, error = flight.done, flight.error
+                    if stats["queue_wait_s"] is None and flight.started_at is not None:
+                        stats["queue_wait_s"] = max(0.0, flight.started_at - submitted)
+                for chunk in chunks:
+                    if stats["ttft_s"] is None:
+                        stats["ttft_s"] = time.perf_counter() - submitted
+                    stats["chunks"] += 1
+                    yield chunk
+                if done:
+                    if error is not None:
+                        raise error
+                    for name in ("eval_count", "tokens_per_s"):
+                        if name in flight.stats:
+                            stats[name] = flight.stats[name]
+                    return
+        finally:
+            # Also set when the stream times out, fails or is closed early
+            stats["total_s"] = time.perf_counter() - submitted
+            self._leave(flight)
+
+    def _join(self, key, model, start, priority):
+        with self._lock:
+            flight = self._flights.get(key)
+            self._counts[model]["submitted"] += 1
+            if flight is not None:
+                flight.subscribers += 1
+                if flight.started_at is None and priority < flight.priority:
+                    flight.priority = priority
+                self._counts[model]["deduplicated"] += 1
+                metrics.GENERATION_REQUESTS.inc(model, "deduplicated")
+                return flight, True
+            if len(self._pending[model]) >= self.queue_limit:
+                self._counts[model]["rejected"] += 1
+                metrics.GENERATION_REQUESTS.inc(model, "rejected")
+                raise QueueFull(f"{len(self._pending[model])} generations already queued for {model}")
+            flight = _Flight(key, model, start, priority, next(self._seq), self._lock)
+            self._flights[key] = flight
+            self._pending[model].append(flight)
+            self._dispatch(model)
+            return flight, False
+
+    def _leave(self, flight):
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers or flight.done:
+                return
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            if flight.started_at is None:
+                # Nobody is waiting for it any more; drop it from the queue
+                self._pending[flight.model].remove(flight)
+                self._update_gauges(flight.model)
+                return
+        flight.cancel.cancel()
+
+    def _notify(self, flight):
+        with self._lock:
+            flight.cond.notify_all()
+
+    def _dispatch(self, model):
+        # Called with the lock held
+        pending = self._pending[model]
+        while pending and self._running[model] < self.limit(model):
+            flight = min(pending, key=lambda f: (f.priority, f.seq))
+            pending.remove(flight)
+            self._running[model] += 1
+            flight.started_at = time.perf_counter()
+            wait = flight.started_at - flight.queued_at
+            self._waits[model].append(wait)
+            metrics.GENERATION_QUEUE_WAIT.observe(model, PRIORITY_NAMES.get(flight.priority, flight.priority), value=wait)
+            threading.Thread(target=self._run, args=(flight,), name=f"generation-{flight.seq}", daemon=True).start()
+        self._update_gauges(model)
+
+    def _run(self, flight):
+        error = None
+        try:
+            for chunk in flight.start(flight.stats, flight.cancel):
+                with self._lock:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+                if flight.cancel.cancelled:
+                    break
+        except Exception as e:
+            error = e
+        if flight.cancel.cancelled:
+            error = GenerationCancelled("Generation cancelled")
+        with self._lock:
+            flight.done = True
+            flight.error = error
+            flight.cond.notify_all()
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            self._running[flight.model] -= 1
+            outcome = "completed" if error is None else "aborted" if flight.cancel.cancelled else "failed"
+            self._counts[flight.model][outcome] += 1
+            self._dispatch(flight.model)
+
+    def _update_gauges(self, model):
+        metrics.GENERATION_QUEUED.set(model, value=len(self._pending[model]))
+        metrics.GENERATION_RUNNING.set(model, value=self._running[model])
+
+    def stats(self):
+        """Per-model queue depth, running count, outcome counts and recent queue waits."""
+        with self._lock:
+            models = set(self._counts) | set(self._running)
+            result = {}
+            for model in sorted(models):
+                waits = sorted(self._waits[model])
+                result[model] = {
+                    "limit": self.limit(model),
+                    "running": self._running[model],
+                    "queued": len(self._pending[model]),
+                    **self._counts[model],
+                    "wait_p50_s": round(waits[len(waits) // 2], 4) if waits else 0.0,
+                    "wait_p95_s": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4) if waits else 0.0,
+                    "wait_max_s": round(waits[-1], 4) if waits else 0.0,
+                }
+            return result
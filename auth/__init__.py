@@ -0,0 +1 @@
+# Authentication module
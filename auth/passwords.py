@@ -0,0 +1,116 @@
+# Password hashing module
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt work factor for new hashes; each +1 doubles the cost of a login.
+BCRYPT_ROUNDS = int(os.environ.get("MCP_BCRYPT_ROUNDS", 12))
+# Concurrent hash/verify operations; more would only queue on the CPU.
+HASH_WORKERS = int(os.environ.get("MCP_HASH_WORKERS", os.cpu_count() or 2))
+HASH_TIMEOUT = 30.0
+SESSION_TTL = 8 * 3600
+
+
+def hash_rounds(pw_hash):
+    """Cost factor encoded in a "$2b$12$..." hash, or None if unparseable."""
+    try:
+        return int(pw_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread pool.
+
+    The pool limits how many hashes run at once; it does not make a single
+    call faster. hash_password() and verify_password() still block the
+    calling script thread for the full hash time. bcrypt releases the GIL,
+    so other sessions keep running meanwhile, and bounding the pool stops a
+    burst of logins from fighting over the CPU and slowing each other down.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, timeout=HASH_TIMEOUT):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def _verify(self, password, pw_hash):
+        try:
+            return bcrypt.checkpw(password.encode(), pw_hash.encode())
+        except ValueError:
+            # Malformed hash in the database
+            return False
+
+    def hash_password(self, password):
+        return self._pool.submit(self._hash, password).result(self.timeout)
+
+    def verify_password(self, password, pw_hash):
+        return self._pool.submit(self._verify, password, pw_hash).result(self.timeout)
+
+    def needs_rehash(self, pw_hash):
+        return hash_rounds(pw_hash) != self.rounds
+
+    def rehash_async(self, password, on_done):
+        """Hash ``password`` at the current cost in the background and pass
+        the new hash to ``on_done``. Used after a successful login to upgrade
+        hashes made with an older cost setting; ``on_done`` should only
+        replace the hash that was verified, so a password reset that lands
+        meanwhile wins."""
+        def run():
+            try:
+                on_done(self._hash(password))
+            except Exception as e:
+                print(f"Password rehash failed: {e}")
+        self._pool.submit(run)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+class SessionTokens:
+    """In-memory session tokens issued after a successful login.
+
+    Reruns check the token with a dict lookup instead of trusting a bare
+    session flag or touching bcrypt again. Tokens expire after ``ttl``.
+    """
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def issue(self, username, role):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._tokens[token] = (username, role, time.monotonic() + self.ttl)
+        return token
+
+    def validate(self, token):
+        """(username, role) for a live token, else None."""
+        if not token:
+            return None
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._tokens[token]
+                return None
+            return entry[0], entry[1]
+
+    def revoke(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def revoke_user(self, username):
+        """Drop every session of ``username`` (e.g. after a password reset)."""
+        with self._lock:
+            for token in [t for t, entry in self._tokens.items() if entry[0] == username]:
+                del self._tokens[token]
@@ -0,0 +1,183 @@
+# User store module
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from db.audit_log import CREATE_AUDIT_LOG_INDEXES, CREATE_AUDIT_LOG_TABLE
+from db.sqlite_db import connect, migrate
+
+DEFAULT_USERS_DB_PATH = "users.db"
+READ_CACHE_TTL = 30.0
+
+CREATE_USERS_TABLE = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    email TEXT,
+    role TEXT DEFAULT 'user',
+    failed_attempts INTEGER DEFAULT 0,
+    locked_until DATETIME
+)
+"""
+COUNT_USERS = "SELECT COUNT(*) FROM users"
+SELECT_USER = "SELECT password_hash, role, failed_attempts, locked_until, email FROM users WHERE username = ?"
+SELECT_ROLE = "SELECT role FROM users WHERE username = ?"
+LIST_USERS = "SELECT username, role FROM users ORDER BY username"
+INSERT_USER = "INSERT INTO users (username, password_hash, email, role) VALUES (?, ?, ?, ?)"
+UPDATE_PASSWORD = "UPDATE users SET password_hash = ? WHERE username = ?"
+# Only if the hash is still the one that was checked
+REPLACE_PASSWORD = "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?"
+RESET_FAILED_LOGINS = "UPDATE users SET failed_attempts = 0, locked_until = NULL WHERE username = ?"
+RECORD_FAILED_LOGIN = "UPDATE users SET failed_attempts = ?, locked_until = ? WHERE username = ?"
+
+
+def _create_users(conn):
+    conn.execute(CREATE_USERS_TABLE)
+    conn.execute(CREATE_AUDIT_LOG_TABLE)
+    for index in CREATE_AUDIT_LOG_INDEXES:
+        conn.execute(index)
+
+
+USER_MIGRATIONS = (
+    _create_users,
+)
+
+
+class TTLCache:
+    """Tiny thread-safe cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl=READ_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+            generation = self._generation
+        value = load()
+        with self._lock:
+            # Don't cache a value read before a concurrent write cleared us
+            if generation == self._generation:
+                self._entries[key] = (value, now + self.ttl)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+class UserStore:
+    """Users and audit tables in ``users.db`` behind a small connection pool.
+
+    Migrations run once when the store is built, connections stay open (so
+    their prepared statements stay cached), and hot reads such as the user
+    count and role lookups are served from a TTL cache that every write
+    clears.
+    """
+
+    def __init__(self, db_path=DEFAULT_USERS_DB_PATH, pool_size=4, timeout=30.0, cache_ttl=READ_CACHE_TTL):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._opened = []
+        self._lock = threading.Lock()
+        self._cache = TTLCache(cache_ttl)
+        conn = connect(db_path)
+        migrate(conn, USER_MIGRATIONS)
+        conn.close()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._opened) < self.pool_size:
+                conn = connect(self.db_path, check_same_thread=False)
+                self._opened.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No users.db connection available after {self.timeout}s")
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+
+    def _read_one(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def _write(self, sql, params):
+        with self.connection() as conn:
+            with conn:
+                rowcount = conn.execute(sql, params).rowcount
+        self._cache.clear()
+        return rowcount
+
+    def user_count(self):
+        return self._cache.get("count", lambda: self._read_one(COUNT_USERS)[0])
+
+    def role(self, username):
+        """Cached role of ``username``, or None if there is no such user."""
+        def load():
+            row = self._read_one(SELECT_ROLE, (username,))
+            return row[0] if row else None
+        return self._cache.get(("role", username), load)
+
+    def list_users(self):
+        def load():
+            with self.connection() as conn:
+                return conn.execute(LIST_USERS).fetchall()
+        return self._cache.get("users", load)
+
+    def get_user(self, username):
+        """(password_hash, role, failed_attempts, locked_until, email) or None.
+
+        Never cached: login decisions need the current lockout state.
+        """
+        return self._read_one(SELECT_USER, (username,))
+
+    def create_user(self, username, password_hash, email=None, role="user"):
+        """False if the username is already taken."""
+        try:
+            self._write(INSERT_USER, (username, password_hash, email, role))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def set_password(self, username, password_hash):
+        return self._write(UPDATE_PASSWORD, (password_hash, username))
+
+    def replace_password(self, username, old_hash, new_hash):
+        """Swap ``old_hash`` for ``new_hash``; a no-op (0) if the password
+        changed in the meantime, e.g. through a reset."""
+        return self._write(REPLACE_PASSWORD, (new_hash, username, old_hash))
+
+    def reset_failed_logins(self, username):
+        return self._write(RESET_FAILED_LOGINS, (username,))
+
+    def record_failed_login(self, username, failed_attempts, locked_until=None):
+        return self._write(RECORD_FAILED_LOGIN, (failed_attempts, locked_until, username))
+
+    def close(self):
+        with self._lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened.clear()
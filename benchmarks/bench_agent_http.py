@@ -0,0 +1,49 @@
+# Micro-benchmark: LlamaAgent per-call latency with and without keep-alive
+#
+#   python -m benchmarks.bench_agent_http --calls 1000
+#
+# "no reuse" sends Connection: close so every call opens a fresh TCP
+# connection, as the module-level requests.get/post calls used to.
+import argparse
+import os
+import time
+
+from benchmarks.common import print_table, serve_app, summarize, temp_db_path
+
+
+def measure(fn, calls):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(calls):
+        t = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LlamaAgent connection reuse")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ["MCP_DB_PATH"] = temp_db_path()
+    from agent.llama_agent import LlamaAgent, make_session
+    from server.mcp_server import app
+
+    rows = []
+    with serve_app(app) as url:
+        pooled = LlamaAgent(server_url=url)
+        pooled.add_many(f"row {i}" for i in range(args.rows))
+        no_reuse_session = make_session()
+        no_reuse_session.headers["Connection"] = "close"
+        fresh = LlamaAgent(server_url=url, session=no_reuse_session)
+
+        for name, agent in (("no reuse", fresh), ("keep-alive", pooled)):
+            rows.append((f"read_data {name}", measure(lambda i: agent.read_data(i % args.rows + 1), args.calls)))
+            rows.append((f"list_data {name}", measure(lambda i: agent.list_data(after_id=i % args.rows, limit=20), args.calls)))
+    print_table(f"{args.calls} sequential calls", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Benchmark: batched inserts vs one transaction per row
+#
+#   python -m benchmarks.bench_batch --rows 200000
+#
+# Reports rows/second for SQLiteDB.add_many (target: 50k/s or better),
+# for LlamaAgent.add_many against an in-process server, and for the
+# per-row add_data path on a smaller sample for comparison.
+import argparse
+import os
+import time
+
+from benchmarks.common import serve_app, temp_db_path
+
+
+def rate(rows, elapsed):
+    return f"{rows / elapsed:>12,.0f} rows/s  ({rows} rows in {elapsed:.2f}s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched insert throughput")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--per-row-sample", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ["MCP_DB_PATH"] = temp_db_path()
+    from agent.llama_agent import LlamaAgent
+    from db.sqlite_db import SQLiteDB
+    from server.mcp_server import app
+
+    contents = [f"Q: benchmark question {i}\nA: benchmark answer {i}" for i in range(args.rows)]
+
+    db = SQLiteDB(temp_db_path())
+    start = time.perf_counter()
+    for i in range(0, args.rows, args.chunk_size):
+        db.add_many(contents[i:i + args.chunk_size])
+    print("SQLiteDB.add_many      ", rate(args.rows, time.perf_counter() - start))
+
+    sample = contents[:args.per_row_sample]
+    start = time.perf_counter()
+    for content in sample:
+        db.add_data(content)
+    print("SQLiteDB.add_data      ", rate(len(sample), time.perf_counter() - start))
+    db.close()
+
+    with serve_app(app) as url:
+        agent = LlamaAgent(server_url=url)
+        start = time.perf_counter()
+        result = agent.add_many(contents, chunk_size=args.chunk_size)
+        assert result["failed"] == 0, result["failed"]
+        print("LlamaAgent.add_many    ", rate(args.rows, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        for content in sample:
+            agent.add_data(content)
+        print("LlamaAgent.add_data    ", rate(len(sample), time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
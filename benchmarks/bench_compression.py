@@ -0,0 +1,144 @@
+# Benchmark: at-rest compression of stored content
+#
+#   python -m benchmarks.bench_compression --rows 50000
+#
+# Stores Q/A transcripts like the ones handle_query() writes into a plain
+# database and a zstd one, then compares file size (after VACUUM), write
+# throughput, point reads, page reads, full-text search and export pages.
+# Also times recompressing the plain database in place in batches, as the
+# server's background pass does, and the size it ends up at.
+import argparse
+import os
+import random
+import time
+
+from benchmarks.common import temp_db_path
+from benchmarks.fake_ollama import answer_tokens
+from db.compression import train_dictionary
+from db.sqlite_db import SQLiteDB
+
+QUESTIONS = (
+    "how do I {} the {}", "what is the best way to {} a {}", "why does my {} fail to {}",
+    "explain how to {} {} step by step", "can you summarise the {} {} notes",
+)
+TOPICS = ("export", "import", "search", "model", "database", "report", "cache", "server", "upload", "index")
+
+
+def transcripts(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        question = rng.choice(QUESTIONS).format(rng.choice(TOPICS), rng.choice(TOPICS))
+        answer = "".join(answer_tokens(f"{question} {i}", rng.randint(40, 300)))
+        rows.append(f"Q: {question}?\nA: {answer.strip()}")
+    return rows
+
+
+def file_size(db):
+    db.conn.execute("VACUUM")
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(db.conn.execute("PRAGMA database_list").fetchone()[2])
+
+
+def rate(count, elapsed):
+    return f"{count / elapsed:>12,.0f}"
+
+
+def recompress(db, batch_size):
+    after_id, written = 0, 0
+    while after_id is not None:
+        after_id, updates = db.encode_page(after_id, batch_size)
+        written += db.store_encoded(updates)
+    return written
+
+
+def measure(db, rows, reads, rng):
+    ids = [rng.randint(1, len(rows)) for _ in range(reads)]
+    start = time.perf_counter()
+    for data_id in ids:
+        db.read_data(data_id)
+    point = time.perf_counter() - start
+    start = time.perf_counter()
+    after_id, listed = 0, 0
+    while listed < reads * 10:
+        page = db.list_data(after_id=after_id, limit=100)
+        if not page:
+            after_id = 0
+            continue
+        listed += len(page)
+        after_id = page[-1][0]
+    pages = time.perf_counter() - start
+    start = time.perf_counter()
+    for topic in TOPICS * 10:
+        db.search_data(topic, limit=50)
+    search = time.perf_counter() - start
+    start = time.perf_counter()
+    exported, after_id = 0, 0
+    while True:
+        page = db.export_page(after_id=after_id, limit=5000)
+        if not page:
+            break
+        exported += len(page)
+        after_id = page[-1][0]
+    export = time.perf_counter() - start
+    return reads / point, listed / pages, len(TOPICS) * 10 / search, exported / export
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plain vs zstd-compressed row storage")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--reads", type=int, default=20000, help="Point reads per case")
+    parser.add_argument("--batch", type=int, default=500, help="Rows per recompression batch")
+    args = parser.parse_args()
+
+    rows = transcripts(args.rows)
+    raw_mb = sum(len(row.encode()) for row in rows) / 1e6
+    print(f"{args.rows:,} transcripts, {raw_mb:.1f} MB of text\n")
+
+    plain = SQLiteDB(temp_db_path("plain.db"), compression="none")
+    start = time.perf_counter()
+    plain.add_many(rows)
+    plain_write = time.perf_counter() - start
+
+    # A dictionary trained on an earlier sample, as the server has once running
+    trainer = SQLiteDB(temp_db_path("train.db"), compression="none")
+    trainer.add_many(rows[:5000])
+    dictionary = train_dictionary(trainer.dictionary_samples())
+    trainer.close()
+    compressed = SQLiteDB(temp_db_path("zstd.db"), compression="zstd")
+    compressed.add_dictionary(dictionary, 5000)
+    start = time.perf_counter()
+    compressed.add_many(rows)
+    compressed_write = time.perf_counter() - start
+
+    single = min(2000, args.rows)
+    for db in (plain, compressed):
+        start = time.perf_counter()
+        for row in rows[:single]:
+            db.add_data(row)
+        db.single_write = time.perf_counter() - start
+        db.delete_many(range(args.rows + 1, args.rows + single + 1))
+
+    print(f"{'':<12}{'MB on disk':>12}{'bulk rows/s':>12}{'add_data/s':>12}"
+          f"{'reads/s':>12}{'list rows/s':>12}{'searches/s':>12}{'export rows/s':>14}")
+    for name, db, bulk in (("plain", plain, plain_write), ("zstd+dict", compressed, compressed_write)):
+        size = file_size(db)
+        point, listed, search, export = measure(db, rows, args.reads, random.Random(1))
+        print(f"{name:<12}{size / 1e6:>12.1f}{rate(args.rows, bulk)}{rate(single, db.single_write)}"
+              f"{point:>12,.0f}{listed:>12,.0f}{search:>12,.1f}{export:>14,.0f}")
+
+    plain.enable_compression()
+    plain.add_dictionary(dictionary, 5000)
+    start = time.perf_counter()
+    written = recompress(plain, args.batch)
+    elapsed = time.perf_counter() - start
+    stats = plain.compression_stats()
+    print(f"\nrecompressed {written:,} plain rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s, "
+          f"batches of {args.batch}); {file_size(plain) / 1e6:.1f} MB on disk after VACUUM, "
+          f"content {stats['compressed_bytes'] / 1e6:.1f} MB compressed + {stats['plain_bytes'] / 1e6:.1f} MB plain")
+    plain.close()
+    compressed.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Benchmark: per-request SQLiteDB() vs pooled connections
+#
+#   python -m benchmarks.bench_db_pool --requests 5000 --concurrency 8
+#
+# "per-request" reproduces what the MCP server handlers used to do: open a new
+# connection (plus CREATE TABLE IF NOT EXISTS) for every call and never close
+# it. "pooled" borrows a long-lived connection from ConnectionPool, which the
+# server used before it moved to AsyncSQLiteDB.
+import argparse
+import gc
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from benchmarks.common import print_table, run_concurrent, temp_db_path
+from db.sqlite_db import SQLiteDB, connect
+
+
+def seed(db_path, rows):
+    db = SQLiteDB(db_path)
+    db.add_many(f"row {i}" for i in range(rows))
+    db.close()
+
+
+def legacy_db(db_path):
+    # The old handlers: plain connect, DDL, no pragmas, no close.
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS data (id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT NOT NULL)")
+    return SQLiteDB(db_path, conn=conn)
+
+
+class ConnectionPool:
+    """Fixed-size pool of long-lived connections shared by worker threads.
+
+    The schema is created once when the pool is built; connections are opened
+    lazily up to ``size`` and handed out one thread at a time.
+    """
+
+    def __init__(self, db_path, size=8, timeout=30.0):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._opened = []
+        self._lock = threading.Lock()
+        self._closed = False
+        SQLiteDB(db_path).close()
+
+    def _open(self):
+        conn = connect(self.db_path, check_same_thread=False)
+        self._opened.append(conn)
+        return SQLiteDB(self.db_path, conn=conn)
+
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._opened) < self.size:
+                return self._open()
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s")
+
+    def release(self, db):
+        if self._closed:
+            db.close()
+            return
+        # Never hand out a connection with a transaction left open.
+        if db.conn.in_transaction:
+            db.conn.rollback()
+        self._idle.put_nowait(db)
+
+    @contextmanager
+    def connection(self):
+        db = self.acquire()
+        try:
+            yield db
+        finally:
+            self.release(db)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for conn in self._opened:
+                conn.close()
+            self._opened.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request vs pooled SQLite connections")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    seed(db_path, args.rows)
+    pool = ConnectionPool(db_path, size=args.concurrency)
+
+    def legacy_read(i):
+        legacy_db(db_path).read_data(i % args.rows + 1)
+
+    def legacy_write(i):
+        legacy_db(db_path).add_data(f"bench {i}")
+
+    def pooled_read(i):
+        with pool.connection() as db:
+            db.read_data(i % args.rows + 1)
+
+    def pooled_write(i):
+        with pool.connection() as db:
+            db.add_data(f"bench {i}")
+
+    rows = []
+    for name, fn in (
+        ("read_data per-request", legacy_read),
+        ("read_data pooled", pooled_read),
+        ("add_data per-request", legacy_write),
+        ("add_data pooled", pooled_write),
+    ):
+        rows.append((name, run_concurrent(fn, args.requests, args.concurrency)))
+        gc.collect()
+    pool.close()
+    print_table(f"{args.requests} requests, concurrency {args.concurrency}", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Benchmark: /export throughput and memory
+#
+#   python -m benchmarks.bench_export --rows 1000000
+#
+# Streams the whole table through the same encoder/compressor pipeline the
+# /export endpoint uses (in-process, bytes discarded) and reports rows/s,
+# output size and the peak growth of anonymous memory while exporting.
+# Memory is sampled from /proc/self/status (RssAnon, so pages of the
+# mmap'd database file don't count), which needs Linux.
+import argparse
+import asyncio
+import threading
+import time
+
+from benchmarks.common import temp_db_path
+from db.async_sqlite_db import AsyncSQLiteDB
+from db.sqlite_db import SQLiteDB
+from server.export import export_chunks, make_export
+
+CASES = [
+    ("csv", "none"),
+    ("csv", "gzip"),
+    ("ndjson", "zstd"),
+    ("parquet", "zstd"),
+]
+
+
+def anon_rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    return 0
+
+
+class PeakSampler(threading.Thread):
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = anon_rss_kb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, anon_rss_kb())
+
+    def finish(self):
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+async def export(db, fmt, compression, query):
+    encoder, compressor, _, _ = make_export(fmt, compression)
+    size = 0
+    async for chunk in export_chunks(db, encoder, compressor, query=query):
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export throughput and memory")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--query", default=None, help="Also filter by this search term")
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    db = SQLiteDB(db_path)
+    for start in range(0, args.rows, 50000):
+        db.add_many([
+            f"Q: benchmark question {i}\nA: benchmark answer {i} with some filler text"
+            for i in range(start, min(args.rows, start + 50000))
+        ])
+    db.close()
+
+    async_db = AsyncSQLiteDB(db_path)
+    print(f"{'case':<20}{'rows/s':>12}{'MB out':>10}{'peak mem +MB':>14}")
+    for fmt, compression in CASES:
+        try:
+            make_export(fmt, compression)
+        except RuntimeError as e:
+            print(f"{fmt}+{compression:<14}skipped: {e}")
+            continue
+        baseline = anon_rss_kb()
+        sampler = PeakSampler()
+        sampler.start()
+        start = time.perf_counter()
+        size = asyncio.run(export(async_db, fmt, compression, args.query))
+        elapsed = time.perf_counter() - start
+        growth = max(0, sampler.finish() - baseline) / 1024
+        print(f"{fmt + '+' + compression:<20}{args.rows / elapsed:>12,.0f}{size / 1e6:>10.1f}{growth:>14.1f}")
+    async_db.close()
+
+
+if __name__ == "__main__":
+    main()
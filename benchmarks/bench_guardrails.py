@@ -0,0 +1,123 @@
+# Benchmark: guardrail scanning and early abort
+#
+#   python -m benchmarks.bench_guardrails --sizes 100000,1000000,10000000 --terms 6,200
+#
+# Scans clean responses (the worst case: nothing matches, so every check
+# reads the whole text) three ways: the old per-word ``word in text.lower()``
+# loop, the compiled policy over the whole text, and the incremental scanner
+# fed token-sized chunks as a stream would. Then streams an answer with a
+# blocked word early on through the fake Ollama server and compares the
+# time to the block with the time to stream the whole answer.
+import argparse
+import random
+import time
+
+from agent.guardrails import Guardrails, load_guardrails
+from agent.llama_agent import LlamaAgent
+from benchmarks.common import serve_app
+from benchmarks.fake_ollama import WORDS, FakeOllamaConfig, make_app
+
+LEGACY_WORDS = ["hate", "violence", "kill", "terrorist", "racist", "sexist"]
+
+
+def legacy_check(response, banned_words):
+    lowered = response.lower()
+    for word in banned_words:
+        if word.lower() in lowered:
+            return word
+    return None
+
+
+def make_terms(count):
+    """The legacy words plus made-up ones, ``count`` in total."""
+    rng = random.Random(count)
+    terms = list(LEGACY_WORDS[:count])
+    while len(terms) < count:
+        terms.append("".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(rng.randint(5, 10))))
+    return terms
+
+
+def make_text(size, seed=0):
+    rng = random.Random(seed)
+    words = []
+    total = 0
+    while total < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def scan_chunks(guardrails, text, chunk_chars):
+    scanner = guardrails.scanner()
+    for i in range(0, len(text), chunk_chars):
+        if scanner.feed(text[i:i + chunk_chars]):
+            return scanner.violation
+    return scanner.finish()
+
+
+def bench_scan(sizes, term_counts, chunk_chars, repeat):
+    print(f"{'size':>10}{'terms':>7}{'legacy MB/s':>14}{'compiled MB/s':>15}{'streamed MB/s':>15}")
+    for size in sizes:
+        text = make_text(size)
+        for count in term_counts:
+            terms = make_terms(count)
+            guardrails = Guardrails({"rules": [{"name": "bench", "words": terms, "match": "substring"}]})
+            legacy, found = timed(lambda: legacy_check(text, terms), repeat)
+            assert found is None
+            compiled, found = timed(lambda: guardrails.check(text), repeat)
+            assert found is None
+            streamed, found = timed(lambda: scan_chunks(guardrails, text, chunk_chars), repeat)
+            assert found is None
+            mb = size / 1e6
+            print(f"{size:>10,}{count:>7}{mb / legacy:>14.1f}{mb / compiled:>15.1f}{mb / streamed:>15.1f}")
+
+
+def bench_abort(tokens, tokens_per_s, inject_at):
+    config = FakeOllamaConfig(tokens=tokens, tokens_per_s=tokens_per_s, ttft=0.05, inject="kill", inject_at=inject_at)
+    with serve_app(make_app(config)) as url:
+        clean = LlamaAgent(ollama_url=url)
+        guarded = LlamaAgent(ollama_url=url, guardrails=load_guardrails())
+        start = time.perf_counter()
+        clean.ollama_generate("benchmark prompt")
+        full = time.perf_counter() - start
+        start = time.perf_counter()
+        result = guarded.ollama_generate("benchmark prompt")
+        blocked = time.perf_counter() - start
+    assert isinstance(result, dict) and result.get("guardrail"), result
+    print(f"\n{tokens} tokens at {tokens_per_s:g}/s, blocked word at token {inject_at}:")
+    print(f"  full answer   {full:8.3f}s")
+    print(f"  blocked after {blocked:8.3f}s ({full / blocked:.1f}x sooner)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guardrail scan throughput and early abort")
+    parser.add_argument("--sizes", default="100000,1000000,10000000", help="Response sizes in characters")
+    parser.add_argument("--terms", default="6,200", help="Banned term counts to compare")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="Characters per streamed chunk")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tokens", type=int, default=1000, help="Tokens in the fake Ollama answer")
+    parser.add_argument("--tokens-per-s", type=float, default=200.0)
+    parser.add_argument("--inject-at", type=int, default=20, help="Token where the blocked word appears")
+    args = parser.parse_args()
+
+    bench_scan(
+        [int(size) for size in args.sizes.split(",")],
+        [int(count) for count in args.terms.split(",")],
+        args.chunk_chars,
+        args.repeat,
+    )
+    bench_abort(args.tokens, args.tokens_per_s, args.inject_at)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Benchmark: bulk import throughput
+#
+#   python -m benchmarks.bench_import --rows 500000
+#
+# Writes synthetic CSV and JSONL files, then reports rows/second for the
+# local importer (python -m db.importer), for a re-import where every row
+# is a duplicate, and for the same file streamed through POST /import.
+import argparse
+import csv
+import json
+import os
+
+from benchmarks.common import serve_app, temp_db_path
+
+
+def write_files(directory, rows):
+    csv_path = os.path.join(directory, "rows.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("id", "content"))
+        writer.writerows((i, f"Q: import question {i}\nA: import answer, number {i}") for i in range(rows))
+    jsonl_path = os.path.join(directory, "rows.jsonl")
+    with open(jsonl_path, "w") as f:
+        for i in range(rows):
+            f.write(json.dumps({"content": f"jsonl row {i} lorem ipsum dolor sit amet"}) + "\n")
+    return csv_path, jsonl_path
+
+
+def report(name, result):
+    print(f"{name:<28}{result['rows_per_s']:>12,.0f} rows/s  "
+          f"({result['inserted']:,} inserted, {result['duplicates']:,} duplicates in {result['elapsed_s']}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import throughput")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ["MCP_DB_PATH"] = temp_db_path()
+    os.environ.setdefault("MCP_EMBEDDER", "hashing")
+    from agent.llama_agent import LlamaAgent
+    from db.importer import import_file
+    from db.sqlite_db import SQLiteDB
+    from server.mcp_server import app
+
+    csv_path, jsonl_path = write_files(os.path.dirname(temp_db_path()), args.rows)
+    print(f"{args.rows:,} rows, {os.path.getsize(csv_path) / 1e6:.1f} MB CSV\n")
+
+    db = SQLiteDB(temp_db_path())
+    report("local csv", import_file(db, csv_path, chunk_rows=args.chunk_rows))
+    report("local csv, all duplicates", import_file(db, csv_path, chunk_rows=args.chunk_rows))
+    report("local jsonl", import_file(db, jsonl_path, chunk_rows=args.chunk_rows))
+    db.close()
+
+    with serve_app(app) as url:
+        agent = LlamaAgent(url)
+        report("POST /import csv", agent.import_file(csv_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Benchmark: login throughput with concurrent users
+#
+#   python -m benchmarks.bench_login --users 8 32 --logins 64 --rounds 10 12
+#
+# "inline" verifies on each user's own thread, as login_form used to;
+# "pooled" goes through PasswordHasher's bounded pool. Also shows what each
+# bcrypt cost factor costs per login.
+import argparse
+
+import bcrypt
+
+from auth.passwords import PasswordHasher
+from benchmarks.common import print_table, run_concurrent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput")
+    parser.add_argument("--users", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    args = parser.parse_args()
+
+    password = "correct horse battery staple"
+    for rounds in args.rounds:
+        pw_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+        hasher = PasswordHasher(rounds=rounds)
+        rows = []
+        for users in args.users:
+            rows.append((f"inline, {users} users", run_concurrent(
+                lambda i: bcrypt.checkpw(password.encode(), pw_hash.encode()), args.logins, users)))
+            rows.append((f"pooled, {users} users", run_concurrent(
+                lambda i: hasher.verify_password(password, pw_hash), args.logins, users)))
+        hasher.close()
+        print_table(f"bcrypt cost {rounds}, {args.logins} logins (rps = logins/s)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Benchmark: VectorIndex top-k cosine search at 100k and 1M vectors
+#
+#   python -m benchmarks.bench_semantic --sizes 100000 1000000 --dim 384
+#
+# Random unit vectors stand in for embeddings; 1M x 384 float32 needs about
+# 1.5 GB of RAM.
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import summarize
+from db.vector_index import VectorIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector index search latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'vectors':>10}{'load s':>10}{'q/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'upserts/s':>12}{'removes/s':>12}")
+    for size in args.sizes:
+        index = VectorIndex(args.dim, capacity=size)
+        start = time.perf_counter()
+        for offset in range(0, size, 50000):
+            count = min(50000, size - offset)
+            index.upsert(range(offset + 1, offset + count + 1), rng.standard_normal((count, args.dim), dtype=np.float32))
+        load_s = time.perf_counter() - start
+
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        latencies = []
+        start = time.perf_counter()
+        for query in queries:
+            t = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append(time.perf_counter() - t)
+        result = summarize(latencies, time.perf_counter() - start)
+
+        # Incremental maintenance: single-row changes, as the server applies them.
+        changes = 2000
+        start = time.perf_counter()
+        for i in range(changes):
+            index.upsert([i + 1], rng.standard_normal((1, args.dim), dtype=np.float32))
+        upsert_rate = changes / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for i in range(changes):
+            index.remove([size - i])
+        remove_rate = changes / (time.perf_counter() - start)
+
+        print(f"{size:>10}{load_s:>10.2f}{result['rps']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}{upsert_rate:>12,.0f}{remove_rate:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
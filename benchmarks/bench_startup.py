@@ -0,0 +1,163 @@
+# Benchmark: cold start
+#
+#   python -m benchmarks.bench_startup --runs 5 --output startup.json
+#   python -m benchmarks.bench_startup --baseline startup.json
+#
+# Imports each entry module in a fresh interpreter under `python -X
+# importtime` and reports the median cumulative import time, the median
+# wall time of the whole process and the heaviest direct imports. It then
+# starts the MCP server under uvicorn in a subprocess and times how long
+# until GET /ready answers. With --baseline, measurements more than
+# --threshold percent (and --min-ms) slower than the baseline are
+# reported and the exit status is 1.
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from benchmarks.common import free_port, temp_db_path
+from benchmarks.suite import git_revision, load
+
+# cli_app itself only runs under Streamlit; these are what it imports
+MODULES = ("server.mcp_server", "agent.llama_agent", "agent.model_manager", "auth.passwords", "db.sqlite_db")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def subprocess_env(**extra):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.update(extra)
+    return env
+
+
+def parse_importtime(stderr):
+    """[(depth, module, self_us, cumulative_us)] from -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # One space after the bar, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure_import(module, env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT, env=env,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    entries = parse_importtime(proc.stderr)
+    # A module's imports are listed before it, after the previous top-level line
+    end = next(i for i, (depth, name, _, _) in enumerate(entries) if depth == 0 and name == module)
+    start = max((i for i in range(end) if entries[i][0] == 0), default=-1) + 1
+    children = [(name, cumulative) for depth, name, _, cumulative in entries[start:end] if depth == 1]
+    return entries[end][3] / 1000, wall * 1000, children
+
+
+def measure_ready(env, timeout=60.0):
+    """Milliseconds from spawning the server until /ready answers 200."""
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server.mcp_server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except requests.ConnectionError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with status {proc.returncode}")
+            time.sleep(0.005)
+        raise RuntimeError(f"server not ready after {timeout:g}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def compare(baseline, current, threshold, min_ms):
+    regressions = []
+    print(f"\n{'measurement':<40}{'ms':>10}{'was':>10}{'Δ%':>8}")
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        delta = 100 * (now - before) / before if before else 0.0
+        flag = ""
+        if delta > threshold and now - before > min_ms:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40}{now:>10.1f}{before:>10.1f}{delta:>8.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and server readiness")
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest direct imports shown per module")
+    parser.add_argument("--embedder", default="none", help="MCP_EMBEDDER for the server readiness runs")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against an earlier --output file")
+    parser.add_argument("--threshold", type=float, default=15.0, help="Regression threshold in percent")
+    parser.add_argument("--min-ms", type=float, default=10.0, help="Ignore regressions smaller than this")
+    args = parser.parse_args()
+
+    env = subprocess_env()
+    results = {}
+    print(f"{'module':<24}{'import ms':>12}{'process ms':>12}   heaviest direct imports (cumulative ms)")
+    for module in args.modules:
+        runs = [measure_import(module, env) for _ in range(args.runs)]
+        imported = statistics.median(run[0] for run in runs)
+        wall = statistics.median(run[1] for run in runs)
+        results[f"import {module}"] = round(imported, 1)
+        results[f"process {module}"] = round(wall, 1)
+        children = sorted(runs[-1][2], key=lambda child: child[1], reverse=True)[:args.top]
+        heaviest = ", ".join(f"{name} {cumulative / 1000:.0f}" for name, cumulative in children)
+        print(f"{module:<24}{imported:>12.1f}{wall:>12.1f}   {heaviest}")
+
+    server_env = subprocess_env(MCP_DB_PATH=temp_db_path(), MCP_EMBEDDER=args.embedder)
+    ready = statistics.median(measure_ready(server_env) for _ in range(args.runs))
+    results["server /ready"] = round(ready, 1)
+    print(f"\nserver spawn to /ready: {ready:.1f} ms (MCP_EMBEDDER={args.embedder})")
+
+    report = {
+        "meta": {
+            "runs": args.runs,
+            "embedder": args.embedder,
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        regressions = compare(load(args.baseline), report, args.threshold, args.min_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
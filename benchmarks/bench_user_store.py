@@ -0,0 +1,74 @@
+# Benchmark: users.db work done by one Streamlit rerun
+#
+#   python -m benchmarks.bench_user_store --users 1000 --reruns 2000
+#
+# "get_db" replays what cli_app used to do on a rerun that shows the
+# registration form and the admin user list: open users.db, re-issue the
+# DDL and close it again for every query. "UserStore" does the same reads
+# (plus the per-rerun role check) through the cached store.
+import argparse
+import sqlite3
+import time
+
+from auth.user_store import CREATE_USERS_TABLE, UserStore
+from benchmarks.common import print_table, summarize, temp_db_path
+from db.audit_log import CREATE_AUDIT_LOG_TABLE
+
+
+def legacy_query(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    conn.execute(CREATE_USERS_TABLE)
+    conn.execute(CREATE_AUDIT_LOG_TABLE)
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    return rows
+
+
+def legacy_rerun(db_path):
+    legacy_query(db_path, "SELECT COUNT(*) FROM users")
+    legacy_query(db_path, "SELECT username, role FROM users")
+
+
+def store_rerun(store, username):
+    store.role(username)
+    store.user_count()
+    store.list_users()
+
+
+def timed_reruns(fn, reruns):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(reruns):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="users.db cost per Streamlit rerun")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--reruns", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = temp_db_path("users.db")
+    store = UserStore(db_path)
+    with store.connection() as conn, conn:
+        conn.executemany(
+            "INSERT INTO users (username, password_hash, role) VALUES (?, 'x', 'user')",
+            [(f"user{i}",) for i in range(args.users)],
+        )
+
+    cold = UserStore(db_path, cache_ttl=0)
+    rows = [
+        ("get_db per query", timed_reruns(lambda i: legacy_rerun(db_path), args.reruns)),
+        ("UserStore, no cache", timed_reruns(lambda i: store_rerun(cold, f"user{i % args.users}"), args.reruns)),
+        ("UserStore, TTL cache", timed_reruns(lambda i: store_rerun(store, f"user{i % args.users}"), args.reruns)),
+    ]
+    print_table(f"{args.reruns} reruns, {args.users} users (rps = reruns/s)", rows)
+    cold.close()
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# Stand-in for the Ollama API, so generation paths can be tested and
+# benchmarked without a model:
+#
+#   python -m benchmarks.fake_ollama --port 11434 --tokens-per-s 30 --ttft 0.8
+#   MCP_OLLAMA_URL=http://127.0.0.1:11434 streamlit run cli_app.py
+#
+# /api/generate streams the same NDJSON lines Ollama does, paced by absolute
+# deadlines so the token rate holds at any speed. Answers are deterministic
+# for a given prompt. Errors are injected from a seeded RNG: either an HTTP
+# 500 before streaming or an {"error": ...} line after ``error_after``
+# tokens, as Ollama sends when a model fails mid-generation. Models are
+# "loaded" on first use (``load_time`` seconds) and unloaded when their
+# keep_alive runs out, as /api/ps reports. /api/tags and /api/embed answer
+# too, so the other agent and server paths run offline.
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "the model answers every question with a steady stream of plausible words so that latency "
+    "throughput caching and guardrails can be measured without waiting for real inference"
+).split()
+
+
+class FakeOllamaConfig:
+    def __init__(
+        self,
+        tokens=64,
+        tokens_per_s=200.0,
+        ttft=0.05,
+        token_chars=None,
+        error_rate=0.0,
+        error_after=0,
+        models=("llama3:latest", "mistral:latest", "phi3:latest"),
+        seed=0,
+        load_time=0.0,
+        model_size=4_000_000_000,
+        inject=None,
+        inject_at=0,
+    ):
+        self.tokens = tokens
+        self.tokens_per_s = tokens_per_s
+        self.ttft = ttft
+        # Pad each token to this many characters to test large payloads
+        self.token_chars = token_chars
+        self.error_rate = error_rate
+        self.error_after = error_after
+        self.models = models
+        self.load_time = load_time
+        self.model_size = model_size
+        # Put this text in every answer at token ``inject_at``, e.g. to trip a guardrail
+        self.inject = inject
+        self.inject_at = inject_at
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "tokens": 0, "loads": 0}
+        # model -> unload time (time.time()), None = never
+        self.resident = {}
+
+    def should_fail(self):
+        with self.lock:
+            self.stats["requests"] += 1
+            fail = self.error_rate > 0 and self.rng.random() < self.error_rate
+            if fail:
+                self.stats["errors"] += 1
+            return fail
+
+    def is_resident(self, model):
+        with self.lock:
+            if model not in self.resident:
+                return False
+            expires = self.resident[model]
+            if expires is not None and expires <= time.time():
+                del self.resident[model]
+                return False
+            return True
+
+    def keep(self, model, keep_alive):
+        with self.lock:
+            if keep_alive == 0:
+                self.resident.pop(model, None)
+            else:
+                self.resident[model] = None if keep_alive < 0 else time.time() + keep_alive
+
+
+def parse_keep_alive(value, default=300.0):
+    """Seconds from an Ollama keep_alive ("30m", "1h", 600, -1); negative = forever."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return default
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+    return float(match.group(1)) * scale
+
+
+def answer_tokens(prompt, count, token_chars=None):
+    """Deterministic tokens for ``prompt``; each ends with a space."""
+    rng = random.Random(zlib.crc32(prompt.encode()))
+    tokens = []
+    for _ in range(count):
+        word = rng.choice(WORDS)
+        if token_chars:
+            word = (word * (token_chars // len(word) + 1))[:max(1, token_chars - 1)]
+        tokens.append(word + " ")
+    return tokens
+
+
+def make_app(config=None, **options):
+    """FastAPI app serving the fake API; ``options`` build a FakeOllamaConfig."""
+    config = config or FakeOllamaConfig(**options)
+    app = FastAPI()
+    app.state.config = config
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        keep_alive = parse_keep_alive(body.get("keep_alive"))
+        load_duration = 0.0
+        if keep_alive != 0 and not config.is_resident(model):
+            load_duration = config.load_time
+            with config.lock:
+                config.stats["loads"] += 1
+            await asyncio.sleep(load_duration)
+        config.keep(model, keep_alive)
+        if not body.get("prompt"):
+            # Ollama loads (or with keep_alive 0 unloads) a model for an empty prompt
+            reason = "unload" if keep_alive == 0 else "load"
+            return {"model": model, "response": "", "done": True, "done_reason": reason,
+                    "load_duration": int(load_duration * 1e9)}
+        fail = config.should_fail()
+        if fail and not config.error_after:
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        tokens = answer_tokens(body.get("prompt", ""), config.tokens, config.token_chars)
+        if config.inject and config.inject_at < len(tokens):
+            tokens[config.inject_at] = config.inject + " "
+        rate = config.tokens_per_s
+
+        def final(elapsed):
+            return {
+                "model": model,
+                "response": "",
+                "done": True,
+                "eval_count": len(tokens),
+                "eval_duration": int(max(elapsed - config.ttft, 1e-6) * 1e9),
+            }
+
+        async def lines():
+            started = time.perf_counter()
+            for i, token in enumerate(tokens):
+                if fail and i == config.error_after:
+                    yield json.dumps({"error": "injected failure"}) + "\n"
+                    return
+                delay = started + config.ttft + (i / rate if rate else 0) - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+            with config.lock:
+                config.stats["tokens"] += len(tokens)
+            yield json.dumps(final(time.perf_counter() - started)) + "\n"
+
+        if body.get("stream", True) is False:
+            started = time.perf_counter()
+            await asyncio.sleep(config.ttft + (len(tokens) / rate if rate else 0))
+            return {**final(time.perf_counter() - started), "response": "".join(tokens)}
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name, "model": name, "size": config.model_size} for name in config.models]}
+
+    @app.get("/api/ps")
+    async def ps():
+        models = []
+        for name in list(config.resident):
+            if not config.is_resident(name):
+                continue
+            expires = config.resident.get(name)
+            expires_at = datetime.datetime.fromtimestamp(expires or 4102444800, datetime.timezone.utc)
+            models.append({
+                "name": name,
+                "model": name,
+                "size": config.model_size,
+                "size_vram": config.model_size,
+                "expires_at": expires_at.isoformat(),
+            })
+        return {"models": models}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        from server.semantic import HashingEmbedder
+
+        body = await request.json()
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        return {"model": body.get("model"), "embeddings": HashingEmbedder(768).embed(texts).tolist()}
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        with config.lock:
+            return dict(config.stats)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens", type=int, default=64, help="Tokens per answer")
+    parser.add_argument("--tokens-per-s", type=float, default=200.0, help="0 streams as fast as possible")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--token-chars", type=int, help="Pad tokens to this many characters")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-after", type=int, default=0, help="Tokens sent before a failure; 0 = HTTP 500")
+    parser.add_argument("--load-time", type=float, default=0.0, help="Seconds to load a model that is not resident")
+    parser.add_argument("--inject", help="Text to put in every answer, e.g. a blocked word")
+    parser.add_argument("--inject-at", type=int, default=0, help="Token index for --inject")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeOllamaConfig(
+        args.tokens, args.tokens_per_s, args.ttft, args.token_chars, args.error_rate, args.error_after,
+        seed=args.seed,
+        load_time=args.load_time,
+        inject=args.inject,
+        inject_at=args.inject_at,
+    )
+    uvicorn.run(make_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
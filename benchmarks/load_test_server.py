@@ -0,0 +1,73 @@
+# Load test: MCP server latency percentiles under concurrent clients
+#
+#   python -m benchmarks.load_test_server --levels 10 100 500 --requests 5000
+#
+# Starts the server in-process against a throwaway database and drives a
+# read-heavy mix (read_data, list_data, search_data) with a share of
+# add_data/update_data writes from N concurrent client threads. Client and
+# server then share one interpreter; pass --url to load an external server
+# (e.g. `uvicorn server.mcp_server:app --workers 1`) for cleaner numbers.
+import argparse
+import os
+import threading
+from contextlib import nullcontext
+
+import requests
+
+from benchmarks.common import print_table, run_concurrent, serve_app, temp_db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP server load test")
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--url", help="Load an already running server (seeded by the caller) instead")
+    args = parser.parse_args()
+
+    if args.url:
+        target = nullcontext(args.url)
+    else:
+        os.environ["MCP_DB_PATH"] = temp_db_path()
+        from db.sqlite_db import SQLiteDB
+        from server.mcp_server import app
+
+        db = SQLiteDB(os.environ["MCP_DB_PATH"])
+        db.add_many(f"seed row {i} lorem ipsum" for i in range(args.rows))
+        db.close()
+        target = serve_app(app)
+
+    local = threading.local()
+    write_every = max(1, round(1 / args.write_ratio)) if args.write_ratio else 0
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    results = []
+    with target as url:
+        def call(i):
+            s = session()
+            data_id = i % args.rows + 1
+            if write_every and i % write_every == 0:
+                if i % (2 * write_every) == 0:
+                    resp = s.post(f"{url}/add_data", json={"content": f"load {i}"})
+                else:
+                    resp = s.put(f"{url}/update_data", json={"id": data_id, "content": f"updated {i}"})
+            elif i % 3 == 0:
+                resp = s.get(f"{url}/list_data", params={"after_id": data_id, "limit": 50})
+            elif i % 3 == 1:
+                resp = s.get(f"{url}/search_data", params={"q": f"row {data_id}", "limit": 10})
+            else:
+                resp = s.get(f"{url}/read_data/{data_id}")
+            resp.raise_for_status()
+
+        for level in args.levels:
+            results.append((f"{level} clients", run_concurrent(call, args.requests, level)))
+    print_table(f"{args.requests} requests per level, {args.write_ratio:.0%} writes", results)
+
+
+if __name__ == "__main__":
+    main()
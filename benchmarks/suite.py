@@ -0,0 +1,301 @@
+# Benchmark suite: every data endpoint plus the generation paths, saved as JSON
+#
+#   python -m benchmarks.suite --rows 100000 --concurrency 1 16 64 --output results.json
+#   python -m benchmarks.suite --rows 100000 --baseline results.json --output after.json
+#   python -m benchmarks.suite --compare before.json after.json
+#
+# Builds a synthetic data table of --rows rows (Zipf-distributed words, so
+# full-text search sees realistic term frequencies) from a fixed seed, starts
+# the server in-process against a copy of it and drives each case at each
+# concurrency level. Generation cases talk to benchmarks.fake_ollama, which
+# streams at a fixed token rate, so they measure the agent and not a model.
+#
+# Seeding 10M rows takes several minutes; pass --db PATH to keep the seeded
+# table and reuse it on later runs (each run works on a fresh copy).
+#
+# With --baseline, cases whose p95 latency rose or whose throughput fell by
+# more than --threshold percent are reported and the exit status is 1.
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.common import run_concurrent, serve_app, temp_db_path
+
+DATA_CASES = ("read_data", "list_data", "search_data", "add_data", "update_data", "delete_data")
+AGENT_CASES = ("generate", "generate_cached", "stream_query")
+CASES = DATA_CASES + AGENT_CASES
+SEED_CHUNK_ROWS = 100000
+VOCABULARY_SIZE = 20000
+
+
+def vocabulary(seed):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def synthetic_rows(rows, seed):
+    """Deterministic row contents, 8-40 words each."""
+    rng = random.Random(seed)
+    words = vocabulary(seed)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    for i in range(rows):
+        yield f"row {i}: " + " ".join(rng.choices(words, weights, k=rng.randint(8, 40)))
+
+
+def seed_database(path, rows, seed):
+    from db.sqlite_db import SQLiteDB
+
+    db = SQLiteDB(path)
+    try:
+        count = db.conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+        if count == rows:
+            print(f"Reusing {rows:,} seeded rows in {path}")
+            return
+        if count:
+            sys.exit(f"{path} holds {count:,} rows, not {rows:,}; delete it or pass --rows {count}")
+        started = time.perf_counter()
+        contents = synthetic_rows(rows, seed)
+        for done in range(0, rows, SEED_CHUNK_ROWS):
+            db.add_many(next(contents) for _ in range(min(SEED_CHUNK_ROWS, rows - done)))
+            print(f"\rSeeding {min(done + SEED_CHUNK_ROWS, rows):,}/{rows:,} rows", end="", flush=True)
+        print(f" in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def copy_database(source, dest):
+    src, dst = sqlite3.connect(source), sqlite3.connect(dest)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Workload:
+    """Per-case request functions; each takes the request number."""
+
+    def __init__(self, url, ollama_url, rows, seed, requests_per_case, cache):
+        self.url = url
+        self.ollama_url = ollama_url
+        self.rows = rows
+        self.cache = cache
+        rng = random.Random(seed + 1)
+        words = vocabulary(seed)
+        # Mid-frequency terms: neither stop-word-like nor nearly absent
+        self.terms = [rng.choice(words[50:2000]) for _ in range(requests_per_case)]
+        self.ids = [rng.randint(1, rows) for _ in range(requests_per_case)]
+        self.victims = []
+        self._local = threading.local()
+
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def agent(self, cached):
+        from agent.llama_agent import LlamaAgent
+
+        attr = "cached_agent" if cached else "agent"
+        if not hasattr(self._local, attr):
+            agent = LlamaAgent(self.url, model="fake", cache=self.cache if cached else None, ollama_url=self.ollama_url)
+            setattr(self._local, attr, agent)
+        return getattr(self._local, attr)
+
+    def prepare(self, case, count):
+        """Untimed setup: rows for delete_data to remove, a warm cache for generate_cached."""
+        if case == "delete_data":
+            result = self.agent(False).add_many(f"delete me {i}" for i in range(count))
+            self.victims = [item["id"] for item in result["results"]]
+        elif case == "generate_cached":
+            for i in range(10):
+                self.agent(True).ollama_generate(f"cached question {i}")
+
+    def read_data(self, i):
+        return self.session().get(f"{self.url}/read_data/{self.ids[i]}")
+
+    def list_data(self, i):
+        return self.session().get(f"{self.url}/list_data", params={"after_id": self.ids[i], "limit": 50})
+
+    def search_data(self, i):
+        return self.session().get(f"{self.url}/search_data", params={"q": self.terms[i], "limit": 10})
+
+    def add_data(self, i):
+        return self.session().post(f"{self.url}/add_data", json={"content": f"added {i} {self.terms[i]}"})
+
+    def update_data(self, i):
+        return self.session().put(
+            f"{self.url}/update_data", json={"id": self.ids[i], "content": f"updated {i} {self.terms[i]}"}
+        )
+
+    def delete_data(self, i):
+        return self.session().delete(f"{self.url}/delete_data/{self.victims[i]}")
+
+    def generate(self, i):
+        return self.agent(False).ollama_generate(f"question {i}", use_cache=False)
+
+    def generate_cached(self, i):
+        return self.agent(True).ollama_generate(f"cached question {i % 10}")
+
+    def stream_query(self, i):
+        stats = {}
+        answer = "".join(self.agent(False).stream_query(f"question {i}", stats=stats, use_cache=False))
+        return {"error": stats["error"]} if stats["error"] else answer
+
+
+def run_case(workload, case, requests_per_case, concurrency):
+    workload.prepare(case, requests_per_case)
+    errors = []
+    call = getattr(workload, case)
+
+    def checked(i):
+        try:
+            result = call(i)
+        except Exception as e:
+            errors.append(str(e))
+            return
+        if isinstance(result, requests.Response):
+            if not result.ok or "error" in result.json():
+                errors.append(f"HTTP {result.status_code}: {result.text[:200]}")
+        elif isinstance(result, dict):
+            errors.append(str(result)[:200])
+
+    summary = run_concurrent(checked, requests_per_case, concurrency)
+    summary["errors"] = len(errors)
+    if errors:
+        print(f"  {case}: {len(errors)} errors, first: {errors[0]}")
+    return summary
+
+
+def compare(baseline, current, threshold):
+    """Print per-case deltas; returns the list of regressed case names."""
+    regressions = []
+    print(f"\n{'case':<30}{'p95 ms':>10}{'was':>10}{'Δ%':>8}{'rps':>12}{'was':>10}{'Δ%':>8}")
+    for case, levels in current["results"].items():
+        for level, now in levels.items():
+            before = baseline["results"].get(case, {}).get(level)
+            if before is None:
+                continue
+            p95_delta = 100 * (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+            rps_delta = 100 * (now["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+            name = f"{case} @{level}"
+            flag = ""
+            if p95_delta > threshold or rps_delta < -threshold:
+                regressions.append(name)
+                flag = "  REGRESSION"
+            print(f"{name:<30}{now['p95_ms']:>10}{before['p95_ms']:>10}{p95_delta:>8.1f}"
+                  f"{now['rps']:>12}{before['rps']:>10}{rps_delta:>8.1f}{flag}")
+    if baseline["meta"].get("rows") != current["meta"].get("rows"):
+        print(f"Note: baseline used {baseline['meta'].get('rows'):,} rows, this run {current['meta'].get('rows'):,}")
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP benchmark suite")
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic rows in the data table")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per case and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--db", help="Keep the seeded table here and reuse it on later runs")
+    parser.add_argument("--fake-tokens", type=int, default=64, help="Tokens per fake Ollama answer")
+    parser.add_argument("--fake-rate", type=float, default=500.0, help="Fake Ollama tokens per second")
+    parser.add_argument("--fake-ttft", type=float, default=0.02, help="Fake Ollama time to first token (s)")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0, help="Fraction of fake generations that fail")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against an earlier --output file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "RESULTS"), help="Only compare two saved files")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load(args.compare[0]), load(args.compare[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    seeded = args.db or temp_db_path("seed.db")
+    seed_database(seeded, args.rows, args.seed)
+    os.environ["MCP_DB_PATH"] = temp_db_path()
+    # Embedding every row would dominate the run; semantic search has its own benchmark
+    os.environ["MCP_EMBEDDER"] = "none"
+    copy_database(seeded, os.environ["MCP_DB_PATH"])
+
+    from agent.response_cache import ResponseCache
+    from benchmarks.fake_ollama import make_app
+    from server.mcp_server import app
+
+    results = {}
+    ollama = make_app(
+        tokens=args.fake_tokens, tokens_per_s=args.fake_rate, ttft=args.fake_ttft, error_rate=args.fake_error_rate
+    )
+    with serve_app(ollama) as ollama_url, serve_app(app) as url:
+        cache = ResponseCache(temp_db_path("llm_cache.db"))
+        workload = Workload(url, ollama_url, args.rows, args.seed, args.requests, cache)
+        for case in args.cases:
+            results[case] = {}
+            for level in args.concurrency:
+                summary = run_case(workload, case, args.requests, level)
+                results[case][str(level)] = summary
+                print(f"{case:<18}{level:>5} clients{summary['rps']:>12} rps{summary['p50_ms']:>10} p50"
+                      f"{summary['p95_ms']:>10} p95{summary['p99_ms']:>10} p99 ms")
+
+    report = {
+        "meta": {
+            "rows": args.rows,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "fake_ollama": {
+                "tokens": args.fake_tokens,
+                "tokens_per_s": args.fake_rate,
+                "ttft_s": args.fake_ttft,
+                "error_rate": args.fake_error_rate,
+            },
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        regressions = compare(load(args.baseline), report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
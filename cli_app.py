@@ -1,13 +1,22 @@
 
 import streamlit as st
 from agent.llama_agent import LlamaAgent
-import sqlite3
-import bcrypt
-import smtplib
-from email.mime.text import MIMEText
+from agent.model_manager import ModelManager
+from agent.response_cache import DEFAULT_CACHE_PATH, ResponseCache
+from agent.guardrails import load_guardrails
+from agent.scheduler import PRIORITY_ADMIN, PRIORITY_INTERACTIVE, GenerationScheduler
+from auth.passwords import PasswordHasher, SessionTokens
+from auth.user_store import DEFAULT_USERS_DB_PATH, UserStore
+from db.audit_log import AuditLogWriter, query_audit_log
+from server.metrics import start_exporter
+import tempfile
 import os
 # --- Email Notification ---
 def send_email(to_email, subject, body):
+    # Imported here: most sessions never send mail
+    import smtplib
+    from email.mime.text import MIMEText
+
     smtp_host = os.environ.get("SMTP_HOST")
     smtp_port = int(os.environ.get("SMTP_PORT", 587))
     smtp_user = os.environ.get("SMTP_USER")
@@ -34,14 +43,32 @@ st.title("MCP Client: AI & Data Interface")
 
 
 # --- Model Selection ---
-available_models = [
+# Offered when Ollama cannot be reached to list its local models
+FALLBACK_MODELS = [
     "llama3:latest",
     "llama2:latest",
     "mistral:latest",
     "phi3:latest",
     "openchat:latest"
 ]
-selected_model = st.sidebar.selectbox("AI Model", available_models, index=0)
+DEFAULT_MODEL = os.environ.get("MCP_DEFAULT_MODEL", "llama3:latest")
+
+@st.cache_resource
+def get_model_manager():
+    # Loads the default model once per process, then keeps used models warm
+    manager = ModelManager()
+    manager.start(preload=DEFAULT_MODEL)
+    return manager
+
+model_manager = get_model_manager()
+available_models = [name for name, _ in model_manager.list_models()] or FALLBACK_MODELS
+default_index = available_models.index(DEFAULT_MODEL) if DEFAULT_MODEL in available_models else 0
+selected_model = st.sidebar.selectbox("AI Model", available_models, index=default_index)
+# Start loading a newly picked model now rather than on the first question
+model_manager.use(selected_model)
+st.sidebar.caption(f"Model state: {model_manager.state(selected_model)}")
+if st.sidebar.checkbox("Show model residency"):
+    st.sidebar.dataframe(model_manager.status())
 
 # Store the selected model in session state to persist across reruns
 if "selected_model" not in st.session_state:
@@ -49,23 +76,60 @@ if "selected_model" not in st.session_state:
 if selected_model != st.session_state["selected_model"]:
     st.session_state["selected_model"] = selected_model
 
-agent = LlamaAgent(model=st.session_state["selected_model"])
+MCP_SERVER_URL = os.environ.get("MCP_SERVER_URL", "http://127.0.0.1:8000")
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache(os.environ.get("MCP_LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
+
+@st.cache_resource
+def get_scheduler():
+    # One queue in front of Ollama for every session and model
+    return GenerationScheduler()
+
+@st.cache_resource
+def get_guardrails():
+    # Policy files from MCP_GUARDRAIL_POLICY, compiled once per process
+    return load_guardrails()
+
+@st.cache_resource
+def get_agent(model, server_url):
+    # One agent (and pooled HTTP session) per model/server, reused across reruns and users
+    return LlamaAgent(
+        server_url=server_url,
+        model=model,
+        cache=get_response_cache(),
+        scheduler=get_scheduler(),
+        keep_alive=get_model_manager().keep_alive,
+        guardrails=get_guardrails(),
+    )
+
+agent = get_agent(st.session_state["selected_model"], MCP_SERVER_URL)
+
+@st.cache_resource
+def get_metrics_exporter():
+    # Ollama timings are recorded in this process; expose them if asked to
+    port = os.environ.get("MCP_AGENT_METRICS_PORT")
+    return start_exporter(int(port)) if port else None
+
+get_metrics_exporter()
 
 # --- Guardrail AI Agent ---
-def guardrail_ai_response(response, banned_words=None, max_length=1200):
+def guardrail_message(violation):
+    if violation.get("match"):
+        return f"Guardrail: {violation['message']} (matched: '{violation['match']}')"
+    return f"Guardrail: {violation['message']}"
+
+def guardrail_ai_response(response):
     """
-    Checks the AI response for banned words and excessive length.
+    Checks a complete AI response against the guardrail policy.
     Returns (is_safe, message).
     """
     if not isinstance(response, str):
         return False, "AI response is not a string."
-    if banned_words is None:
-        banned_words = ["hate", "violence", "kill", "terrorist", "racist", "sexist"]
-    for word in banned_words:
-        if word.lower() in response.lower():
-            return False, f"Guardrail: Response blocked due to inappropriate content (word: '{word}')."
-    if len(response) > max_length:
-        return False, f"Guardrail: Response too long (>{max_length} characters)."
+    violation = get_guardrails().check(response)
+    if violation is not None:
+        return False, guardrail_message(violation)
     return True, response
 
 
@@ -77,35 +141,35 @@ choice = st.sidebar.selectbox("Menu", menu)
 
 
 # --- User Authentication (SQLite + bcrypt) ---
-def get_db():
-    conn = sqlite3.connect("users.db")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            username TEXT PRIMARY KEY,
-            password_hash TEXT NOT NULL,
-            email TEXT,
-            role TEXT DEFAULT 'user',
-            failed_attempts INTEGER DEFAULT 0,
-            locked_until DATETIME
-        )
-    """)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS audit_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            action TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            details TEXT
-        )
-    """)
-    return conn
+@st.cache_resource
+def get_user_store():
+    # Migrated once per process; pooled connections and cached hot reads
+    return UserStore(DEFAULT_USERS_DB_PATH)
+
+@st.cache_resource
+def get_audit_log():
+    # Batched background writer shared by every session; flushed at exit
+    get_user_store()
+    return AuditLogWriter(DEFAULT_USERS_DB_PATH)
 
 def log_action(username, action, details=None):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO audit_log (username, action, details) VALUES (?, ?, ?)", (username, action, details))
-    conn.commit()
-    conn.close()
+    get_audit_log().log(username, action, details)
+
+@st.cache_resource
+def get_password_hasher():
+    # Bounded bcrypt pool; cost factor from MCP_BCRYPT_ROUNDS
+    return PasswordHasher()
+
+@st.cache_resource
+def get_session_tokens():
+    return SessionTokens()
+
+def store_rehashed_password(username, old_hash):
+    # Runs on the hasher pool once the upgraded hash is ready; skipped if the
+    # password was reset in the meantime
+    def store(pw_hash):
+        get_user_store().replace_password(username, old_hash, pw_hash)
+    return store
 
 def register_form():
     st.subheader("Register New User")
@@ -113,11 +177,8 @@ def register_form():
     new_password = st.text_input("New Password", type="password")
     new_email = st.text_input("Email (optional)")
     is_admin = False
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM users")
-    user_count = cur.fetchone()[0]
-    conn.close()
+    users = get_user_store()
+    user_count = users.user_count()
     # Only allow admin registration if logged in as admin or first user
     if user_count == 0 or (st.session_state.get("authenticated") and st.session_state.get("role") == "admin"):
         is_admin = st.checkbox("Register as admin", value=(user_count == 0))
@@ -125,21 +186,18 @@ def register_form():
         if not new_username or not new_password:
             st.warning("Username and password required.")
             return
-        conn = get_db()
-        cur = conn.cursor()
-        cur.execute("SELECT username FROM users WHERE username=?", (new_username,))
-        if cur.fetchone():
+        if users.role(new_username) is not None:
+            st.error("Username already exists.")
+            return
+        pw_hash = get_password_hasher().hash_password(new_password)
+        role = "admin" if (user_count == 0 or is_admin) else "user"
+        if not users.create_user(new_username, pw_hash, new_email, role):
             st.error("Username already exists.")
         else:
-            pw_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
-            role = "admin" if (user_count == 0 or is_admin) else "user"
-            cur.execute("INSERT INTO users (username, password_hash, email, role) VALUES (?, ?, ?, ?)", (new_username, pw_hash, new_email, role))
-            conn.commit()
             log_action(new_username, "register", f"role={role}")
             if new_email:
                 send_email(new_email, "Welcome to MCP Client", f"Hello {new_username},\n\nYour account has been created.\nRole: {role}\n")
             st.success(f"Registration successful! You are registered as '{role}'. Please log in.")
-        conn.close()
     if st.button("Back to Login"):
         st.session_state["show_register"] = False
         st.experimental_rerun()
@@ -153,21 +211,18 @@ def password_reset_form():
         if not username or not new_password:
             st.warning("Username and new password required.")
             return
-        conn = get_db()
-        cur = conn.cursor()
-        cur.execute("SELECT username, email FROM users WHERE username=?", (username,))
-        row = cur.fetchone()
+        users = get_user_store()
+        row = users.get_user(username)
         if not row:
             st.error("Username does not exist.")
         else:
-            pw_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
-            cur.execute("UPDATE users SET password_hash=? WHERE username=?", (pw_hash, username))
-            conn.commit()
+            pw_hash = get_password_hasher().hash_password(new_password)
+            users.set_password(username, pw_hash)
+            get_session_tokens().revoke_user(username)
             log_action(username, "password_reset")
-            if row[1]:
-                send_email(row[1], "MCP Client Password Reset", f"Hello {username},\n\nYour password has been reset. If you did not request this, please contact support.")
+            if row[4]:
+                send_email(row[4], "MCP Client Password Reset", f"Hello {username},\n\nYour password has been reset. If you did not request this, please contact support.")
             st.success("Password reset successful! Please log in.")
-        conn.close()
 
 def login_form():
     import datetime
@@ -175,13 +230,11 @@ def login_form():
     username = st.text_input("Username")
     password = st.text_input("Password", type="password")
     if st.button("Login"):
-        conn = get_db()
-        cur = conn.cursor()
-        cur.execute("SELECT password_hash, role, failed_attempts, locked_until FROM users WHERE username=?", (username,))
-        row = cur.fetchone()
+        users = get_user_store()
+        row = users.get_user(username)
         now = datetime.datetime.now()
         if row:
-            pw_hash, role, failed_attempts, locked_until = row
+            pw_hash, role, failed_attempts, locked_until, _ = row
             # Check lockout
             if locked_until:
                 try:
@@ -191,12 +244,15 @@ def login_form():
                 if locked_until_dt and now < locked_until_dt:
                     mins = int((locked_until_dt - now).total_seconds() // 60) + 1
                     st.error(f"Account locked due to too many failed attempts. Try again in {mins} minutes.")
-                    conn.close()
                     return
-            if bcrypt.checkpw(password.encode(), pw_hash.encode()):
+            hasher = get_password_hasher()
+            if hasher.verify_password(password, pw_hash):
                 # Reset failed attempts
-                cur.execute("UPDATE users SET failed_attempts=0, locked_until=NULL WHERE username=?", (username,))
-                conn.commit()
+                users.reset_failed_logins(username)
+                # Upgrade hashes made with an older cost setting, off the login path
+                if hasher.needs_rehash(pw_hash):
+                    hasher.rehash_async(password, store_rehashed_password(username, pw_hash))
+                st.session_state["session_token"] = get_session_tokens().issue(username, role)
                 st.session_state["authenticated"] = True
                 st.session_state["username"] = username
                 st.session_state["role"] = role
@@ -207,18 +263,16 @@ def login_form():
                 lockout = False
                 if failed_attempts >= 5:
                     locked_until_dt = now + datetime.timedelta(minutes=10)
-                    cur.execute("UPDATE users SET failed_attempts=?, locked_until=? WHERE username=?", (failed_attempts, locked_until_dt.isoformat(), username))
+                    users.record_failed_login(username, failed_attempts, locked_until_dt.isoformat())
                     lockout = True
                 else:
-                    cur.execute("UPDATE users SET failed_attempts=? WHERE username=?", (failed_attempts, username))
-                conn.commit()
+                    users.record_failed_login(username, failed_attempts)
                 if lockout:
                     st.error("Account locked due to too many failed attempts. Try again in 10 minutes.")
                 else:
                     st.error(f"Invalid username or password. {5 - failed_attempts} attempts left before lockout.")
         else:
             st.error("Invalid username or password.")
-        conn.close()
     if st.button("Create an account"):
         st.session_state["show_register"] = True
         st.experimental_rerun()
@@ -241,6 +295,20 @@ if "authenticated" not in st.session_state:
 if "role" not in st.session_state:
     st.session_state["role"] = None
 
+# Reruns check the session token instead of re-verifying the password
+if st.session_state["authenticated"]:
+    session = get_session_tokens().validate(st.session_state.get("session_token"))
+    # Pick up role changes and deleted accounts (cached lookup, not a query per rerun)
+    role = get_user_store().role(session[0]) if session is not None else None
+    if role is None:
+        # Expired, or revoked by a password reset
+        for key in ["authenticated", "username", "role", "session_token"]:
+            st.session_state.pop(key, None)
+        st.session_state["authenticated"] = False
+        st.session_state["role"] = None
+    else:
+        st.session_state["username"], st.session_state["role"] = session[0], role
+
 if not st.session_state["authenticated"]:
     login_form()
     st.stop()
@@ -252,7 +320,8 @@ if st.session_state["authenticated"]:
     st.sidebar.markdown(f"**Role:** `{st.session_state['role']}`")
     if st.sidebar.button("Logout"):
         log_action(st.session_state["username"], "logout")
-        for key in ["authenticated", "username", "role", "conversation"]:
+        get_session_tokens().revoke(st.session_state.get("session_token"))
+        for key in ["authenticated", "username", "role", "conversation", "session_token"]:
             if key in st.session_state:
                 del st.session_state[key]
         st.experimental_rerun()
@@ -261,15 +330,35 @@ if st.session_state["authenticated"]:
 if st.session_state["authenticated"] and st.session_state["role"] == "admin":
     with st.sidebar.expander("Admin Panel", expanded=False):
         if st.button("List All Users"):
-            conn = get_db()
-            cur = conn.cursor()
-            cur.execute("SELECT username, role FROM users")
-            users = cur.fetchall()
-            conn.close()
+            users = get_user_store().list_users()
             log_action(st.session_state["username"], "admin_list_users")
             st.write("### Registered Users:")
             for u, r in users:
                 st.write(f"- {u} ({r})")
+        if st.button("Response Cache Stats"):
+            st.json(get_response_cache().stats())
+        if st.button("Generation Queue Stats"):
+            st.json(get_scheduler().stats())
+        if st.checkbox("Show Audit Log"):
+            audit_user = st.text_input("Filter by username", key="audit_user") or None
+            # Stack of (timestamp, id) cursors; the last one is the page being shown
+            if st.session_state.get("audit_filter") != audit_user:
+                st.session_state["audit_filter"] = audit_user
+                st.session_state["audit_cursors"] = [None]
+            audit_cursors = st.session_state.setdefault("audit_cursors", [None])
+            get_audit_log().flush(timeout=2)
+            with get_user_store().connection() as conn:
+                events, next_before = query_audit_log(conn, username=audit_user, before=audit_cursors[-1], limit=25)
+            st.dataframe(
+                [{"id": e[0], "username": e[1], "action": e[2], "timestamp": e[3], "details": e[4]} for e in events]
+            )
+            col_prev, col_next = st.columns(2)
+            if col_prev.button("Newer", disabled=len(audit_cursors) == 1):
+                audit_cursors.pop()
+                st.experimental_rerun()
+            if col_next.button("Older", disabled=next_before is None):
+                audit_cursors.append(next_before)
+                st.experimental_rerun()
 
 if "conversation" not in st.session_state:
     st.session_state["conversation"] = []  # List of (user, ai) tuples
@@ -281,36 +370,69 @@ if choice == "Ask AI":
         st.markdown(f"**AI:** {ai}")
         st.markdown("---")
     query = st.text_input("Enter your question:")
+    use_rag = st.checkbox("Answer from stored data (RAG)", value=False)
+    bypass_cache = st.checkbox("Bypass response cache", value=False)
     if st.button("Ask"):
-        # Build conversation context for the agent
-        context = "\n".join([f"User: {u}\nAI: {a}" for u, a in st.session_state["conversation"]])
-        prompt = f"{context}\nUser: {query}\nAI:"
+        # The agent fits history (and retrieved context) into a fixed token budget
+        conversation = list(st.session_state["conversation"])
+        # Admins jump the generation queue. Any rerun (e.g. pressing a button)
+        # stops this script, which cancels the generation if nobody else shares it.
+        priority = PRIORITY_ADMIN if st.session_state.get("role") == "admin" else PRIORITY_INTERACTIVE
         # Streaming support: if agent has 'stream_query', use it
         if hasattr(agent, "stream_query"):
             st.markdown("**AI Answer (streaming):**\n")
             response_placeholder = st.empty()
             streamed_answer = ""
+            stats = {}
             with st.spinner("Thinking..."):
-                for chunk in agent.stream_query(prompt):
+                for chunk in agent.stream_query(
+                    query, stats=stats, conversation=conversation, rag=use_rag, use_cache=not bypass_cache, priority=priority
+                ):
                     streamed_answer += chunk
                     # Advanced formatting: render markdown with code blocks, tables, images
                     response_placeholder.markdown(streamed_answer, unsafe_allow_html=True)
-            is_safe, guardrail_msg = guardrail_ai_response(streamed_answer)
-            if is_safe:
-                st.session_state["conversation"].append((query, streamed_answer))
+            if stats.get("ttft_s") is not None:
+                timing = (
+                    f"Retrieval {stats['retrieval_s']:.2f}s, first token after {stats['ttft_s']:.2f}s, "
+                    f"generation finished in {stats['total_s']:.2f}s, prompt ~{stats['prompt_tokens']} tokens"
+                )
+                if stats.get("queue_wait_s"):
+                    timing += f", queued {stats['queue_wait_s']:.2f}s"
+                if stats.get("cached"):
+                    timing += " (cached answer)"
+                elif stats.get("tokens_per_s"):
+                    timing += f" ({stats['tokens_per_s']:.1f} tokens/s)"
+                st.caption(timing)
+            # The agent checks the policy as chunks arrive and stops Ollama on a violation
+            if stats.get("guardrail"):
+                response_placeholder.empty()
+                st.warning(guardrail_message(stats["guardrail"]))
+            elif stats.get("error"):
+                # A partial answer from a failed generation is not kept as history
+                st.error(f"AI Error: {stats['error']}")
             else:
-                st.warning(guardrail_msg)
+                st.session_state["conversation"].append((query, streamed_answer))
         else:
             with st.spinner("Thinking..."):
-                result = agent.handle_query(prompt)
+                result = agent.handle_query(
+                    query, conversation=conversation, rag=use_rag, use_cache=not bypass_cache, priority=priority
+                )
             if "ai_response" in result:
-                if isinstance(result["ai_response"], dict) and "error" in result["ai_response"]:
+                if result.get("guardrail"):
+                    st.warning(guardrail_message(result["guardrail"]))
+                elif isinstance(result["ai_response"], dict) and "error" in result["ai_response"]:
                     st.error(f"AI Error: {result['ai_response']['error']}")
                 else:
                     is_safe, guardrail_msg = guardrail_ai_response(result["ai_response"])
                     if is_safe:
                         # Advanced formatting: render markdown with code blocks, tables, images
                         st.markdown(f"**AI Answer:**\n\n{guardrail_msg}", unsafe_allow_html=True)
+                        timings = result["timings"]
+                        st.caption(
+                            f"Retrieval {timings['retrieval_s']:.2f}s, generation {timings['generation_s']:.2f}s, "
+                            f"prompt ~{result['prompt_tokens']} tokens"
+                            + (" (cached answer)" if result.get("cached") else "")
+                        )
                         # Add to conversation history
                         st.session_state["conversation"].append((query, guardrail_msg))
                     else:
@@ -321,19 +443,39 @@ if choice == "Ask AI":
         st.session_state["conversation"] = []
 
 elif choice == "List Data":
-    data = agent.list_data()
+    page_size = st.selectbox("Rows per page", [25, 50, 100, 250, 500], index=2)
+    # Stack of after_id cursors; the last one is the page being shown
+    if st.session_state.get("list_page_size") != page_size:
+        st.session_state["list_page_size"] = page_size
+        st.session_state["list_cursors"] = [0]
+    cursors = st.session_state.setdefault("list_cursors", [0])
+    # One page per request; a page seen before is revalidated with its ETag
+    data = agent.list_page(after_id=cursors[-1], limit=page_size)
     if isinstance(data, dict) and "data" in data:
         st.dataframe(data["data"])
+        col_prev, col_page, col_next = st.columns(3)
+        col_page.caption(f"Page {len(cursors)}")
+        if col_prev.button("Previous page", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.experimental_rerun()
+        if col_next.button("Next page", disabled=data.get("next_after_id") is None):
+            cursors.append(data["next_after_id"])
+            st.experimental_rerun()
     else:
         st.write(data)
 
 elif choice == "Search Data":
     search_term = st.text_input("Search term:")
+    search_limit = st.number_input("Max results:", min_value=1, max_value=1000, value=50, step=10)
     if st.button("Search"):
         with st.spinner("Searching..."):
-            result = agent.search_data(search_term)
+            result = agent.search_data(search_term, limit=search_limit)
         if isinstance(result, dict) and "data" in result:
-            st.dataframe(result["data"])
+            if not result["data"]:
+                st.info("No matches.")
+            for row in result["data"]:
+                # Snippets carry <mark> highlights around the matched terms
+                st.markdown(f"**#{row['id']}** {row.get('snippet') or row['content']}", unsafe_allow_html=True)
         else:
             st.write(result)
 
@@ -350,3 +492,100 @@ elif choice == "Delete Data":
 # --- File Upload Feature ---
         result = agent.delete_data(data_id)
         st.write(result)
+
+elif choice == "Export Data":
+    export_format = st.selectbox("Format", ["csv", "ndjson", "parquet"])
+    export_compression = st.selectbox("Compression", ["none", "gzip", "zstd"])
+    col_min, col_max = st.columns(2)
+    export_min_id = col_min.number_input("From id", min_value=1, value=1, step=1)
+    export_max_id = col_max.number_input("To id (0 = last)", min_value=0, value=0, step=1)
+    export_query = st.text_input("Only rows matching (optional):")
+    if st.button("Prepare export"):
+        # The server streams in constant memory; spool to disk rather than RAM
+        previous = st.session_state.pop("export_file", None)
+        if previous and os.path.exists(previous):
+            os.unlink(previous)
+        export_file = tempfile.NamedTemporaryFile(prefix="mcp_export_", delete=False)
+        with export_file, st.spinner("Exporting..."):
+            result = agent.export_data(
+                export_file, fmt=export_format, compression=export_compression,
+                min_id=export_min_id, max_id=export_max_id or None, query=export_query or None,
+            )
+        if "error" in result:
+            os.unlink(export_file.name)
+            st.error(f"Export failed: {result['error']}")
+        else:
+            st.session_state["export_file"] = export_file.name
+            st.session_state["export_name"] = result["filename"]
+            st.success(f"Exported {result['bytes']:,} bytes.")
+    if st.session_state.get("export_file") and os.path.exists(st.session_state["export_file"]):
+        with open(st.session_state["export_file"], "rb") as f:
+            st.download_button("Download export", f, file_name=st.session_state["export_name"])
+    st.caption(f"Very large exports can be downloaded straight from {MCP_SERVER_URL}/export?format={export_format}&compression={export_compression}")
+
+elif choice == "File Upload":
+    st.markdown("Documents are split into overlapping chunks that search and RAG answers can use.")
+    uploads = st.file_uploader(
+        "Text, Markdown, PDF or Word documents", type=["txt", "md", "pdf", "docx"], accept_multiple_files=True
+    )
+    if uploads and st.button("Upload"):
+        for upload in uploads:
+            with st.spinner(f"Processing {upload.name}..."):
+                result = agent.upload_document(upload, filename=upload.name)
+            if result.get("status") != "success":
+                st.error(f"{upload.name}: {result.get('error') or result.get('detail')}")
+            elif result["duplicate"]:
+                st.info(f"{upload.name} is unchanged since it was uploaded as document #{result['document']['id']}.")
+            else:
+                log_action(st.session_state["username"], "upload_document", upload.name)
+                st.success(f"{upload.name}: {result['document']['chunk_count']} chunks stored.")
+    documents = agent.list_documents()
+    if documents.get("documents"):
+        st.markdown("### Documents")
+        st.dataframe(
+            [{k: d[k] for k in ("id", "filename", "kind", "size", "chunk_count", "created_at")} for d in documents["documents"]]
+        )
+        document_id = st.number_input("Document ID", min_value=1, step=1)
+        col_show, col_delete = st.columns(2)
+        if col_show.button("Show chunks"):
+            document = agent.read_document(document_id)
+            for chunk in document.get("chunks", []):
+                st.markdown(f"**#{chunk['id']}** (chars {chunk['char_start']}-{chunk['char_end']})")
+                st.text(chunk["content"])
+            if "error" in document:
+                st.error(document["error"])
+        if col_delete.button("Delete document"):
+            st.write(agent.delete_document(document_id))
+
+elif choice == "Import Data":
+    import_mode = st.radio("Source", ["Upload a file", "Local path"], horizontal=True)
+    if import_mode == "Upload a file":
+        import_source = st.file_uploader("CSV, JSONL or text file", type=["csv", "jsonl", "ndjson", "txt"])
+    else:
+        # Large files are streamed from disk; an interrupted import resumes where it stopped
+        import_source = st.text_input("Path to a CSV, JSONL or text file:").strip() or None
+        if import_source and not os.path.isfile(import_source):
+            st.error("File not found.")
+            import_source = None
+    import_format = st.selectbox("Format", ["auto", "csv", "jsonl", "text"])
+    import_column = st.text_input("CSV column / JSON field with the content", value="content")
+    import_resume = st.checkbox("Resume an interrupted import of this file", value=True)
+    if import_source is not None and st.button("Import"):
+        progress_bar = st.progress(0.0)
+
+        def show_progress(done, total):
+            progress_bar.progress(min(1.0, done / total) if total else 1.0)
+
+        result = agent.import_file(
+            import_source, fmt=None if import_format == "auto" else import_format,
+            column=import_column, resume=import_resume, progress=show_progress,
+        )
+        if result.get("status") == "success":
+            progress_bar.progress(1.0)
+            log_action(st.session_state["username"], "import_data", f"inserted={result['inserted']}")
+            st.success(
+                f"Imported {result['inserted']:,} rows ({result['duplicates']:,} duplicates skipped, "
+                f"{result['invalid']:,} invalid) at {result['rows_per_s']:,.0f} rows/s."
+            )
+        else:
+            st.error(f"Import failed: {result.get('error') or result.get('detail')}. Importing again resumes from the last committed chunk.")
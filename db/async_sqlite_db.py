@@ -0,0 +1,165 @@
+# Async SQLite DB integration module
+import asyncio
+import itertools
+import queue
+import threading
+import time
+
+from db.sqlite_db import DEFAULT_DB_PATH, DEFAULT_SEARCH_LIMIT, EXPORT_CHUNK_SIZE, MAX_PAGE_SIZE, SQLiteDB, connect
+
+
+def _resolve(future, result=None, error=None):
+    # The awaiting request may have been cancelled while the job ran.
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class _DBWorker(threading.Thread):
+    """Thread owning one connection and running jobs from its queue in order."""
+
+    def __init__(self, db_path, jobs, name, kind, observe=None):
+        super().__init__(name=name, daemon=True)
+        self.db_path = db_path
+        self.jobs = jobs
+        self.kind = kind
+        self.observe = observe
+
+    def run(self):
+        db = SQLiteDB(self.db_path, conn=connect(self.db_path))
+        statements = db.conn.statements = [] if self.observe is not None else None
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    return
+                fn, args, future, loop, queued = job
+                started = time.perf_counter()
+                error = None
+                try:
+                    result = fn(db, *args)
+                except BaseException as e:
+                    error = e
+                    loop.call_soon_threadsafe(_resolve, future, None, e)
+                else:
+                    loop.call_soon_threadsafe(_resolve, future, result)
+                if self.observe is not None:
+                    # Each distinct statement once, in the order first run
+                    statement = "+".join(dict.fromkeys(statements)) or "none"
+                    statements.clear()
+                    self.observe(
+                        self.kind, fn.__name__, statement, started - queued, time.perf_counter() - started,
+                        error is not None,
+                    )
+        finally:
+            db.close()
+
+
+class AsyncSQLiteDB:
+    """Non-blocking front end to SQLiteDB for async handlers.
+
+    Reads are spread over ``readers`` threads, each with its own connection.
+    All writes go through a single writer thread, so writers never contend
+    for the SQLite write lock. Each side accepts at most ``queue_size``
+    outstanding jobs; further callers wait without blocking the event loop.
+
+    ``observe(kind, op, statement, wait_s, run_s, failed)``, if given, is
+    called on the worker thread after every job; ``kind`` is "read" or
+    "write", ``op`` the SQLiteDB method name and ``statement`` the query
+    constants it executed, joined with "+" ("none" if it ran no known query).
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, readers=4, queue_size=256, observe=None):
+        self.db_path = db_path
+        # Run migrations once before any worker connects.
+        SQLiteDB(db_path).close()
+        self._read_jobs = queue.Queue()
+        self._write_jobs = queue.Queue()
+        self._read_slots = asyncio.Semaphore(queue_size)
+        self._write_slots = asyncio.Semaphore(queue_size)
+        self._readers = [
+            _DBWorker(db_path, self._read_jobs, f"sqlite-reader-{i}", "read", observe) for i in range(readers)
+        ]
+        self._writer = _DBWorker(db_path, self._write_jobs, "sqlite-writer", "write", observe)
+        for worker in itertools.chain(self._readers, [self._writer]):
+            worker.start()
+        self._closed = False
+
+    async def _submit(self, jobs, slots, fn, args):
+        if self._closed:
+            raise RuntimeError("Database is closed")
+        async with slots:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            jobs.put((fn, args, future, loop, time.perf_counter()))
+            return await future
+
+    async def read(self, fn, *args):
+        """Run ``fn(db, *args)`` on a reader connection."""
+        return await self._submit(self._read_jobs, self._read_slots, fn, args)
+
+    async def write(self, fn, *args):
+        """Run ``fn(db, *args)`` on the single writer connection."""
+        return await self._submit(self._write_jobs, self._write_slots, fn, args)
+
+    async def add_data(self, content):
+        return await self.write(SQLiteDB.add_data, content)
+
+    async def update_data(self, data_id, content):
+        return await self.write(SQLiteDB.update_data, data_id, content)
+
+    async def delete_data(self, data_id):
+        return await self.write(SQLiteDB.delete_data, data_id)
+
+    async def add_many(self, contents):
+        return await self.write(SQLiteDB.add_many, contents)
+
+    async def update_many(self, items):
+        return await self.write(SQLiteDB.update_many, items)
+
+    async def delete_many(self, ids):
+        return await self.write(SQLiteDB.delete_many, ids)
+
+    async def import_rows(self, contents, source=None, checkpoint=None):
+        return await self.write(SQLiteDB.import_rows, contents, source, checkpoint)
+
+    async def import_checkpoint(self, source):
+        return await self.read(SQLiteDB.import_checkpoint, source)
+
+    async def clear_import_checkpoint(self, source):
+        return await self.write(SQLiteDB.clear_import_checkpoint, source)
+
+    async def read_data(self, data_id):
+        return await self.read(SQLiteDB.read_data, data_id)
+
+    async def read_many(self, ids):
+        return await self.read(SQLiteDB.read_many, ids)
+
+    async def list_data(self, after_id=None, limit=None):
+        return await self.read(SQLiteDB.list_data, after_id, limit)
+
+    async def current_version(self):
+        return await self.read(SQLiteDB.current_version)
+
+    async def changes(self, since=0, limit=MAX_PAGE_SIZE):
+        return await self.read(SQLiteDB.changes, since, limit)
+
+    async def search_data(self, query, limit=DEFAULT_SEARCH_LIMIT):
+        return await self.read(SQLiteDB.search_data, query, limit)
+
+    async def export_page(self, after_id=0, max_id=None, query=None, limit=EXPORT_CHUNK_SIZE):
+        return await self.read(SQLiteDB.export_page, after_id, max_id, query, limit)
+
+    def close(self):
+        """Stop the workers after they finish the jobs already queued."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._readers:
+            self._read_jobs.put(None)
+        self._write_jobs.put(None)
+        for worker in itertools.chain(self._readers, [self._writer]):
+            worker.join()
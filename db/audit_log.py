@@ -0,0 +1,141 @@
+# Audit log module
+import atexit
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+
+from db.sqlite_db import connect
+
+CREATE_AUDIT_LOG_TABLE = """
+CREATE TABLE IF NOT EXISTS audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT,
+    action TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    details TEXT
+)
+"""
+CREATE_AUDIT_LOG_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS audit_log_username_timestamp ON audit_log (username, timestamp)",
+    "CREATE INDEX IF NOT EXISTS audit_log_timestamp ON audit_log (timestamp)",
+)
+INSERT_AUDIT_EVENT = "INSERT INTO audit_log (username, action, timestamp, details) VALUES (?, ?, ?, ?)"
+
+_STOP = object()
+
+
+def _utc_timestamp():
+    # Same format as SQLite's CURRENT_TIMESTAMP, taken when the event happens
+    # rather than when its batch is written.
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class AuditLogWriter:
+    """Queues audit events and writes them from a background thread.
+
+    ``log()`` only appends to an in-memory queue. The writer thread inserts
+    queued events in one transaction once ``batch_size`` are waiting or the
+    oldest has waited ``flush_interval`` seconds, and drains the queue on
+    ``close()``, which also runs at interpreter exit.
+    """
+
+    def __init__(self, db_path="users.db", batch_size=100, flush_interval=1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        conn = connect(db_path)
+        with conn:
+            conn.execute(CREATE_AUDIT_LOG_TABLE)
+            for index in CREATE_AUDIT_LOG_INDEXES:
+                conn.execute(index)
+        conn.close()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, username, action, details=None):
+        if self._closed:
+            raise RuntimeError("Audit log writer is closed")
+        self._queue.put((username, action, _utc_timestamp(), details))
+
+    def flush(self, timeout=None):
+        """Block until every event logged so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _write(self, conn, events):
+        if not events:
+            return
+        try:
+            with conn:
+                conn.executemany(INSERT_AUDIT_EVENT, events)
+        except sqlite3.Error as e:
+            print(f"Audit log write failed, dropped {len(events)} events: {e}")
+        events.clear()
+
+    def _run(self):
+        conn = connect(self.db_path)
+        pending = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if not pending else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    self._write(conn, pending)
+                    continue
+                if item is _STOP:
+                    self._write(conn, pending)
+                    return
+                if isinstance(item, threading.Event):
+                    self._write(conn, pending)
+                    item.set()
+                    continue
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append(item)
+                if len(pending) >= self.batch_size:
+                    self._write(conn, pending)
+        finally:
+            conn.close()
+
+
+def query_audit_log(conn, username=None, action=None, before=None, limit=50):
+    """One page of audit events, newest first.
+
+    ``before`` is the (timestamp, id) of the last row of the previous page.
+    Returns (rows, next_before), where next_before is None on the last page.
+    Pages are read straight off the (username, timestamp) or timestamp
+    index, so deep pages cost the same as the first.
+    """
+    clauses, params = [], []
+    if username is not None:
+        clauses.append("username = ?")
+        params.append(username)
+    if action is not None:
+        clauses.append("action = ?")
+        params.append(action)
+    if before is not None:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(
+        f"SELECT id, username, action, timestamp, details FROM audit_log {where} "
+        "ORDER BY timestamp DESC, id DESC LIMIT ?",
+        (*params, limit),
+    ).fetchall()
+    next_before = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+    return rows, next_before
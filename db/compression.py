@@ -0,0 +1,134 @@
+# Row content compression module
+#
+# With compression on, SQLiteDB stores row content as a BLOB:
+#
+#   codec (1 byte, 1 = zstd) | dictionary id (4 bytes, little-endian, 0 = none) | zstd frame
+#
+# Rows stored as TEXT are plain, so databases written before compression (or
+# with it off) read unchanged. Dictionaries are trained from stored rows and
+# kept in the compression_dicts table; a row names the dictionary it needs,
+# so rows written with older dictionaries stay readable. Decompression
+# happens per row as it is read: the data_text view calls the
+# decompress_content() SQL function each connection registers.
+import os
+import struct
+
+CODEC_ZSTD = 1
+HEADER = struct.Struct("<BI")
+
+# "zstd" compresses new rows and lets the server recompress old ones.
+COMPRESSION = os.environ.get("MCP_DB_COMPRESSION", "none")
+COMPRESSION_LEVEL = int(os.environ.get("MCP_DB_COMPRESSION_LEVEL", 3))
+DICTIONARY_SIZE = 64 * 1024
+# Rows sampled to train a dictionary, and the fewest worth training on.
+TRAINING_SAMPLES = 5000
+MIN_TRAINING_SAMPLES = 500
+# Shorter rows are not worth the header and the CPU.
+MIN_COMPRESS_BYTES = 64
+
+CREATE_COMPRESSION_DICTS = """
+CREATE TABLE IF NOT EXISTS compression_dicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dictionary BLOB NOT NULL,
+    samples INTEGER NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+SELECT_DICTIONARY = "SELECT dictionary FROM compression_dicts WHERE id = ?"
+LATEST_DICTIONARY = "SELECT id, dictionary FROM compression_dicts ORDER BY id DESC LIMIT 1"
+INSERT_DICTIONARY = "INSERT INTO compression_dicts (dictionary, samples) VALUES (?, ?)"
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Compressed rows require zstandard (pip install zstandard)")
+    return zstandard
+
+
+def dictionary_id(value):
+    """Dictionary a stored value was compressed with; None for plain text."""
+    if not isinstance(value, bytes):
+        return None
+    return HEADER.unpack_from(value)[1]
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """zstd dictionary bytes trained on ``samples`` (str), or None if too few."""
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        return None
+    zstandard = _zstd()
+    try:
+        return zstandard.train_dictionary(size, [sample.encode() for sample in samples]).as_bytes()
+    except zstandard.ZstdError as e:
+        print(f"dictionary training failed: {e}")
+        return None
+
+
+class ContentCodec:
+    """Encodes and decodes row content for one connection.
+
+    Compressors and decompressors are created on first use and cached per
+    dictionary; like the connection, a codec is used by one thread at a time.
+    """
+
+    def __init__(self, conn, level=COMPRESSION_LEVEL):
+        self.conn = conn
+        self.level = level
+        self._decompressors = {}
+        # (dictionary id, ZstdCompressor) used for new rows
+        self._compressor = None
+
+    def decode(self, value):
+        if not isinstance(value, bytes):
+            return value
+        codec, dict_id = HEADER.unpack_from(value)
+        if codec != CODEC_ZSTD:
+            raise ValueError(f"Unknown content codec {codec}")
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            decompressor = self._decompressors[dict_id] = self._make_decompressor(dict_id)
+        return decompressor.decompress(memoryview(value)[HEADER.size:]).decode()
+
+    def encode(self, text):
+        """BLOB for ``text``, or ``text`` itself when compressing does not pay."""
+        data = text.encode()
+        if len(data) < MIN_COMPRESS_BYTES:
+            return text
+        dict_id, compressor = self._compressor or self.use_dictionary(*self._latest_dictionary())
+        frame = compressor.compress(data)
+        if HEADER.size + len(frame) >= len(data):
+            return text
+        return HEADER.pack(CODEC_ZSTD, dict_id) + frame
+
+    def current_dictionary_id(self):
+        if self._compressor is None:
+            self.use_dictionary(*self._latest_dictionary())
+        return self._compressor[0]
+
+    def use_dictionary(self, dict_id, dictionary):
+        """Compress new rows with this dictionary (id 0: none)."""
+        zstandard = _zstd()
+        options = {"level": self.level, "write_checksum": False, "write_dict_id": False}
+        if dictionary is not None:
+            options["dict_data"] = zstandard.ZstdCompressionDict(dictionary)
+        self._compressor = (dict_id, zstandard.ZstdCompressor(**options))
+        return self._compressor
+
+    def refresh(self):
+        """Pick up a dictionary stored through another connection."""
+        self._compressor = None
+
+    def _latest_dictionary(self):
+        row = self.conn.execute(LATEST_DICTIONARY).fetchone()
+        return (row[0], row[1]) if row else (0, None)
+
+    def _make_decompressor(self, dict_id):
+        zstandard = _zstd()
+        if not dict_id:
+            return zstandard.ZstdDecompressor()
+        row = self.conn.execute(SELECT_DICTIONARY, (dict_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Compression dictionary {dict_id} is missing")
+        return zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(row[0]))
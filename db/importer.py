@@ -0,0 +1,259 @@
+# Bulk import module
+#
+#   python -m db.importer data.csv [more.jsonl ...] [--db mcp_data.db]
+#
+# Streams CSV, JSONL or plain-text files into the data table in large
+# transactions, skipping content that is already stored. Progress is
+# checkpointed with each transaction, so rerunning an interrupted import
+# continues after the last committed chunk.
+import argparse
+import codecs
+import csv
+import json
+import os
+import time
+
+from db.sqlite_db import DEFAULT_DB_PATH, SQLiteDB
+
+IMPORT_FORMATS = ("csv", "jsonl", "text")
+IMPORT_CHUNK_ROWS = 50000
+READ_BLOCK_SIZE = 1 << 20
+MAX_CONTENT_CHARS = 1_000_000
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "text"
+
+
+def source_key(name, size):
+    """Checkpoint key for a file; a changed size starts a fresh import."""
+    return f"{name}:{size}"
+
+
+def normalize_content(value):
+    """Cleaned-up row content, or None if the row should be rejected."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+    text = value.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "").strip()
+    if not text or len(text) > MAX_CONTENT_CHARS:
+        return None
+    return text
+
+
+class RowParser:
+    """Incremental parser: ``feed()`` raw bytes, get back row contents.
+
+    Only complete records are parsed; ``consumed`` is the number of bytes up
+    to the end of the last one, which is where a resumed import restarts.
+    CSV records may span lines inside quoted fields.
+    """
+
+    def __init__(self, fmt, column="content", header=None):
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format: {fmt}")
+        self.fmt = fmt
+        self.column = column
+        self.header = header
+        self.consumed = 0
+        self.invalid = 0
+        self._index = None if header is None else self._column_index(header)
+        self._tail = b""
+        self._record = []
+        self._record_bytes = 0
+        self._quotes = 0
+
+    def _column_index(self, header):
+        if self.column in header:
+            return header.index(self.column)
+        if len(header) == 1:
+            return 0
+        raise ValueError(f"CSV header has no '{self.column}' column: {header}")
+
+    def feed(self, data, final=False):
+        lines = (self._tail + data).split(b"\n")
+        self._tail = b"" if final else lines.pop()
+        rows = []
+        for number, raw in enumerate(lines):
+            # A final line without a trailing newline has no byte to skip
+            size = len(raw) + (0 if final and number == len(lines) - 1 else 1)
+            if self.consumed == 0 and not self._record and raw.startswith(codecs.BOM_UTF8):
+                raw = raw[len(codecs.BOM_UTF8):]
+            try:
+                line = raw.decode("utf-8").rstrip("\r")
+            except UnicodeDecodeError:
+                self.invalid += 1
+                self.consumed += size
+                continue
+            if self.fmt == "csv":
+                self._feed_csv_line(line, size, rows)
+                continue
+            self.consumed += size
+            if not line.strip():
+                continue
+            self._add(self._parse_json(line) if self.fmt == "jsonl" else line, rows)
+        if final and self._record:
+            # Unterminated quote at end of input
+            self.invalid += 1
+            self.consumed += self._record_bytes
+            self._record, self._record_bytes, self._quotes = [], 0, 0
+        return rows
+
+    def _feed_csv_line(self, line, size, rows):
+        self._record.append(line)
+        self._record_bytes += size
+        self._quotes += line.count('"')
+        if self._quotes % 2:
+            return  # a quoted field continues on the next line
+        text = "\n".join(self._record)
+        self.consumed += self._record_bytes
+        self._record, self._record_bytes, self._quotes = [], 0, 0
+        if not text.strip():
+            return
+        fields = next(csv.reader([text]))
+        if self.header is None:
+            self._index = self._column_index(fields)
+            self.header = fields
+            return
+        self._add(fields[self._index] if self._index < len(fields) else None, rows)
+
+    def _parse_json(self, line):
+        try:
+            value = json.loads(line)
+        except ValueError:
+            return None
+        return value.get(self.column) if isinstance(value, dict) else value
+
+    def _add(self, value, rows):
+        content = normalize_content(value)
+        if content is None:
+            self.invalid += 1
+        else:
+            rows.append(content)
+
+
+class ImportJob:
+    """Import state shared by the CLI and the /import endpoint.
+
+    Feed it bytes; whenever ``ready()`` is true, pass ``take()`` to
+    SQLiteDB.import_rows and report the result back with ``committed()``.
+    """
+
+    def __init__(self, fmt, source=None, column="content", checkpoint=None, chunk_rows=IMPORT_CHUNK_ROWS):
+        offset, header, read, inserted, duplicates, invalid = checkpoint or (0, None, 0, 0, 0, 0)
+        self.source = source
+        self.offset = offset
+        self.chunk_rows = chunk_rows
+        self.parser = RowParser(fmt, column, json.loads(header) if header else None)
+        # Totals from earlier runs, then what this run has seen
+        self._base = (read, inserted, duplicates, invalid)
+        self._valid = self._inserted = self._duplicates = 0
+        self._pending = []
+        self._taken = 0
+        self._started = time.perf_counter()
+
+    @property
+    def stats(self):
+        read, inserted, duplicates, invalid = self._base
+        return {
+            "read": read + self._valid + self.parser.invalid,
+            "inserted": inserted + self._inserted,
+            "duplicates": duplicates + self._duplicates,
+            "invalid": invalid + self.parser.invalid,
+        }
+
+    def feed(self, data, final=False):
+        rows = self.parser.feed(data, final)
+        self._pending.extend(rows)
+        self._valid += len(rows)
+
+    def ready(self):
+        return len(self._pending) >= self.chunk_rows
+
+    def take(self):
+        """(contents, source, checkpoint) arguments for SQLiteDB.import_rows."""
+        contents, self._pending = self._pending, []
+        self._taken = len(contents)
+        stats = self.stats
+        checkpoint = (
+            self.offset + self.parser.consumed,
+            json.dumps(self.parser.header) if self.parser.header is not None else None,
+            stats["read"],
+            stats["inserted"],
+            stats["duplicates"],
+            stats["invalid"],
+        )
+        return contents, self.source, checkpoint
+
+    def committed(self, inserted):
+        self._inserted += inserted
+        self._duplicates += self._taken - inserted
+
+    def result(self):
+        elapsed = time.perf_counter() - self._started
+        return {
+            **self.stats,
+            "resumed_from": self.offset,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self._valid / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def import_file(db, path, fmt=None, column="content", chunk_rows=IMPORT_CHUNK_ROWS, resume=True, progress=None):
+    """Import a local file, resuming from its checkpoint unless ``resume`` is
+    False. ``progress(stats, bytes_done, bytes_total)`` runs after each
+    committed chunk."""
+    fmt = fmt or detect_format(path)
+    size = os.path.getsize(path)
+    source = source_key(os.path.abspath(path), size)
+    if not resume:
+        db.clear_import_checkpoint(source)
+    job = ImportJob(fmt, source, column, db.import_checkpoint(source), chunk_rows)
+    with open(path, "rb") as f:
+        f.seek(job.offset)
+        while True:
+            data = f.read(READ_BLOCK_SIZE)
+            job.feed(data, final=not data)
+            if job.ready() or not data:
+                job.committed(db.import_rows(*job.take()))
+                if progress:
+                    progress(job.stats, job.offset + job.parser.consumed, size)
+            if not data:
+                break
+    db.clear_import_checkpoint(source)
+    return job.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import files into the data table")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--db", default=os.environ.get("MCP_DB_PATH", DEFAULT_DB_PATH))
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Default: from the file extension")
+    parser.add_argument("--column", default="content", help="CSV column / JSON field holding the content")
+    parser.add_argument("--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS)
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    def report(stats, done, total):
+        percent = 100 * done / total if total else 100
+        print(f"\r  {percent:5.1f}%  {stats['inserted']:,} inserted, {stats['duplicates']:,} duplicates, "
+              f"{stats['invalid']:,} invalid", end="", flush=True)
+
+    db = SQLiteDB(args.db)
+    try:
+        for path in args.paths:
+            print(path)
+            result = import_file(db, path, args.format, args.column, args.chunk_rows, not args.restart, report)
+            print(f"\n  done in {result['elapsed_s']}s ({result['rows_per_s']:,} rows/s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
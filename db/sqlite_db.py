@@ -1,25 +1,824 @@
-# SQLite DB integration skeleton
+# SQLite DB integration module
+import hashlib
+import json
+import re
 import sqlite3
 
+from db.compression import (
+    COMPRESSION,
+    CREATE_COMPRESSION_DICTS,
+    INSERT_DICTIONARY,
+    TRAINING_SAMPLES,
+    ContentCodec,
+    dictionary_id,
+)
+
+DEFAULT_DB_PATH = "mcp_data.db"
+
+# Pragmas applied to every connection we open. WAL lets readers run alongside
+# the single writer; synchronous=NORMAL is durable enough under WAL and saves
+# an fsync per commit.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Size of sqlite3's per-connection prepared statement cache. All queries below
+# are module-level constants so repeated calls hit the cache.
+STATEMENT_CACHE_SIZE = 256
+
+CREATE_DATA_TABLE = """
+CREATE TABLE IF NOT EXISTS data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content TEXT NOT NULL
+)
+"""
+CREATE_DATA_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS data_fts USING fts5(
+    content,
+    content='data',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+# Keep the external-content FTS index in step with the data table.
+DATA_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS data_fts_ai AFTER INSERT ON data BEGIN
+        INSERT INTO data_fts (rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS data_fts_ad AFTER DELETE ON data BEGIN
+        INSERT INTO data_fts (data_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS data_fts_au AFTER UPDATE OF content ON data BEGIN
+        INSERT INTO data_fts (data_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO data_fts (rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+)
+CREATE_EMBEDDINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    data_id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL
+)
+"""
+EMBEDDINGS_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS embeddings_ad AFTER DELETE ON data BEGIN
+    DELETE FROM embeddings WHERE data_id = old.id;
+END
+"""
+INSERT_DATA = "INSERT INTO data (content, content_hash) VALUES (?, ?)"
+# Skips content that is already stored; used by bulk imports.
+INSERT_DATA_UNIQUE = """
+INSERT INTO data (content, content_hash)
+SELECT ?, ?2 WHERE NOT EXISTS (SELECT 1 FROM data WHERE content_hash = ?2)
+"""
+SELECT_DATA = "SELECT content, version FROM data_text WHERE id = ?"
+UPDATE_DATA = "UPDATE data SET content = ?, content_hash = ? WHERE id = ?"
+DELETE_DATA = "DELETE FROM data WHERE id = ?"
+LAST_INSERT_ID = "SELECT last_insert_rowid()"
+EXISTING_IDS = "SELECT id FROM data WHERE id IN (SELECT value FROM json_each(?))"
+LIST_DATA = "SELECT id, content FROM data_text ORDER BY id ASC"
+LIST_DATA_PAGE = "SELECT id, content FROM data_text WHERE id > ? ORDER BY id ASC LIMIT ?"
+SEARCH_DATA_LIKE = "SELECT id, content FROM data_text WHERE content LIKE ? ORDER BY id ASC LIMIT ?"
+SEARCH_DATA_FTS = """
+SELECT data_text.id, data_text.content,
+       snippet(data_fts, 0, ?, ?, '...', ?) AS snippet,
+       bm25(data_fts) AS score
+FROM data_fts JOIN data_text ON data_text.id = data_fts.rowid
+WHERE data_fts MATCH ?
+ORDER BY score
+LIMIT ?
+"""
+# Keyset pages for /export: (after_id, max_id[, term], limit)
+EXPORT_PAGE = "SELECT id, content FROM data_text WHERE id > ? AND id <= ? ORDER BY id ASC LIMIT ?"
+EXPORT_PAGE_LIKE = "SELECT id, content FROM data_text WHERE id > ? AND id <= ? AND content LIKE ? ORDER BY id ASC LIMIT ?"
+EXPORT_PAGE_FTS = """
+SELECT data_text.id, data_text.content
+FROM data_fts JOIN data_text ON data_text.id = data_fts.rowid
+WHERE data_fts.rowid > ? AND data_fts.rowid <= ? AND data_fts MATCH ?
+ORDER BY data_fts.rowid
+LIMIT ?
+"""
+READ_MANY = "SELECT id, content FROM data_text WHERE id IN (SELECT value FROM json_each(?))"
+# Skip rows deleted while their embedding was being computed.
+STORE_EMBEDDING = """
+INSERT OR REPLACE INTO embeddings (data_id, model, vector)
+SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM data WHERE id = ?)
+"""
+LIST_EMBEDDINGS = "SELECT data_id, vector FROM embeddings WHERE model = ? AND data_id > ? ORDER BY data_id LIMIT ?"
+MISSING_EMBEDDINGS = """
+SELECT data_text.id, data_text.content FROM data_text
+LEFT JOIN embeddings ON embeddings.data_id = data_text.id AND embeddings.model = ?
+WHERE embeddings.data_id IS NULL AND data_text.id > ?
+ORDER BY data_text.id
+LIMIT ?
+"""
+CREATE_IMPORT_CHECKPOINTS = """
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    source TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    header TEXT,
+    read INTEGER NOT NULL DEFAULT 0,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    invalid INTEGER NOT NULL DEFAULT 0
+)
+"""
+SELECT_IMPORT_CHECKPOINT = """
+SELECT offset, header, read, inserted, duplicates, invalid FROM import_checkpoints WHERE source = ?
+"""
+SAVE_IMPORT_CHECKPOINT = """
+INSERT OR REPLACE INTO import_checkpoints (source, offset, header, read, inserted, duplicates, invalid)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+DELETE_IMPORT_CHECKPOINT = "DELETE FROM import_checkpoints WHERE source = ?"
+CREATE_DOCUMENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    sha256 TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+# Chunk text lives in the data table, so search, semantic search, RAG and
+# export all see it; this table links each of those rows to its document.
+CREATE_CHUNKS_TABLE = """
+CREATE TABLE IF NOT EXISTS chunks (
+    data_id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents (id),
+    seq INTEGER NOT NULL,
+    char_start INTEGER NOT NULL,
+    char_end INTEGER NOT NULL
+)
+"""
+CREATE_CHUNKS_INDEX = "CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document_id, seq)"
+CHUNKS_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON data BEGIN
+    DELETE FROM chunks WHERE data_id = old.id;
+END
+"""
+INSERT_DOCUMENT = "INSERT INTO documents (filename, sha256, size, kind, chunk_count) VALUES (?, ?, ?, ?, ?)"
+INSERT_CHUNK = "INSERT INTO chunks (data_id, document_id, seq, char_start, char_end) VALUES (?, ?, ?, ?, ?)"
+SELECT_DOCUMENT = "SELECT id, filename, sha256, size, kind, chunk_count, created_at FROM documents WHERE id = ?"
+SELECT_DOCUMENT_BY_HASH = "SELECT id, filename, sha256, size, kind, chunk_count, created_at FROM documents WHERE sha256 = ?"
+LIST_DOCUMENTS_PAGE = """
+SELECT id, filename, sha256, size, kind, chunk_count, created_at FROM documents WHERE id > ? ORDER BY id LIMIT ?
+"""
+DOCUMENT_CHUNKS = """
+SELECT chunks.data_id, chunks.seq, chunks.char_start, chunks.char_end, data_text.content
+FROM chunks JOIN data_text ON data_text.id = chunks.data_id
+WHERE chunks.document_id = ?
+ORDER BY chunks.seq
+"""
+DELETE_DOCUMENT_DATA = "DELETE FROM data WHERE id IN (SELECT data_id FROM chunks WHERE document_id = ?)"
+DELETE_DOCUMENT = "DELETE FROM documents WHERE id = ?"
+# Every insert, update and delete of a data row takes the next value of one
+# counter, so "what changed since version N" is an index range scan. Deleted
+# ids are kept as tombstones; AUTOINCREMENT ids are never reused.
+CREATE_CHANGE_COUNTER = "CREATE TABLE IF NOT EXISTS change_counter (id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL)"
+CREATE_TOMBSTONES_TABLE = """
+CREATE TABLE IF NOT EXISTS data_tombstones (
+    data_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+)
+"""
+VERSION_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS data_by_version ON data (version)",
+    "CREATE INDEX IF NOT EXISTS data_tombstones_by_version ON data_tombstones (version)",
+)
+VERSION_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS data_version_ai AFTER INSERT ON data BEGIN
+        UPDATE change_counter SET version = version + 1;
+        UPDATE data SET version = (SELECT version FROM change_counter) WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS data_version_au AFTER UPDATE OF content ON data BEGIN
+        UPDATE change_counter SET version = version + 1;
+        UPDATE data SET version = (SELECT version FROM change_counter) WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS data_version_ad AFTER DELETE ON data BEGIN
+        UPDATE change_counter SET version = version + 1;
+        INSERT OR REPLACE INTO data_tombstones (data_id, version) SELECT old.id, version FROM change_counter;
+    END
+    """,
+)
+CURRENT_VERSION = "SELECT version FROM change_counter"
+# Rows changed after a version, oldest change first; content is NULL for a
+# deleted row.
+CHANGES_SINCE = """
+SELECT id, content, version FROM data_text WHERE version > ?1
+UNION ALL
+SELECT data_id, NULL, version FROM data_tombstones WHERE version > ?1
+ORDER BY version
+LIMIT ?2
+"""
+# Reads go through the data_text view. Until compression is first turned on
+# it is the data table as is, so the file stays usable from any SQLite
+# client. Once it is on, stored content is TEXT or a compressed BLOB (see
+# db.compression) and the view decompresses only the rows a query returns,
+# through the decompress_content() function SQLiteDB connections register.
+def _plain(column):
+    return f"CASE WHEN typeof({column}) = 'blob' THEN decompress_content({column}) ELSE {column} END"
+
+
+CREATE_PLAIN_DATA_TEXT_VIEW = """
+CREATE VIEW data_text AS
+SELECT id, content, content_hash, version FROM data
+"""
+CREATE_DATA_TEXT_VIEW = f"""
+CREATE VIEW data_text AS
+SELECT id, {_plain("content")} AS content, content_hash, version FROM data
+"""
+# The FTS index reads plain text from the view. Rewriting a row in another
+# encoding keeps its content_hash, so it neither re-indexes nor counts as a
+# change.
+CREATE_DATA_TEXT_FTS = """
+CREATE VIRTUAL TABLE data_fts USING fts5(
+    content,
+    content='data_text',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+DATA_TEXT_FTS_TRIGGERS = (
+    f"""
+    CREATE TRIGGER data_fts_ai AFTER INSERT ON data BEGIN
+        INSERT INTO data_fts (rowid, content) VALUES (new.id, {_plain("new.content")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER data_fts_ad AFTER DELETE ON data BEGIN
+        INSERT INTO data_fts (data_fts, rowid, content) VALUES ('delete', old.id, {_plain("old.content")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER data_fts_au AFTER UPDATE OF content ON data
+    WHEN old.content_hash IS NOT new.content_hash BEGIN
+        INSERT INTO data_fts (data_fts, rowid, content) VALUES ('delete', old.id, {_plain("old.content")});
+        INSERT INTO data_fts (rowid, content) VALUES (new.id, {_plain("new.content")});
+    END
+    """,
+)
+VERSION_UPDATE_TRIGGER = """
+CREATE TRIGGER data_version_au AFTER UPDATE OF content ON data
+WHEN old.content_hash IS NOT new.content_hash BEGIN
+    UPDATE change_counter SET version = version + 1;
+    UPDATE data SET version = (SELECT version FROM change_counter) WHERE id = new.id;
+END
+"""
+DICTIONARY_SAMPLES = """
+SELECT content FROM data_text WHERE id IN (SELECT id FROM data ORDER BY random() LIMIT ?)
+"""
+RAW_DATA_PAGE = "SELECT id, content, content_hash FROM data WHERE id > ? ORDER BY id ASC LIMIT ?"
+# Only if the row still holds the same text as when it was read
+STORE_ENCODED = "UPDATE data SET content = ? WHERE id = ? AND content_hash = ?"
+COMPRESSION_STATS = """
+SELECT typeof(content) = 'blob', count(*), sum(length(CAST(content AS BLOB))) FROM data GROUP BY 1
+"""
+HAS_DATA_FTS = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'data_fts'"
+HAS_COMPRESSED_SCHEMA = """
+SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = 'data_text' AND sql LIKE '%decompress_content%'
+"""
+HAS_COMPRESSED_ROWS = "SELECT 1 FROM data WHERE typeof(content) = 'blob' LIMIT 1"
+
+SNIPPET_MARKERS = ("<mark>", "</mark>")
+SNIPPET_TOKENS = 16
+DEFAULT_SEARCH_LIMIT = 50
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 10000
+STREAM_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 5000
+MAX_ROW_ID = 2**63 - 1
+
+
+def content_digest(content):
+    """128-bit hash of a row's content, indexed to find duplicates."""
+    return hashlib.blake2b(content.encode(), digest_size=16).digest()
+
+
+def fts5_available(conn):
+    """Whether this SQLite build was compiled with (or can load) FTS5."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def fts_match_expression(query):
+    """Turn free text into a safe FTS5 query.
+
+    Every word is quoted so FTS5 operators in user input are taken literally,
+    and the last word is a prefix match so results follow the user's typing.
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def like_snippet(content, query, width=60):
+    """Rough equivalent of FTS5 snippet() for the LIKE fallback."""
+    start = content.lower().find(query.lower())
+    if start < 0 or not query:
+        return content[:width * 2]
+    end = start + len(query)
+    prefix = "..." if start > width else ""
+    suffix = "..." if end + width < len(content) else ""
+    return (
+        prefix + content[max(0, start - width):start]
+        + SNIPPET_MARKERS[0] + content[start:end] + SNIPPET_MARKERS[1]
+        + content[end:end + width] + suffix
+    )
+
+
+def _create_data_table(conn):
+    conn.execute(CREATE_DATA_TABLE)
+
+
+def _create_data_fts(conn):
+    # Builds without FTS5 keep working on the LIKE fallback.
+    if not fts5_available(conn):
+        return
+    conn.execute(CREATE_DATA_FTS)
+    for trigger in DATA_FTS_TRIGGERS:
+        conn.execute(trigger)
+    # Backfill rows that were stored before the index existed.
+    conn.execute("INSERT INTO data_fts (data_fts) VALUES ('rebuild')")
+
+
+def _create_embeddings(conn):
+    conn.execute(CREATE_EMBEDDINGS_TABLE)
+    conn.execute(EMBEDDINGS_TRIGGER)
+
+
+def _add_content_hash(conn):
+    conn.execute("ALTER TABLE data ADD COLUMN content_hash BLOB")
+    conn.create_function("content_digest", 1, content_digest, deterministic=True)
+    conn.execute("UPDATE data SET content_hash = content_digest(content)")
+    conn.execute("CREATE INDEX IF NOT EXISTS data_content_hash ON data (content_hash)")
+    conn.execute(CREATE_IMPORT_CHECKPOINTS)
+
+
+def _create_documents(conn):
+    conn.execute(CREATE_DOCUMENTS_TABLE)
+    conn.execute(CREATE_CHUNKS_TABLE)
+    conn.execute(CREATE_CHUNKS_INDEX)
+    conn.execute(CHUNKS_TRIGGER)
+
+
+def _add_row_versions(conn):
+    conn.execute("ALTER TABLE data ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    conn.execute(CREATE_CHANGE_COUNTER)
+    conn.execute(CREATE_TOMBSTONES_TABLE)
+    # Existing rows count as changed in id order
+    conn.execute("UPDATE data SET version = id")
+    conn.execute("INSERT INTO change_counter (id, version) SELECT 0, coalesce(max(id), 0) FROM data")
+    for statement in VERSION_INDEXES + VERSION_TRIGGERS:
+        conn.execute(statement)
+
+
+def _use_plain_schema(conn):
+    conn.execute("DROP VIEW IF EXISTS data_text")
+    conn.execute(CREATE_PLAIN_DATA_TEXT_VIEW)
+    if conn.execute(HAS_DATA_FTS).fetchone() is None:
+        return
+    for trigger in ("data_fts_ai", "data_fts_ad", "data_fts_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE data_fts")
+    conn.execute(CREATE_DATA_FTS)
+    for trigger in DATA_FTS_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute("INSERT INTO data_fts (data_fts) VALUES ('rebuild')")
+
+
+def _use_compressed_schema(conn):
+    conn.execute("DROP VIEW IF EXISTS data_text")
+    conn.execute(CREATE_DATA_TEXT_VIEW)
+    if conn.execute(HAS_DATA_FTS).fetchone() is None:
+        return
+    # An FTS5 table's content table is fixed at creation, so repoint the
+    # index at the view by recreating it.
+    for trigger in ("data_fts_ai", "data_fts_ad", "data_fts_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE data_fts")
+    conn.execute(CREATE_DATA_TEXT_FTS)
+    for trigger in DATA_TEXT_FTS_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute("INSERT INTO data_fts (data_fts) VALUES ('rebuild')")
+
+
+def _add_content_compression(conn):
+    # The compressed schema waits for SQLiteDB.enable_compression()
+    conn.execute(CREATE_COMPRESSION_DICTS)
+    conn.execute(CREATE_PLAIN_DATA_TEXT_VIEW)
+    conn.execute("DROP TRIGGER IF EXISTS data_version_au")
+    conn.execute(VERSION_UPDATE_TRIGGER)
+
+
+def _plain_schema_while_uncompressed(conn):
+    # Databases migrated when the compressed schema was unconditional
+    if conn.execute(HAS_COMPRESSED_SCHEMA).fetchone() and not conn.execute(HAS_COMPRESSED_ROWS).fetchone():
+        _use_plain_schema(conn)
+
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have run against a database file.
+MIGRATIONS = (
+    _create_data_table,
+    _create_data_fts,
+    _create_embeddings,
+    _add_content_hash,
+    _create_documents,
+    _add_row_versions,
+    _add_content_compression,
+    _plain_schema_while_uncompressed,
+)
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Bring the schema up to date; cheap no-op once it is."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(migrations):
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have migrated while we waited for the lock.
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, step in enumerate(migrations[version:], start=version + 1):
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# Name of each query constant above by its SQL, so timings can be labelled
+# with the statement a job actually ran (e.g. SEARCH_DATA_FTS vs
+# SEARCH_DATA_LIKE) rather than only the method that ran it.
+STATEMENT_NAMES = {
+    sql: name
+    for name, sql in list(globals().items())
+    if name.isupper() and isinstance(sql, str) and sql.split(None, 1)[:1] in (["SELECT"], ["INSERT"], ["UPDATE"], ["DELETE"])
+}
+
+
+def _add_codec(conn):
+    codec = ContentCodec(conn)
+    conn.create_function("decompress_content", 1, codec.decode, deterministic=True)
+    return codec
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3 connection that can read compressed rows (``codec``).
+
+    Set ``statements`` to a list to have the name of every known query it
+    executes appended to it (see STATEMENT_NAMES).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.codec = _add_codec(self)
+        self.statements = None
+
+    def execute(self, sql, *args):
+        if self.statements is not None and sql in STATEMENT_NAMES:
+            self.statements.append(STATEMENT_NAMES[sql])
+        return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        if self.statements is not None and sql in STATEMENT_NAMES:
+            self.statements.append(STATEMENT_NAMES[sql])
+        return super().executemany(sql, *args)
+
+
+def connect(db_path=DEFAULT_DB_PATH, check_same_thread=True):
+    """Open a tuned sqlite3 connection."""
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=check_same_thread,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=Connection,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
 class SQLiteDB:
-    def __init__(self, db_path="mcp_data.db"):
-        self.conn = sqlite3.connect(db_path)
-        self.create_table()
+    def __init__(self, db_path=DEFAULT_DB_PATH, conn=None, compression=COMPRESSION):
+        # Pooled connections come in with the schema already in place.
+        if conn is None:
+            self.conn = connect(db_path)
+        else:
+            self.conn = conn
+        # Plain sqlite3 connections get a codec here
+        self.codec = getattr(self.conn, "codec", None) or _add_codec(self.conn)
+        if conn is None:
+            self.create_table()
+        self.has_fts = self.conn.execute(HAS_DATA_FTS).fetchone() is not None
+        # "zstd" stores new and rewritten rows compressed; any connection
+        # reads both forms.
+        self.compress = False
+        if compression == "zstd":
+            self.enable_compression()
+
+    def enable_compression(self):
+        """Compress new and rewritten rows, switching the database over to the
+        compressed schema the first time. After that, plain SQLite clients can
+        no longer read or write the data table."""
+        if self.conn.execute(HAS_COMPRESSED_SCHEMA).fetchone() is None:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.conn.execute(HAS_COMPRESSED_SCHEMA).fetchone() is None:
+                    _use_compressed_schema(self.conn)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        self.compress = True
+
+    def _encode(self, content):
+        return self.codec.encode(content) if self.compress else content
+
+    def _row(self, content):
+        return self._encode(content), content_digest(content)
 
     def create_table(self):
-        with self.conn:
-            self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                content TEXT NOT NULL
-            )
-            """)
+        migrate(self.conn)
 
     def add_data(self, content):
         with self.conn:
-            self.conn.execute("INSERT INTO data (content) VALUES (?)", (content,))
+            cur = self.conn.execute(INSERT_DATA, self._row(content))
+        return cur.lastrowid
 
     def read_data(self, data_id):
-        cur = self.conn.cursor()
-        cur.execute("SELECT content FROM data WHERE id = ?", (data_id,))
-        return cur.fetchone()
+        """(content, version) of one row, or None."""
+        return self.conn.execute(SELECT_DATA, (data_id,)).fetchone()
+
+    def update_data(self, data_id, content):
+        with self.conn:
+            cur = self.conn.execute(UPDATE_DATA, (*self._row(content), data_id))
+        return cur.rowcount
+
+    def delete_data(self, data_id):
+        with self.conn:
+            cur = self.conn.execute(DELETE_DATA, (data_id,))
+        return cur.rowcount
+
+    def add_many(self, contents):
+        """Insert all rows in one transaction; returns their ids in order."""
+        contents = list(contents)
+        if not contents:
+            return []
+        with self.conn:
+            self.conn.executemany(INSERT_DATA, (self._row(content) for content in contents))
+            last_id = self.conn.execute(LAST_INSERT_ID).fetchone()[0]
+        # AUTOINCREMENT ids are consecutive within a transaction as long as
+        # nobody else writes, which the single-writer setup guarantees.
+        first_id = last_id - len(contents) + 1
+        return list(range(first_id, last_id + 1))
+
+    def import_rows(self, contents, source=None, checkpoint=None):
+        """Insert the contents not already stored, in one transaction.
+
+        With ``source`` set, ``checkpoint`` (offset, header, read, inserted,
+        duplicates, invalid) is saved in the same transaction, so a resumed
+        import restarts exactly after the last committed chunk. Returns the
+        number of rows inserted.
+        """
+        with self.conn:
+            cur = self.conn.executemany(INSERT_DATA_UNIQUE, (self._row(content) for content in contents))
+            inserted = max(cur.rowcount, 0)
+            if source is not None:
+                offset, header, read, total_inserted, duplicates, invalid = checkpoint
+                self.conn.execute(
+                    SAVE_IMPORT_CHECKPOINT,
+                    (source, offset, header, read, total_inserted + inserted,
+                     duplicates + len(contents) - inserted, invalid),
+                )
+        return inserted
+
+    def import_checkpoint(self, source):
+        """(offset, header, read, inserted, duplicates, invalid) or None."""
+        return self.conn.execute(SELECT_IMPORT_CHECKPOINT, (source,)).fetchone()
+
+    def clear_import_checkpoint(self, source):
+        with self.conn:
+            self.conn.execute(DELETE_IMPORT_CHECKPOINT, (source,))
+
+    def find_document(self, sha256):
+        return self.conn.execute(SELECT_DOCUMENT_BY_HASH, (sha256,)).fetchone()
+
+    def read_document(self, document_id):
+        return self.conn.execute(SELECT_DOCUMENT, (document_id,)).fetchone()
+
+    def list_documents(self, after_id=0, limit=DEFAULT_PAGE_SIZE):
+        return self.conn.execute(LIST_DOCUMENTS_PAGE, (after_id, limit)).fetchall()
+
+    def document_chunks(self, document_id):
+        """(data_id, seq, char_start, char_end, content) rows in document order."""
+        return self.conn.execute(DOCUMENT_CHUNKS, (document_id,)).fetchall()
+
+    def add_document(self, filename, sha256, size, kind, chunks):
+        """Store a document and its (text, char_start, char_end) chunks in one
+        transaction; returns (document_id, data ids of the chunks)."""
+        with self.conn:
+            document_id = self.conn.execute(INSERT_DOCUMENT, (filename, sha256, size, kind, len(chunks))).lastrowid
+            self.conn.executemany(INSERT_DATA, (self._row(text) for text, _, _ in chunks))
+            last_id = self.conn.execute(LAST_INSERT_ID).fetchone()[0]
+            data_ids = list(range(last_id - len(chunks) + 1, last_id + 1)) if chunks else []
+            self.conn.executemany(
+                INSERT_CHUNK,
+                ((data_id, document_id, seq, start, end)
+                 for seq, (data_id, (_, start, end)) in enumerate(zip(data_ids, chunks))),
+            )
+        return document_id, data_ids
+
+    def delete_document(self, document_id):
+        """Delete a document and its chunk rows; returns the data ids removed."""
+        with self.conn:
+            data_ids = [row[0] for row in self.conn.execute(DOCUMENT_CHUNKS, (document_id,))]
+            self.conn.execute(DELETE_DOCUMENT_DATA, (document_id,))
+            deleted = self.conn.execute(DELETE_DOCUMENT, (document_id,)).rowcount
+        return data_ids if deleted else None
+
+    def _existing_ids(self, ids):
+        return {row[0] for row in self.conn.execute(EXISTING_IDS, (json.dumps(ids),))}
+
+    def update_many(self, items):
+        """Apply (id, content) updates in one transaction; rows affected per item."""
+        items = list(items)
+        if not items:
+            return []
+        with self.conn:
+            existing = self._existing_ids([data_id for data_id, _ in items])
+            self.conn.executemany(UPDATE_DATA, ((*self._row(content), data_id) for data_id, content in items))
+        return [1 if data_id in existing else 0 for data_id, _ in items]
+
+    def delete_many(self, ids):
+        """Delete ids in one transaction; rows affected per id."""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self.conn:
+            existing = self._existing_ids(ids)
+            self.conn.executemany(DELETE_DATA, ((data_id,) for data_id in ids))
+        counts = []
+        for data_id in ids:
+            # A repeated id only deletes the first time round.
+            counts.append(1 if data_id in existing else 0)
+            existing.discard(data_id)
+        return counts
+
+    def list_data(self, after_id=None, limit=None):
+        """Rows in id order; with ``limit`` set, one keyset page after ``after_id``."""
+        if limit is None and after_id is None:
+            return self.conn.execute(LIST_DATA).fetchall()
+        if limit is None:
+            limit = -1  # SQLite treats a negative LIMIT as unbounded
+        return self.conn.execute(LIST_DATA_PAGE, (after_id or 0, limit)).fetchall()
+
+    def current_version(self):
+        """Version of the latest change to the data table; 0 before any."""
+        return self.conn.execute(CURRENT_VERSION).fetchone()[0]
+
+    def changes(self, since=0, limit=MAX_PAGE_SIZE):
+        """(current version, rows) where rows are up to ``limit`` (id, content,
+        version) changes after ``since`` in version order; content is None
+        for a deleted row. Only the latest change to each row is kept."""
+        current = self.current_version()
+        return current, self.conn.execute(CHANGES_SINCE, (since, limit)).fetchall()
+
+    def export_page(self, after_id=0, max_id=None, query=None, limit=EXPORT_CHUNK_SIZE):
+        """Next ``limit`` rows with after_id < id <= max_id, in id order,
+        optionally only those matching ``query``."""
+        bounds = (after_id, MAX_ROW_ID if max_id is None else max_id)
+        if not query:
+            return self.conn.execute(EXPORT_PAGE, (*bounds, limit)).fetchall()
+        expression = fts_match_expression(query) if self.has_fts else None
+        if expression is not None:
+            return self.conn.execute(EXPORT_PAGE_FTS, (*bounds, expression, limit)).fetchall()
+        return self.conn.execute(EXPORT_PAGE_LIKE, (*bounds, f"%{query}%", limit)).fetchall()
+
+    def read_many(self, ids):
+        """{id: content} for the given ids that exist."""
+        return dict(self.conn.execute(READ_MANY, (json.dumps(list(ids)),)).fetchall())
+
+    def store_embeddings(self, model, rows):
+        """Persist (data_id, vector_blob) pairs computed with ``model``.
+
+        Returns the ids actually stored; rows deleted meanwhile are skipped.
+        """
+        stored = []
+        with self.conn:
+            for data_id, blob in rows:
+                if self.conn.execute(STORE_EMBEDDING, (data_id, model, blob, data_id)).rowcount:
+                    stored.append(data_id)
+        return stored
+
+    def list_embeddings(self, model, after_id=0, limit=STREAM_CHUNK_SIZE):
+        return self.conn.execute(LIST_EMBEDDINGS, (model, after_id, limit)).fetchall()
+
+    def missing_embeddings(self, model, after_id=0, limit=STREAM_CHUNK_SIZE):
+        """Rows with no stored embedding for ``model`` yet."""
+        return self.conn.execute(MISSING_EMBEDDINGS, (model, after_id, limit)).fetchall()
+
+    def iter_data(self, after_id=0, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield every row after ``after_id`` while holding at most one chunk."""
+        while True:
+            rows = self.list_data(after_id=after_id, limit=chunk_size)
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1][0]
+
+    def search_data(self, query, limit=DEFAULT_SEARCH_LIMIT):
+        """Ranked search returning (id, content, snippet, score) rows.
+
+        Uses the FTS5 index with BM25 ranking (lower score is better) when it
+        exists, otherwise a LIKE scan in id order with score None.
+        """
+        expression = fts_match_expression(query) if self.has_fts else None
+        if expression is not None:
+            return self.conn.execute(
+                SEARCH_DATA_FTS,
+                (*SNIPPET_MARKERS, SNIPPET_TOKENS, expression, limit),
+            ).fetchall()
+        rows = self.conn.execute(SEARCH_DATA_LIKE, (f"%{query}%", limit)).fetchall()
+        return [(row[0], row[1], like_snippet(row[1], query), None) for row in rows]
+
+    def dictionary_samples(self, limit=TRAINING_SAMPLES):
+        """Content of up to ``limit`` random rows, to train a dictionary on."""
+        return [row[0] for row in self.conn.execute(DICTIONARY_SAMPLES, (limit,))]
+
+    def current_dictionary_id(self):
+        """Dictionary new rows are compressed with; 0 for none."""
+        self.codec.refresh()
+        return self.codec.current_dictionary_id()
+
+    def add_dictionary(self, dictionary, samples):
+        """Store a trained dictionary and compress new rows with it; returns its id."""
+        with self.conn:
+            dict_id = self.conn.execute(INSERT_DICTIONARY, (dictionary, samples)).lastrowid
+        self.codec.use_dictionary(dict_id, dictionary)
+        return dict_id
+
+    def encode_page(self, after_id=0, limit=STREAM_CHUNK_SIZE):
+        """Re-encode the next ``limit`` rows for the current dictionary.
+
+        Returns (last id read or None at the end, [(encoded, id, content_hash)]
+        for rows whose stored form changes), ready for store_encoded(). Meant
+        for a reader connection, so the CPU work stays off the writer.
+        """
+        codec = self.codec
+        codec.refresh()
+        current = codec.current_dictionary_id() if self.compress else None
+        rows = self.conn.execute(RAW_DATA_PAGE, (after_id, limit)).fetchall()
+        updates = []
+        for data_id, stored, content_hash in rows:
+            if dictionary_id(stored) == current:
+                continue
+            encoded = self._encode(codec.decode(stored))
+            if encoded != stored:
+                updates.append((encoded, data_id, content_hash))
+        return (rows[-1][0] if len(rows) == limit else None), updates
+
+    def store_encoded(self, updates):
+        """Write encode_page() results, skipping rows changed since; returns rows written."""
+        with self.conn:
+            return max(self.conn.executemany(STORE_ENCODED, updates).rowcount, 0)
+
+    def compression_stats(self):
+        """Row counts and stored bytes, plain and compressed (scans the table)."""
+        stats = {"plain_rows": 0, "plain_bytes": 0, "compressed_rows": 0, "compressed_bytes": 0}
+        for compressed, count, size in self.conn.execute(COMPRESSION_STATS):
+            kind = "compressed" if compressed else "plain"
+            stats[f"{kind}_rows"], stats[f"{kind}_bytes"] = count, size or 0
+        return stats
+
+    def close(self):
+        self.conn.close()
+
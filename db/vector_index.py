@@ -0,0 +1,94 @@
+# Vector index module
+import threading
+
+import numpy as np
+
+
+def encode_vector(vector):
+    """float32 bytes for storage in the embeddings BLOB column."""
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode_vector(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class VectorIndex:
+    """In-memory matrix of unit vectors answering top-k cosine queries.
+
+    Rows live in one contiguous float32 array that grows by doubling, so a
+    query is a single matrix-vector product. Upserts overwrite in place and
+    removals move the last row into the gap; nothing is ever rebuilt.
+    """
+
+    def __init__(self, dim=None, capacity=1024):
+        self.dim = dim
+        self._capacity = capacity
+        self._matrix = None if dim is None else np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _ensure_capacity(self, needed):
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:len(self._rows)] = self._matrix[:len(self._rows)]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:len(self._rows)] = self._ids[:len(self._rows)]
+        self._matrix, self._ids, self._capacity = matrix, ids, capacity
+
+    def upsert(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+            self._ensure_capacity(len(self._rows) + len(ids))
+            for data_id, vector in zip(ids, vectors):
+                row = self._rows.get(data_id)
+                if row is None:
+                    row = len(self._rows)
+                    self._rows[data_id] = row
+                    self._ids[row] = data_id
+                self._matrix[row] = vector
+
+    def remove(self, ids):
+        with self._lock:
+            for data_id in ids:
+                row = self._rows.pop(data_id, None)
+                if row is None:
+                    continue
+                last = len(self._rows)
+                if row != last:
+                    moved_id = int(self._ids[last])
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = moved_id
+                    self._rows[moved_id] = row
+
+    def search(self, query, k=10):
+        """[(id, cosine similarity)] for the ``k`` nearest rows, best first."""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        with self._lock:
+            count = len(self._rows)
+            if count == 0 or k <= 0:
+                return []
+            scores = self._matrix[:count] @ query
+            ids = self._ids[:count].copy()
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
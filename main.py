@@ -1,6 +1,5 @@
 # Entry point for MCP Client project
 from agent.llama_agent import LlamaAgent
-from db.sqlite_db import SQLiteDB
 
 
 def main():
@@ -0,0 +1,140 @@
+# Document ingestion module
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from db.sqlite_db import SQLiteDB
+
+CHUNK_CHARS = int(os.environ.get("MCP_CHUNK_CHARS", 1000))
+CHUNK_OVERLAP = int(os.environ.get("MCP_CHUNK_OVERLAP", 200))
+INGEST_WORKERS = int(os.environ.get("MCP_INGEST_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_DOCUMENT_BYTES = 100 * 1024 * 1024
+
+DOCUMENT_KINDS = {
+    ".txt": "text",
+    ".text": "text",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".pdf": "pdf",
+    ".docx": "docx",
+}
+# Preferred places to end a chunk, best first.
+_BREAKS = ("\n\n", "\n", ". ", "? ", "! ", " ")
+
+
+def document_kind(filename):
+    kind = DOCUMENT_KINDS.get(os.path.splitext(filename)[1].lower())
+    if kind is None:
+        raise ValueError(f"Unsupported document type: {filename} (expected {', '.join(DOCUMENT_KINDS)})")
+    return kind
+
+
+def extract_text(data, kind):
+    if kind in ("text", "markdown"):
+        return data.decode("utf-8", errors="replace")
+    if kind == "pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError("PDF ingestion requires pypdf (pip install pypdf)")
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages)
+    try:
+        import docx
+    except ImportError:
+        raise RuntimeError("DOCX ingestion requires python-docx (pip install python-docx)")
+    return "\n\n".join(paragraph.text for paragraph in docx.Document(io.BytesIO(data)).paragraphs)
+
+
+def chunk_text(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """Split text into (chunk, char_start, char_end) triples.
+
+    Chunks hold at most ``size`` characters and repeat the last ``overlap``
+    characters of the previous chunk. Each chunk ends at the best paragraph,
+    sentence or word break in its second half, if there is one.
+    """
+    chunks = []
+    start, length = 0, len(text)
+    while start < length:
+        end = min(length, start + size)
+        if end < length:
+            window = text[start:end]
+            for mark in _BREAKS:
+                cut = window.rfind(mark, size // 2)
+                if cut != -1:
+                    end = start + cut + len(mark)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append((chunk, start, end))
+        if end >= length:
+            break
+        # Step back by the overlap, then forward to the next word start
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return chunks
+
+
+def extract_chunks(data, filename, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """(kind, chunks) for an uploaded file; runs in a worker process."""
+    kind = document_kind(filename)
+    text = extract_text(data, kind)
+    text = re.sub(r"\n{3,}", "\n\n", text.replace("\r\n", "\n").replace("\x00", ""))
+    return kind, chunk_text(text, size, overlap)
+
+
+class DocumentIngestor:
+    """Extracts and chunks uploads on a process pool, off the event loop.
+
+    The pool is started on first use. Files are identified by their SHA-256,
+    so uploading an unchanged file again returns the stored document
+    without extracting anything.
+    """
+
+    def __init__(self, db, workers=INGEST_WORKERS, chunk_chars=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+        self.db = db
+        self.workers = workers
+        self.chunk_chars = chunk_chars
+        self.overlap = overlap
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: never fork a process that is running database threads
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def ingest(self, filename, data):
+        """(document row, data ids of new chunks, duplicate flag)."""
+        document_kind(filename)
+        sha256 = hashlib.sha256(data).hexdigest()
+        existing = await self.db.read(SQLiteDB.find_document, sha256)
+        if existing is not None:
+            return existing, [], True
+        loop = asyncio.get_running_loop()
+        try:
+            kind, chunks = await loop.run_in_executor(
+                self._executor(), extract_chunks, data, filename, self.chunk_chars, self.overlap
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            self._pool = None
+            raise
+        try:
+            document_id, data_ids = await self.db.write(
+                SQLiteDB.add_document, os.path.basename(filename), sha256, len(data), kind, chunks
+            )
+        except sqlite3.IntegrityError:
+            # The same file finished uploading concurrently
+            return await self.db.read(SQLiteDB.find_document, sha256), [], True
+        return await self.db.read(SQLiteDB.read_document, document_id), data_ids, False
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
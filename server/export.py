@@ -0,0 +1,174 @@
+# Data export module
+import csv
+import io
+import json
+import zlib
+
+from db.sqlite_db import EXPORT_CHUNK_SIZE
+
+# Rows buffered per Parquet row group before it is written out.
+PARQUET_ROW_GROUP = 20000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+class CSVEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(("id", "content"))
+
+    def encode(self, rows):
+        self._writer.writerows(rows)
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text.encode()
+
+    def finish(self):
+        # The header is still buffered if no row matched
+        return self.encode(())
+
+
+class NDJSONEncoder:
+    def encode(self, rows):
+        return "".join(json.dumps({"id": row[0], "content": row[1]}) + "\n" for row in rows).encode()
+
+    def finish(self):
+        return b""
+
+
+class _ByteSink:
+    """Write-only file object that hands back whatever was written since
+    the last ``take()``; lets ParquetWriter stream without a temp file."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ParquetEncoder:
+    """Streams a Parquet file one row group at a time (needs pyarrow)."""
+
+    def __init__(self, compression="none", row_group_size=PARQUET_ROW_GROUP):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._schema = pa.schema([("id", pa.int64()), ("content", pa.string())])
+        self._sink = _ByteSink()
+        # Parquet compresses its own pages; "none" still gets snappy.
+        codec = {"none": "snappy", "gzip": "gzip", "zstd": "zstd"}[compression]
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression=codec)
+        self.row_group_size = row_group_size
+        self._ids = []
+        self._contents = []
+
+    def _write_group(self):
+        if self._ids:
+            table = self._pa.table({"id": self._ids, "content": self._contents}, schema=self._schema)
+            self._writer.write_table(table)
+            self._ids, self._contents = [], []
+        return self._sink.take()
+
+    def encode(self, rows):
+        for data_id, content in rows:
+            self._ids.append(data_id)
+            self._contents.append(content)
+        if len(self._ids) >= self.row_group_size:
+            return self._write_group()
+        return b""
+
+    def finish(self):
+        data = self._write_group()
+        self._writer.close()
+        return data + self._sink.take()
+
+
+class _Passthrough:
+    def compress(self, data):
+        return data
+
+    def flush(self):
+        return b""
+
+
+def make_compressor(compression):
+    if compression == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires zstandard (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return _Passthrough()
+
+
+def make_export(fmt, compression="none"):
+    """(encoder, compressor, media_type, filename) for an export request.
+
+    Raises ValueError for unknown options and RuntimeError when the optional
+    package a format or codec needs is not installed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    media_type, extension = FORMATS[fmt]
+    if fmt == "parquet":
+        # Compression happens inside the file; the result stays a plain .parquet
+        return ParquetEncoder(compression), _Passthrough(), media_type, f"data.{extension}"
+    encoder = CSVEncoder() if fmt == "csv" else NDJSONEncoder()
+    if compression != "none":
+        media_type = "application/gzip" if compression == "gzip" else "application/zstd"
+    return encoder, make_compressor(compression), media_type, f"data.{extension}{COMPRESSIONS[compression]}"
+
+
+async def export_chunks(db, encoder, compressor, min_id=1, max_id=None, query=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encoded, compressed bytes for every matching row, one keyset chunk at
+    a time, so memory stays flat whatever the table size."""
+    after_id = min_id - 1
+    while True:
+        rows = await db.export_page(after_id, max_id, query, chunk_size)
+        if rows:
+            data = compressor.compress(encoder.encode(rows))
+            if data:
+                yield data
+        if len(rows) < chunk_size:
+            break
+        after_id = rows[-1][0]
+    data = compressor.compress(encoder.finish()) + compressor.flush()
+    if data:
+        yield data
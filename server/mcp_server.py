@@ -1,136 +1,555 @@
-from fastapi import FastAPI, Request, Query
-from typing import Optional
+# MCP Server module
+import asyncio
+import json
+import os
+import sqlite3
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Any, List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from db.sqlite_db import SQLiteDB
 
-app = FastAPI()
+from db.async_sqlite_db import AsyncSQLiteDB
+from db.importer import IMPORT_CHUNK_ROWS, IMPORT_FORMATS, ImportJob
+from server.documents import MAX_DOCUMENT_BYTES, DocumentIngestor
+from server.export import COMPRESSIONS, FORMATS, export_chunks, make_export
+from server.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, SamplingProfiler, observe_db_job
+from server.recompression import Recompressor
+from server.semantic import SemanticIndex, make_embedder
+from db.sqlite_db import (
+    DEFAULT_DB_PATH,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SEARCH_LIMIT,
+    EXPORT_CHUNK_SIZE,
+    MAX_BATCH_SIZE,
+    MAX_PAGE_SIZE,
+    STREAM_CHUNK_SIZE,
+    SQLiteDB,
+)
+
+DB_PATH = os.environ.get("MCP_DB_PATH", DEFAULT_DB_PATH)
+DB_READERS = int(os.environ.get("MCP_DB_READERS", 4))
+DB_QUEUE_SIZE = int(os.environ.get("MCP_DB_QUEUE_SIZE", 256))
+ENABLE_PROFILER = os.environ.get("MCP_ENABLE_PROFILER", "0") == "1"
+
+
+async def _warm_up(app):
+    # Optional subsystems; the server takes requests while these load, and
+    # one failing to start leaves the others running
+    try:
+        await app.state.recompressor.start()
+    except Exception as e:
+        print(f"recompression failed to start: {e}")
+        app.state.recompressor.status["state"] = "error"
+    try:
+        await app.state.semantic.start()
+    except Exception as e:
+        print(f"semantic index failed to load: {e}")
+        app.state.semantic.state = "error"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.db = AsyncSQLiteDB(
+        DB_PATH, readers=DB_READERS, queue_size=DB_QUEUE_SIZE, observe=observe_db_job
+    )
+    app.state.semantic = SemanticIndex(app.state.db, make_embedder())
+    app.state.documents = DocumentIngestor(app.state.db)
+    app.state.recompressor = Recompressor(app.state.db)
+    app.state.warm_up = asyncio.create_task(_warm_up(app))
+    yield
+    app.state.warm_up.cancel()
+    await asyncio.gather(app.state.warm_up, return_exceptions=True)
+    await app.state.recompressor.stop()
+    await app.state.semantic.stop()
+    app.state.documents.close()
+    profiler.stop()
+    await asyncio.to_thread(app.state.db.close)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+profiler = SamplingProfiler()
+
+
+async def get_db(request: Request):
+    """The app-wide async database, shared by every request."""
+    return request.app.state.db
+
+
+async def get_semantic(request: Request):
+    return request.app.state.semantic
+
+
+async def get_documents(request: Request):
+    return request.app.state.documents
+
+
+def _etag(version):
+    return f'W/"{version}"'
+
+
+def _not_modified(request, etag):
+    """304 response if the client's If-None-Match already has ``etag``."""
+    header = request.headers.get("if-none-match")
+    if header and (header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
 
 class UpdateDataRequest(BaseModel):
     id: int
     content: str
 
 @app.put("/update_data")
-def update_data(req: UpdateDataRequest):
-    db = SQLiteDB()
-    conn = db.conn
-    with conn:
-        cur = conn.execute("UPDATE data SET content = ? WHERE id = ?", (req.content, req.id))
-    return {"status": "success", "rows_affected": cur.rowcount}
+async def update_data(
+    req: UpdateDataRequest,
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    rows_affected = await db.update_data(req.id, req.content)
+    if rows_affected:
+        semantic.schedule_upsert([(req.id, req.content)])
+    return {"status": "success", "rows_affected": rows_affected}
 
 @app.delete("/delete_data/{data_id}")
-def delete_data(data_id: int):
-    db = SQLiteDB()
-    conn = db.conn
-    with conn:
-        cur = conn.execute("DELETE FROM data WHERE id = ?", (data_id,))
-    return {"status": "success", "rows_affected": cur.rowcount}
+async def delete_data(
+    data_id: int,
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    rows_affected = await db.delete_data(data_id)
+    if rows_affected:
+        semantic.schedule_remove([data_id])
+    return {"status": "success", "rows_affected": rows_affected}
 
 @app.get("/search_data")
-def search_data(q: str = Query(..., description="Search term")):
-    db = SQLiteDB()
-    conn = db.conn
-    cur = conn.cursor()
-    cur.execute("SELECT id, content FROM data WHERE content LIKE ? ORDER BY id ASC", (f"%{q}%",))
-    rows = cur.fetchall()
-    return {"data": [{"id": row[0], "content": row[1]} for row in rows]}
+async def search_data(
+    q: str = Query(..., description="Search term"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=1000, description="Maximum number of results"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    rows = await db.search_data(q, limit=limit)
+    return {
+        "data": [
+            {"id": row[0], "content": row[1], "snippet": row[2], "score": row[3]}
+            for row in rows
+        ]
+    }
+
+@app.get("/semantic_search")
+async def semantic_search(
+    q: str = Query(..., description="Natural language query"),
+    k: int = Query(10, ge=1, le=100, description="Number of nearest rows"),
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    if semantic.state == "loading":
+        return {"error": "Semantic index is still loading; try again shortly"}
+    if semantic.state == "error":
+        return {"error": "Semantic index failed to load; see the server log"}
+    try:
+        hits = await semantic.search(q, k)
+    except Exception as e:
+        return {"error": f"Embedding failed: {e}"}
+    contents = await db.read_many([data_id for data_id, _ in hits])
+    return {
+        "data": [
+            {"id": data_id, "content": contents[data_id], "score": score}
+            for data_id, score in hits
+            if data_id in contents
+        ]
+    }
 
 @app.get("/list_data")
-def list_data():
-    db = SQLiteDB()
-    conn = db.conn
-    cur = conn.cursor()
-    cur.execute("SELECT id, content FROM data ORDER BY id ASC")
-    rows = cur.fetchall()
-    return {"data": [{"id": row[0], "content": row[1]} for row in rows]}
+async def list_data(
+    request: Request,
+    response: Response,
+    after_id: int = Query(0, ge=0, description="Return rows with id greater than this"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    # The table's version is the ETag of every page: unchanged table, unchanged
+    # page. Read it before the rows so a concurrent write can only make the
+    # tag older than the page, never newer.
+    etag = _etag(await db.current_version())
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    rows = await db.list_data(after_id=after_id, limit=limit)
+    # Pass next_after_id back as after_id to fetch the following page.
+    next_after_id = rows[-1][0] if len(rows) == limit else None
+    response.headers["ETag"] = etag
+    return {
+        "data": [{"id": row[0], "content": row[1]} for row in rows],
+        "next_after_id": next_after_id,
+    }
+
+@app.get("/changes")
+async def changes(
+    since: int = Query(0, ge=0, description="Version the client already has; 0 for everything"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_BATCH_SIZE, description="Maximum changes per response"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    """Rows added, updated or deleted after version ``since``.
+
+    Pass the returned ``version`` as ``since`` next time; while ``more`` is
+    true there are further changes to fetch straight away. ``reset`` means
+    ``since`` is from another database and the client must start over
+    from 0.
+    """
+    current, rows = await db.changes(since=since, limit=limit)
+    if since > current:
+        return {"version": 0, "changes": [], "deleted": [], "more": False, "reset": True}
+    more = len(rows) == limit
+    # Rows written after ``current`` was read may already be in the page
+    version = rows[-1][2] if more else max(current, rows[-1][2] if rows else 0)
+    return {
+        "version": version,
+        "changes": [{"id": row[0], "content": row[1], "version": row[2]} for row in rows if row[1] is not None],
+        "deleted": [row[0] for row in rows if row[1] is None],
+        "more": more,
+        "reset": False,
+    }
+
+@app.get("/list_data/stream")
+async def list_data_stream(
+    after_id: int = Query(0, ge=0, description="Stream rows with id greater than this"),
+    chunk_size: int = Query(STREAM_CHUNK_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Rows read per cursor chunk"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    """Stream the data table as NDJSON, one {"id", "content"} object per line."""
+
+    async def generate():
+        cursor = after_id
+        while True:
+            # Each chunk is a separate read job, so a slow client never
+            # pins a reader connection.
+            rows = await db.list_data(after_id=cursor, limit=chunk_size)
+            if rows:
+                yield "".join(json.dumps({"id": row[0], "content": row[1]}) + "\n" for row in rows)
+            if len(rows) < chunk_size:
+                return
+            cursor = rows[-1][0]
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.get("/export")
+async def export_data(
+    format: str = Query("csv", description=f"One of: {', '.join(FORMATS)}"),
+    compression: str = Query("none", description=f"One of: {', '.join(COMPRESSIONS)}"),
+    min_id: int = Query(1, ge=1, description="Lowest id to export"),
+    max_id: Optional[int] = Query(None, ge=1, description="Highest id to export"),
+    q: Optional[str] = Query(None, description="Only rows matching this search term"),
+    chunk_size: int = Query(EXPORT_CHUNK_SIZE, ge=1, le=50000, description="Rows read per cursor chunk"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    """Stream the data table as a file download in constant memory."""
+    try:
+        encoder, compressor, media_type, filename = make_export(format, compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return StreamingResponse(
+        export_chunks(db, encoder, compressor, min_id=min_id, max_id=max_id, query=q, chunk_size=chunk_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/ready")
+async def ready(request: Request):
+    """200 as soon as the database is open, before optional subsystems have
+    warmed up; "degraded" once one of them has failed."""
+    state = request.app.state
+    subsystems = {
+        "database": "ready",
+        "semantic": state.semantic.state,
+        "recompression": state.recompressor.status["state"],
+    }
+    return {
+        "status": "degraded" if "error" in subsystems.values() else "ready",
+        "subsystems": subsystems,
+    }
 
 @app.get("/tools")
-def get_tools():
+async def get_tools():
     return {"tools": ["add_data", "read_data"]}
 
 class AddDataRequest(BaseModel):
     content: str
 
 @app.post("/add_data")
-def add_data(req: AddDataRequest):
-    db = SQLiteDB()
-    db.add_data(req.content)
-    return {"status": "success"}
+async def add_data(
+    req: AddDataRequest,
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    data_id = await db.add_data(req.content)
+    semantic.schedule_upsert([(data_id, req.content)])
+    return {"status": "success", "id": data_id}
 
 @app.get("/read_data/{data_id}")
-def read_data(data_id: int):
-    db = SQLiteDB()
-    result = db.read_data(data_id)
+async def read_data(data_id: int, request: Request, response: Response, db: AsyncSQLiteDB = Depends(get_db)):
+    result = await db.read_data(data_id)
     if result:
+        etag = _etag(result[1])
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        response.headers["ETag"] = etag
         return {"content": result[0]}
     return {"error": "Not found"}
-from fastapi import FastAPI, Request, Query
-from typing import Optional
-class UpdateDataRequest(BaseModel):
+
+
+# --- Batch writes ---
+class DeleteDataItem(BaseModel):
     id: int
-    content: str
 
-@app.put("/update_data")
-def update_data(req: UpdateDataRequest):
-    db = SQLiteDB()
-    conn = db.conn
-    with conn:
-        cur = conn.execute("UPDATE data SET content = ? WHERE id = ?", (req.content, req.id))
-    return {"status": "success", "rows_affected": cur.rowcount}
+class BatchRequest(BaseModel):
+    # Items are validated one by one so a bad item only fails itself.
+    items: List[Any]
 
-@app.delete("/delete_data/{data_id}")
-def delete_data(data_id: int):
-    db = SQLiteDB()
-    conn = db.conn
-    with conn:
-        cur = conn.execute("DELETE FROM data WHERE id = ?", (data_id,))
-    return {"status": "success", "rows_affected": cur.rowcount}
 
-@app.get("/search_data")
-def search_data(q: str = Query(..., description="Search term")):
-    db = SQLiteDB()
-    conn = db.conn
-    cur = conn.cursor()
-    cur.execute("SELECT id, content FROM data WHERE content LIKE ? ORDER BY id ASC", (f"%{q}%",))
-    rows = cur.fetchall()
-    return {"data": [{"id": row[0], "content": row[1]} for row in rows]}
-
-# MCP Server skeleton using FastAPI
-from fastapi import FastAPI, Request
-from pydantic import BaseModel
+def _validate_batch(model, items):
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} items per batch")
+    valid, results = [], [None] * len(items)
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Each item must be a JSON object")
+            valid.append((index, model(**item)))
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+    return valid, results
 
-from db.sqlite_db import SQLiteDB
 
-app = FastAPI()
+async def _run_batch(valid, results, apply, describe):
+    """Apply the valid items in one transaction and fill in their results."""
+    try:
+        outcomes = await apply([item for _, item in valid]) if valid else []
+    except sqlite3.Error as e:
+        # The transaction rolled back, so none of the valid items took effect.
+        for index, _ in valid:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+    else:
+        for (index, _), outcome in zip(valid, outcomes):
+            results[index] = {"index": index, "status": "success", **describe(outcome)}
+    failed = sum(1 for result in results if result["status"] == "error")
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
 
-@app.get("/list_data")
-def list_data():
-    db = SQLiteDB()
-    conn = db.conn
-    cur = conn.cursor()
-    cur.execute("SELECT id, content FROM data ORDER BY id ASC")
-    rows = cur.fetchall()
-    return {"data": [{"id": row[0], "content": row[1]} for row in rows]}
 
-@app.get("/tools")
-def get_tools():
-    return {"tools": ["add_data", "read_data"]}
+@app.post("/batch/add_data")
+async def batch_add_data(
+    req: BatchRequest,
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    valid, results = _validate_batch(AddDataRequest, req.items)
 
+    async def apply(items):
+        ids = await db.add_many([item.content for item in items])
+        semantic.schedule_upsert([(data_id, item.content) for data_id, item in zip(ids, items)])
+        return ids
 
-class AddDataRequest(BaseModel):
-    content: str
+    return await _run_batch(valid, results, apply, lambda data_id: {"id": data_id})
 
+@app.post("/batch/update_data")
+async def batch_update_data(
+    req: BatchRequest,
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    valid, results = _validate_batch(UpdateDataRequest, req.items)
 
-@app.post("/add_data")
-def add_data(req: AddDataRequest):
-    db = SQLiteDB()
-    db.add_data(req.content)
+    async def apply(items):
+        counts = await db.update_many([(item.id, item.content) for item in items])
+        semantic.schedule_upsert([(item.id, item.content) for item, count in zip(items, counts) if count])
+        return counts
+
+    return await _run_batch(valid, results, apply, lambda rows_affected: {"rows_affected": rows_affected})
+
+@app.post("/batch/delete_data")
+async def batch_delete_data(
+    req: BatchRequest,
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    valid, results = _validate_batch(DeleteDataItem, req.items)
+
+    async def apply(items):
+        counts = await db.delete_many([item.id for item in items])
+        semantic.schedule_remove([item.id for item, count in zip(items, counts) if count])
+        return counts
+
+    return await _run_batch(valid, results, apply, lambda rows_affected: {"rows_affected": rows_affected})
+
+
+# --- Bulk import ---
+@app.get("/import/checkpoint")
+async def import_checkpoint(
+    source: str = Query(..., description="Client-chosen name of the file being imported"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    """Where an interrupted import of ``source`` should resume (0 if fresh)."""
+    row = await db.import_checkpoint(source)
+    if row is None:
+        return {"source": source, "offset": 0}
+    offset, _, read, inserted, duplicates, invalid = row
+    return {
+        "source": source, "offset": offset,
+        "read": read, "inserted": inserted, "duplicates": duplicates, "invalid": invalid,
+    }
+
+@app.delete("/import/checkpoint")
+async def discard_import_checkpoint(
+    source: str = Query(..., description="Client-chosen name of the file being imported"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    """Forget a saved position so the next upload of ``source`` starts over."""
+    await db.clear_import_checkpoint(source)
     return {"status": "success"}
 
+@app.post("/import")
+async def import_data(
+    request: Request,
+    format: str = Query(..., description=f"One of: {', '.join(IMPORT_FORMATS)}"),
+    source: Optional[str] = Query(None, description="Name to checkpoint under, so the upload can resume"),
+    offset: int = Query(0, ge=0, description="Byte offset of the body within the source file"),
+    column: str = Query("content", description="CSV column / JSON field holding the content"),
+    chunk_rows: int = Query(IMPORT_CHUNK_ROWS, ge=1, le=500000, description="Rows per transaction"),
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    """Import a raw CSV/JSONL/text request body, parsed as it arrives."""
+    checkpoint = await db.import_checkpoint(source) if source else None
+    expected = checkpoint[0] if checkpoint else 0
+    if offset != expected:
+        return JSONResponse(
+            status_code=409,
+            content={"error": f"Upload must resume at byte {expected}", "offset": expected},
+        )
+    try:
+        job = ImportJob(format, source, column, checkpoint, chunk_rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        async for data in request.stream():
+            job.feed(data)
+            if job.ready():
+                job.committed(await db.import_rows(*job.take()))
+        job.feed(b"", final=True)
+        job.committed(await db.import_rows(*job.take()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if job.stats["inserted"]:
+            semantic.schedule_backfill()
+    if source:
+        await db.clear_import_checkpoint(source)
+    return {"status": "success", **job.result()}
 
-@app.get("/read_data/{data_id}")
-def read_data(data_id: int):
-    db = SQLiteDB()
-    result = db.read_data(data_id)
-    if result:
-        return {"content": result[0]}
-    return {"error": "Not found"}
+
+# --- Documents ---
+def _document(row):
+    return {
+        "id": row[0], "filename": row[1], "sha256": row[2], "size": row[3],
+        "kind": row[4], "chunk_count": row[5], "created_at": row[6],
+    }
+
+@app.post("/documents")
+async def upload_document(
+    request: Request,
+    filename: str = Query(..., description="Original file name; its extension picks the parser"),
+    documents: DocumentIngestor = Depends(get_documents),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    """Ingest a raw text/Markdown/PDF/DOCX body as overlapping chunks."""
+    body = bytearray()
+    async for data in request.stream():
+        body.extend(data)
+        if len(body) > MAX_DOCUMENT_BYTES:
+            raise HTTPException(status_code=413, detail=f"Documents are limited to {MAX_DOCUMENT_BYTES} bytes")
+    try:
+        row, data_ids, duplicate = await documents.ingest(filename, bytes(body))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except BrokenProcessPool as e:
+        raise HTTPException(status_code=500, detail=f"Extraction worker failed: {e}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if data_ids:
+        semantic.schedule_backfill()
+    return {"status": "success", "duplicate": duplicate, "document": _document(row)}
+
+@app.get("/documents")
+async def list_documents(
+    after_id: int = Query(0, ge=0, description="Return documents with id greater than this"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    db: AsyncSQLiteDB = Depends(get_db),
+):
+    rows = await db.read(SQLiteDB.list_documents, after_id, limit)
+    return {
+        "documents": [_document(row) for row in rows],
+        "next_after_id": rows[-1][0] if len(rows) == limit else None,
+    }
+
+@app.get("/documents/{document_id}")
+async def read_document(document_id: int, db: AsyncSQLiteDB = Depends(get_db)):
+    row = await db.read(SQLiteDB.read_document, document_id)
+    if row is None:
+        return {"error": "Not found"}
+    chunks = await db.read(SQLiteDB.document_chunks, document_id)
+    return {
+        "document": _document(row),
+        "chunks": [
+            {"id": chunk[0], "seq": chunk[1], "char_start": chunk[2], "char_end": chunk[3], "content": chunk[4]}
+            for chunk in chunks
+        ],
+    }
+
+@app.delete("/documents/{document_id}")
+async def delete_document(
+    document_id: int,
+    db: AsyncSQLiteDB = Depends(get_db),
+    semantic: SemanticIndex = Depends(get_semantic),
+):
+    data_ids = await db.write(SQLiteDB.delete_document, document_id)
+    if data_ids is None:
+        return {"error": "Not found"}
+    semantic.schedule_remove(data_ids)
+    return {"status": "success", "chunks_deleted": len(data_ids)}
+
+
+# --- Metrics ---
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def _require_profiler():
+    if not ENABLE_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler disabled (set MCP_ENABLE_PROFILER=1)")
+
+@app.post("/debug/profiler/start", include_in_schema=False)
+async def start_profiler(
+    interval_ms: float = Query(5.0, ge=0.5, le=1000, description="Sampling interval"),
+):
+    _require_profiler()
+    if not profiler.start(interval_ms / 1000):
+        return {"error": "Profiler already running"}
+    return {"status": "running", "interval_ms": interval_ms}
+
+@app.post("/debug/profiler/stop", include_in_schema=False)
+async def stop_profiler():
+    _require_profiler()
+    await asyncio.to_thread(profiler.stop)
+    return {"status": "stopped", "samples": profiler.samples}
+
+@app.get("/debug/profiler", include_in_schema=False)
+async def profiler_results(limit: Optional[int] = Query(None, ge=1, description="Most frequent stacks only")):
+    """Collapsed stacks sampled so far, for flamegraph.pl or speedscope."""
+    _require_profiler()
+    return PlainTextResponse(profiler.collapsed(limit))
@@ -0,0 +1,346 @@
+# Metrics module
+#
+# A small in-process metrics registry rendered in the Prometheus text
+# format, an ASGI middleware that times every request, and a sampling
+# profiler that can be switched on while the server runs. Has no
+# dependencies, so the agent can record into it as well.
+import collections
+import math
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self, *labels):
+        """(count, sum) for one label set; (0, 0.0) if never observed."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return (entry[2], entry[1]) if entry else (0, 0.0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((labels, (list(entry[0]), entry[1], entry[2])) for labels, entry in self._values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames, labels, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "mcp_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "mcp_http_request_duration_seconds", "Time to produce the full response.", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("mcp_http_requests_in_flight", "Requests currently being handled.")
+DB_QUERY_LATENCY = REGISTRY.histogram(
+    "mcp_db_query_duration_seconds",
+    "Time executing each SQLiteDB operation on a worker thread, by the SQL statements it ran.",
+    ("op", "statement"),
+)
+DB_QUEUE_WAIT = REGISTRY.histogram(
+    "mcp_db_queue_wait_seconds", "Time a database job waited for a free worker.", ("kind",)
+)
+DB_ERRORS = REGISTRY.counter("mcp_db_errors_total", "SQLiteDB operations that raised.", ("op",))
+OLLAMA_TTFT = REGISTRY.histogram(
+    "mcp_ollama_time_to_first_token_seconds", "Time from request to the first streamed token.", ("model",),
+    buckets=SLOW_BUCKETS,
+)
+OLLAMA_GENERATION = REGISTRY.histogram(
+    "mcp_ollama_generation_seconds", "Time from request to the end of the stream.", ("model",),
+    buckets=SLOW_BUCKETS,
+)
+OLLAMA_TOKEN_RATE = REGISTRY.histogram(
+    "mcp_ollama_tokens_per_second", "Decode throughput reported by Ollama.", ("model",), buckets=RATE_BUCKETS
+)
+OLLAMA_TOKENS = REGISTRY.counter("mcp_ollama_tokens_total", "Tokens generated.", ("model",))
+OLLAMA_GENERATIONS = REGISTRY.counter(
+    "mcp_ollama_generations_total", "Generations by outcome (ok, error, cached, blocked).", ("model", "outcome")
+)
+GUARDRAIL_VIOLATIONS = REGISTRY.counter(
+    "mcp_guardrail_violations_total", "Responses stopped by a guardrail rule.", ("rule",)
+)
+GENERATION_QUEUED = REGISTRY.gauge(
+    "mcp_generation_queue_depth", "Generations waiting for a free model slot.", ("model",)
+)
+GENERATION_RUNNING = REGISTRY.gauge("mcp_generation_running", "Generations streaming from Ollama.", ("model",))
+GENERATION_QUEUE_WAIT = REGISTRY.histogram(
+    "mcp_generation_queue_wait_seconds", "Time a generation waited for a model slot.", ("model", "priority"),
+    buckets=SLOW_BUCKETS,
+)
+GENERATION_REQUESTS = REGISTRY.counter(
+    "mcp_generation_requests_total",
+    "Scheduled generation requests by outcome (deduplicated, rejected, timeout, cancelled).",
+    ("model", "outcome"),
+)
+
+
+def observe_db_job(kind, op, statement, wait, duration, failed):
+    """AsyncSQLiteDB ``observe`` hook."""
+    DB_QUEUE_WAIT.observe(kind, value=wait)
+    DB_QUERY_LATENCY.observe(op, statement, value=duration)
+    if failed:
+        DB_ERRORS.inc(op)
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware timing each HTTP request.
+
+    Requests are labelled by route template (``/read_data/{data_id}``), not
+    the raw path, so label cardinality stays bounded. Streaming responses
+    are timed until their last body chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(method, route, value=time.perf_counter() - start)
+            HTTP_REQUESTS.inc(method, route, status)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval while running.
+
+    Results are collapsed stacks ("frame;frame;frame count"), the input
+    format of flamegraph.pl and speedscope. Sampling costs roughly one
+    ``sys._current_frames()`` call per interval and nothing while stopped.
+    """
+
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = collections.Counter()
+        self.samples = 0
+        self.interval = None
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.005):
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks.clear()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        thread = self._thread
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join()
+        self._thread = None
+        return True
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = traceback.extract_stack(frame, limit=self.max_depth)
+                key = ";".join(f"{entry.name} ({entry.filename.rsplit('/', 1)[-1]}:{entry.lineno})" for entry in stack)
+                with self._lock:
+                    self._stacks[key] += 1
+            with self._lock:
+                self.samples += 1
+
+    def collapsed(self, limit=None):
+        with self._lock:
+            items = self._stacks.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in items) + "\n"
+
+
+class _ExporterHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporter(port, host="127.0.0.1"):
+    """Serve REGISTRY on http://host:port/metrics from a daemon thread, for
+    processes without their own HTTP server (the Streamlit app)."""
+    server = ThreadingHTTPServer((host, port), _ExporterHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
@@ -0,0 +1,73 @@
+# Background recompression module
+import asyncio
+import time
+
+from db.compression import COMPRESSION, train_dictionary
+from db.sqlite_db import STREAM_CHUNK_SIZE, SQLiteDB
+
+# Pause between batches so foreground writes are never queued behind a
+# long run of recompression jobs.
+RECOMPRESS_PAUSE_S = 0.05
+
+
+class Recompressor:
+    """Brings stored rows in line with the compression setting.
+
+    On start, with compression on, it trains a dictionary from a sample of
+    rows if there is none yet, then walks the table in id order. Each batch
+    is re-encoded on a reader connection and written back in one short
+    write job that skips rows changed in the meantime, so writers only ever
+    wait for a single batch.
+    """
+
+    def __init__(self, db, compression=COMPRESSION, batch_size=STREAM_CHUNK_SIZE, pause=RECOMPRESS_PAUSE_S):
+        self.db = db
+        self.compression = compression
+        self.batch_size = batch_size
+        self.pause = pause
+        self.status = {
+            "state": "idle" if compression == "zstd" else "disabled",
+            "rows_written": 0,
+            "dictionary_id": None,
+        }
+        self._task = None
+
+    async def start(self):
+        if self.compression != "zstd":
+            return
+        self._task = asyncio.create_task(self._run(), name="recompression")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        started = time.perf_counter()
+        try:
+            self.status["state"] = "training"
+            self.status["dictionary_id"] = await self._ensure_dictionary()
+            self.status["state"] = "recompressing"
+            after_id = 0
+            while after_id is not None:
+                after_id, updates = await self.db.read(SQLiteDB.encode_page, after_id, self.batch_size)
+                if updates:
+                    self.status["rows_written"] += await self.db.write(SQLiteDB.store_encoded, updates)
+                await asyncio.sleep(self.pause)
+        except Exception as e:
+            print(f"recompression failed: {e}")
+            self.status["state"] = "error"
+            return
+        self.status["state"] = "done"
+        print(f"recompression: {self.status['rows_written']} rows rewritten in {time.perf_counter() - started:.1f}s")
+
+    async def _ensure_dictionary(self):
+        dict_id = await self.db.read(SQLiteDB.current_dictionary_id)
+        if dict_id:
+            return dict_id
+        samples = await self.db.read(SQLiteDB.dictionary_samples)
+        dictionary = await asyncio.to_thread(train_dictionary, samples)
+        if dictionary is None:
+            # Too little data yet; rows are compressed without a dictionary
+            return 0
+        return await self.db.write(SQLiteDB.add_dictionary, dictionary, len(samples))
@@ -0,0 +1,191 @@
+# Semantic search module
+#
+# numpy, requests and the vector index are imported on first use, so a
+# server running without an embedder (or before the index has warmed up)
+# does not pay for them at startup.
+import asyncio
+import os
+import re
+import zlib
+
+from db.sqlite_db import SQLiteDB
+
+OLLAMA_URL = os.environ.get("MCP_OLLAMA_URL", "http://localhost:11434").rstrip("/")
+EMBED_BATCH_SIZE = 64
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder (signed feature hashing).
+
+    Needs no model, so tests and benchmarks get stable vectors offline.
+    It only captures word overlap, not meaning.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                h = zlib.crc32(token.encode())
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vectors
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama embedding model."""
+
+    def __init__(self, model="nomic-embed-text", url=f"{OLLAMA_URL}/api/embed", timeout=60.0):
+        import requests
+
+        self.model = model
+        self.name = f"ollama:{model}"
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def embed(self, texts):
+        import numpy as np
+
+        resp = self.session.post(self.url, json={"model": self.model, "input": list(texts)}, timeout=self.timeout)
+        resp.raise_for_status()
+        return np.asarray(resp.json()["embeddings"], dtype=np.float32)
+
+
+def make_embedder():
+    """Embedder picked by MCP_EMBEDDER (ollama|hashing|none) and MCP_EMBEDDING_MODEL."""
+    kind = os.environ.get("MCP_EMBEDDER", "ollama")
+    if kind == "none":
+        return None
+    if kind == "hashing":
+        return HashingEmbedder(int(os.environ.get("MCP_EMBEDDING_DIM", 384)))
+    return OllamaEmbedder(os.environ.get("MCP_EMBEDDING_MODEL", "nomic-embed-text"))
+
+
+class SemanticIndex:
+    """Keeps a VectorIndex of the data table current as rows change.
+
+    Writes only enqueue work. A single background task embeds queued rows in
+    batches, stores the float32 vectors in the embeddings table and updates
+    the in-memory index, applying changes in the order they were made. On
+    start it loads stored vectors and embeds any rows that are missing one;
+    rows written meanwhile are queued and embedded once it has. ``state``
+    is "disabled" without an embedder, then "loading" until start() has
+    loaded the stored vectors, then "ready" ("error" if loading failed);
+    search needs "ready".
+    """
+
+    def __init__(self, db, embedder, batch_size=EMBED_BATCH_SIZE):
+        self.db = db
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.index = None
+        self.state = "disabled" if embedder is None else "loading"
+        self._queue = asyncio.Queue()
+        self._tasks = []
+
+    async def start(self):
+        if self.embedder is None:
+            return
+        import numpy as np
+
+        from db.vector_index import VectorIndex, decode_vector
+
+        self.index = VectorIndex()
+        after_id = 0
+        while True:
+            rows = await self.db.read(SQLiteDB.list_embeddings, self.embedder.name, after_id)
+            if not rows:
+                break
+            self.index.upsert([row[0] for row in rows], np.stack([decode_vector(row[1]) for row in rows]))
+            after_id = rows[-1][0]
+        self._tasks = [asyncio.create_task(self._worker())]
+        self.state = "ready"
+        self.schedule_backfill()
+
+    async def stop(self):
+        # Anything still queued is picked up by the backfill on next start.
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def schedule_upsert(self, rows):
+        """Queue (id, content) pairs to be (re-)embedded."""
+        if rows and self.embedder is not None:
+            self._queue.put_nowait(("upsert", list(rows)))
+
+    def schedule_remove(self, ids):
+        if ids and self.embedder is not None:
+            self._queue.put_nowait(("remove", list(ids)))
+
+    def schedule_backfill(self):
+        """Embed every row that has no vector yet, e.g. after a bulk import."""
+        if self.embedder is None:
+            return
+        if any(task.get_name() == "semantic-backfill" and not task.done() for task in self._tasks):
+            return
+        self._tasks = [task for task in self._tasks if not task.done()]
+        self._tasks.append(asyncio.create_task(self._backfill(), name="semantic-backfill"))
+
+    async def _backfill(self):
+        after_id = 0
+        while True:
+            rows = await self.db.read(SQLiteDB.missing_embeddings, self.embedder.name, after_id)
+            if not rows:
+                return
+            # Feed the worker a page at a time rather than queueing the
+            # whole table in memory.
+            while self._queue.qsize() > 1:
+                await asyncio.sleep(0.05)
+            self.schedule_upsert(rows)
+            after_id = rows[-1][0]
+
+    async def _worker(self):
+        pending = None
+        while True:
+            kind, items = pending or await self._queue.get()
+            pending = None
+            if kind == "remove":
+                self.index.remove(items)
+                continue
+            # Fold queued upserts into one embedding call, stopping at the
+            # first removal so changes still apply in order.
+            while len(items) < self.batch_size and not self._queue.empty():
+                job = self._queue.get_nowait()
+                if job[0] != "upsert":
+                    pending = job
+                    break
+                items.extend(job[1])
+            for start in range(0, len(items), self.batch_size):
+                await self._embed_and_store(items[start:start + self.batch_size])
+
+    async def _embed_and_store(self, rows):
+        from db.vector_index import encode_vector
+
+        ids = [row[0] for row in rows]
+        # A failure here must not end the worker, or indexing stops for good
+        try:
+            vectors = await asyncio.to_thread(self.embedder.embed, [row[1] for row in rows])
+            stored = await self.db.write(
+                SQLiteDB.store_embeddings,
+                self.embedder.name,
+                [(data_id, encode_vector(vector)) for data_id, vector in zip(ids, vectors)],
+            )
+            # Rows deleted while they were being embedded stay out of the index
+            if stored:
+                by_id = dict(zip(ids, vectors))
+                self.index.upsert(stored, [by_id[data_id] for data_id in stored])
+        except Exception as e:
+            print(f"semantic index: embedding {len(ids)} rows failed: {e}")
+
+    async def search(self, query, k=10):
+        if self.embedder is None:
+            raise RuntimeError("semantic search is disabled (MCP_EMBEDDER=none)")
+        if self.state != "ready":
+            raise RuntimeError(f"semantic index is not ready ({self.state})")
+        vector = (await asyncio.to_thread(self.embedder.embed, [query]))[0]
+        return self.index.search(vector, k)
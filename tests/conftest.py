@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The MCP server app on a fresh database, without semantic indexing."""
+    import server.mcp_server as mcp_server
+
+    monkeypatch.setattr(mcp_server, "DB_PATH", str(tmp_path / "mcp.db"))
+    monkeypatch.setenv("MCP_EMBEDDER", "none")
+    return mcp_server.app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def server_url(app):
+    """The app served over HTTP, for the requests-based LlamaAgent."""
+    from benchmarks.common import serve_app
+
+    with serve_app(app) as url:
+        yield url
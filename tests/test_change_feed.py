@@ -0,0 +1,82 @@
+from agent.data_mirror import DataMirror
+
+
+def add(client, content):
+    return client.post("/add_data", json={"content": content}).json()["id"]
+
+
+def test_changes_report_updates_and_deletes_once(client):
+    first, second, third = (add(client, f"row {i}") for i in range(3))
+    feed = client.get("/changes", params={"since": 0}).json()
+    assert [change["id"] for change in feed["changes"]] == [first, second, third]
+    assert feed["deleted"] == [] and not feed["more"] and not feed["reset"]
+    since = feed["version"]
+
+    client.put("/update_data", json={"id": first, "content": "row 0 edited"})
+    client.delete(f"/delete_data/{second}")
+    feed = client.get("/changes", params={"since": since}).json()
+    assert [(change["id"], change["content"]) for change in feed["changes"]] == [(first, "row 0 edited")]
+    assert feed["deleted"] == [second]
+
+    # Nothing new after the returned version
+    feed = client.get("/changes", params={"since": feed["version"]}).json()
+    assert feed["changes"] == [] and feed["deleted"] == []
+
+
+def test_changes_page_with_more(client):
+    for i in range(5):
+        add(client, f"row {i}")
+    mirror = DataMirror()
+    pages = 0
+    while True:
+        feed = client.get("/changes", params={"since": mirror.version, "limit": 2}).json()
+        mirror.apply(feed)
+        pages += 1
+        if not feed["more"]:
+            break
+    assert pages == 3
+    assert [row["content"] for row in mirror.page()["data"]] == [f"row {i}" for i in range(5)]
+
+
+def test_deleted_row_leaves_the_mirror(client):
+    kept, gone = add(client, "kept"), add(client, "gone")
+    mirror = DataMirror()
+    mirror.apply(client.get("/changes", params={"since": 0}).json())
+    client.delete(f"/delete_data/{gone}")
+    mirror.apply(client.get("/changes", params={"since": mirror.version}).json())
+    assert mirror.get(gone) is None and mirror.get(kept) == "kept"
+    assert len(mirror) == 1
+
+
+def test_since_from_another_database_resets(client):
+    add(client, "only row")
+    feed = client.get("/changes", params={"since": 10_000}).json()
+    assert feed["reset"] and feed["version"] == 0
+
+
+def test_list_data_etag(client):
+    add(client, "cached row")
+    resp = client.get("/list_data")
+    etag = resp.headers["ETag"]
+    assert etag.startswith('W/"')
+    resp = client.get("/list_data", headers={"If-None-Match": etag})
+    assert resp.status_code == 304 and resp.content == b""
+    assert client.get("/list_data", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get("/list_data", headers={"If-None-Match": "*"}).status_code == 304
+
+    add(client, "new row")
+    resp = client.get("/list_data", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+    assert len(resp.json()["data"]) == 2
+
+
+def test_read_data_etag_follows_the_row(client):
+    data_id, other = add(client, "one row"), add(client, "another row")
+    etag = client.get(f"/read_data/{data_id}").headers["ETag"]
+    assert client.get(f"/read_data/{data_id}", headers={"If-None-Match": etag}).status_code == 304
+    # Writing a different row leaves this row's tag valid
+    client.put("/update_data", json={"id": other, "content": "changed"})
+    assert client.get(f"/read_data/{data_id}", headers={"If-None-Match": etag}).status_code == 304
+    client.put("/update_data", json={"id": data_id, "content": "changed too"})
+    resp = client.get(f"/read_data/{data_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json() == {"content": "changed too"}
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from agent.guardrails import Guardrails, load_guardrails
+
+POLICY = {
+    "max_chars": 500,
+    "rules": [
+        {"name": "violence", "words": ["kill", "violence"], "match": "prefix"},
+        {"name": "exact", "words": ["bomb"], "match": "word"},
+        {"name": "ssn", "pattern": r"\d{3}-\d{2}-\d{4}", "max_length": 11, "case_sensitive": True},
+    ],
+}
+
+
+def scan(guardrails, chunks):
+    scanner = guardrails.scanner()
+    for chunk in chunks:
+        violation = scanner.feed(chunk)
+        if violation is not None:
+            return violation
+    return scanner.finish()
+
+
+def splits(text):
+    """Every way of cutting ``text`` into two chunks, plus one character at a time."""
+    yield from ([text[:i], text[i:]] for i in range(len(text) + 1))
+    yield list(text)
+
+
+@pytest.mark.parametrize("text, rule, match", [
+    ("they will kill it", "violence", "kill"),
+    # Prefix rules report the term itself
+    ("no more KILLING now", "violence", "KILL"),
+    ("a bomb went off", "exact", "bomb"),
+    ("number 123-45-6789 here", "ssn", "123-45-6789"),
+])
+def test_match_split_across_chunks(text, rule, match):
+    guardrails = Guardrails(POLICY)
+    for chunks in splits(text):
+        violation = scan(guardrails, chunks)
+        assert violation is not None, chunks
+        assert (violation["rule"], violation["match"]) == (rule, match), chunks
+        assert violation["offset"] == text.index(match)
+
+
+@pytest.mark.parametrize("text", ["a skill test", "bombs away", "bombastic", "12-45-6789x"])
+def test_near_misses_pass_at_every_split(text):
+    guardrails = Guardrails(POLICY)
+    for chunks in splits(text):
+        assert scan(guardrails, chunks) is None, chunks
+
+
+def test_whole_word_waits_for_the_next_chunk():
+    scanner = Guardrails(POLICY).scanner()
+    # "bomb" could still become "bombs"
+    assert scanner.feed("the bomb") is None
+    assert scanner.feed("s are fake") is None
+    assert scanner.finish() is None
+    scanner = Guardrails(POLICY).scanner()
+    assert scanner.feed("the bomb") is None
+    assert scanner.finish()["match"] == "bomb"
+
+
+def test_random_chunking_matches_whole_text_check():
+    guardrails = Guardrails(POLICY)
+    rng = random.Random(7)
+    words = ["fine", "skill", "kill", "bomb", "bombs", "text", "123-45-6789", "x" * 30]
+    for _ in range(200):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        expected = guardrails.check(text)
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text), rng.randint(0, 6))))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert scan(guardrails, chunks) == expected, chunks
+
+
+def test_max_chars():
+    violation = scan(Guardrails(POLICY), ["x" * 300, "y" * 300])
+    assert (violation["rule"], violation["offset"]) == ("max_chars", 500)
+
+
+def test_bundled_policy_loads():
+    assert load_guardrails().check("this is fine") is None
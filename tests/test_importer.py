@@ -0,0 +1,92 @@
+import pytest
+
+from db import importer
+from db.importer import ImportJob, import_file, source_key
+from db.sqlite_db import SQLiteDB
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_csv(path, count):
+    lines = ["id,content"] + [f'{i},"row {i}, with a comma"' for i in range(count)]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def stop_after(chunks):
+    seen = []
+
+    def progress(stats, done, total):
+        seen.append(done)
+        if len(seen) == chunks:
+            raise Interrupted
+    return progress
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Small reads so a test file spans several committed chunks
+    monkeypatch.setattr(importer, "READ_BLOCK_SIZE", 256)
+    db = SQLiteDB(str(tmp_path / "import.db"), compression="none")
+    yield db
+    db.close()
+
+
+def contents(db):
+    return [row[1] for row in db.list_data(after_id=0, limit=1000)]
+
+
+def test_interrupted_import_resumes_from_checkpoint(tmp_path, db):
+    path = tmp_path / "rows.csv"
+    write_csv(path, 100)
+    with pytest.raises(Interrupted):
+        import_file(db, str(path), chunk_rows=30, progress=stop_after(2))
+    source = source_key(str(path.resolve()), path.stat().st_size)
+    offset, header, read, inserted, duplicates, invalid = db.import_checkpoint(source)
+    assert 0 < offset < path.stat().st_size and header is not None
+    assert read == inserted == len(contents(db)) < 100
+
+    result = import_file(db, str(path), chunk_rows=30)
+    assert result["resumed_from"] == offset
+    # Totals include the interrupted run; the header came from the checkpoint
+    assert (result["read"], result["inserted"], result["duplicates"]) == (100, 100, 0)
+    assert contents(db) == [f"row {i}, with a comma" for i in range(100)]
+    assert db.import_checkpoint(source) is None
+
+
+def test_restart_without_resume_skips_duplicates(tmp_path, db):
+    path = tmp_path / "rows.jsonl"
+    path.write_text("".join(f'{{"content": "line {i}"}}\n' for i in range(50)))
+    with pytest.raises(Interrupted):
+        import_file(db, str(path), chunk_rows=20, progress=stop_after(1))
+    done = len(contents(db))
+    result = import_file(db, str(path), chunk_rows=20, resume=False)
+    assert result["resumed_from"] == 0
+    assert (result["inserted"], result["duplicates"]) == (50 - done, done)
+    assert len(contents(db)) == 50
+
+
+def test_import_endpoint_resumes_at_the_saved_offset(client, tmp_path):
+    body = "".join(f"text row {i}\n" for i in range(40)).encode()
+    # An earlier upload of "rows.txt" stopped partway through row 25
+    db = SQLiteDB(str(tmp_path / "mcp.db"))
+    job = ImportJob("text", "rows.txt")
+    job.feed(body[:body.index(b"text row 25") + 4])
+    job.committed(db.import_rows(*job.take()))
+    db.close()
+
+    checkpoint = client.get("/import/checkpoint", params={"source": "rows.txt"}).json()
+    offset = checkpoint["offset"]
+    assert offset == body.index(b"text row 25")
+    assert (checkpoint["read"], checkpoint["inserted"]) == (25, 25)
+
+    params = {"format": "text", "source": "rows.txt"}
+    conflict = client.post("/import", params={**params, "offset": 0}, content=body)
+    assert conflict.status_code == 409 and conflict.json()["offset"] == offset
+    resumed = client.post("/import", params={**params, "offset": offset}, content=body[offset:])
+    assert resumed.status_code == 200
+    assert (resumed.json()["read"], resumed.json()["inserted"], resumed.json()["resumed_from"]) == (40, 40, offset)
+    rows = client.get("/list_data", params={"limit": 100}).json()["data"]
+    assert [row["content"] for row in rows] == [f"text row {i}" for i in range(40)]
+    assert client.get("/import/checkpoint", params={"source": "rows.txt"}).json()["offset"] == 0
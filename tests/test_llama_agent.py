@@ -0,0 +1,26 @@
+from agent.llama_agent import LlamaAgent
+
+
+class CountingAgent(LlamaAgent):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statuses = []
+        self.session.hooks["response"].append(lambda resp, *args, **kwargs: self.statuses.append(resp.status_code))
+
+
+def test_list_page_revalidates_with_etag(server_url):
+    agent = CountingAgent(server_url=server_url)
+    agent.add_many([f"row {i}" for i in range(5)])
+    agent.statuses.clear()
+
+    first = agent.list_page(limit=2)
+    assert [row["content"] for row in first["data"]] == ["row 0", "row 1"]
+    assert agent.list_page(limit=2) == first
+    second = agent.list_page(after_id=first["next_after_id"], limit=2)
+    assert [row["content"] for row in second["data"]] == ["row 2", "row 3"]
+    assert agent.statuses == [200, 304, 200]
+
+    # Any write changes the table's version, so cached pages are refetched
+    agent.update_data(1, "row 0 edited")
+    assert agent.list_page(limit=2)["data"][0]["content"] == "row 0 edited"
+    assert agent.statuses[-1] == 200
@@ -0,0 +1,9 @@
+def test_db_latency_is_labelled_by_statement(client):
+    client.post("/add_data", json={"content": "metrics -- row"})
+    assert client.get("/search_data", params={"q": "metrics"}).status_code == 200
+    # No word characters, so no FTS expression: the LIKE fallback runs
+    assert client.get("/search_data", params={"q": "--"}).status_code == 200
+    text = client.get("/metrics").text
+    assert 'mcp_db_query_duration_seconds_count{op="search_data",statement="SEARCH_DATA_FTS"}' in text
+    assert 'mcp_db_query_duration_seconds_count{op="search_data",statement="SEARCH_DATA_LIKE"}' in text
+    assert 'op="add_data",statement="INSERT_DATA"' in text
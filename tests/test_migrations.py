@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+from db.sqlite_db import MIGRATIONS, SQLiteDB, _use_compressed_schema, migrate
+
+
+def bare(path):
+    # What the sqlite3 CLI or a backup script sees: no app functions
+    return sqlite3.connect(path)
+
+
+def plain_client_writes(path):
+    conn = bare(path)
+    with conn:
+        data_id = conn.execute("INSERT INTO data (content) VALUES ('written elsewhere')").lastrowid
+        conn.execute("UPDATE data SET content = 'edited elsewhere' WHERE id = ?", (data_id,))
+    row = conn.execute("SELECT content FROM data_text WHERE id = ?", (data_id,)).fetchone()
+    with conn:
+        conn.execute("DELETE FROM data WHERE id = ?", (data_id,))
+    conn.close()
+    return row[0]
+
+
+def test_fresh_database_is_fully_migrated(tmp_path):
+    db = SQLiteDB(str(tmp_path / "fresh.db"), compression="none")
+    assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    data_id = db.add_data("hello migrations")
+    assert db.read_data(data_id) == ("hello migrations", db.current_version())
+    db.close()
+
+
+def test_uncompressed_database_accepts_plain_sqlite_writes(tmp_path):
+    path = str(tmp_path / "plain.db")
+    db = SQLiteDB(path, compression="none")
+    db.add_data("stored by the app")
+    db.close()
+    assert plain_client_writes(path) == "edited elsewhere"
+    db = SQLiteDB(path, compression="none")
+    # The FTS index followed the outside writes
+    assert [row[1] for row in db.search_data("elsewhere")] == []
+    assert [row[1] for row in db.search_data("stored")] == ["stored by the app"]
+    db.close()
+
+
+def test_earlier_compressed_schema_reverts_while_nothing_is_compressed(tmp_path):
+    path = str(tmp_path / "v7.db")
+    conn = sqlite3.connect(path)
+    migrate(conn, MIGRATIONS[:-1])
+    with conn:
+        conn.execute("INSERT INTO data (content, content_hash) VALUES ('kept', x'00')")
+    # As the compression migration used to leave every database
+    conn.create_function("decompress_content", 1, lambda value: value)
+    with conn:
+        _use_compressed_schema(conn)
+    conn.close()
+
+    db = SQLiteDB(path, compression="none")
+    assert [row[1] for row in db.search_data("kept")] == ["kept"]
+    db.close()
+    assert plain_client_writes(path) == "edited elsewhere"
+
+
+def test_upgrade_keeps_rows_and_search(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    migrate(conn, MIGRATIONS[:3])
+    with conn:
+        conn.executemany("INSERT INTO data (content) VALUES (?)", [("alpha row",), ("beta row",)])
+    conn.close()
+
+    db = SQLiteDB(path, compression="none")
+    assert db.list_data(after_id=0, limit=10) == [(1, "alpha row"), (2, "beta row")]
+    assert [row[0] for row in db.search_data("beta")] == [2]
+    # Existing rows count as changed in id order
+    assert db.current_version() == 2
+    db.close()
+
+
+def test_enabling_compression_switches_the_schema(tmp_path):
+    pytest.importorskip("zstandard")
+    path = str(tmp_path / "zstd.db")
+    db = SQLiteDB(path, compression="zstd")
+    data_id = db.add_data("compressible text " * 20)
+    assert isinstance(db.conn.execute("SELECT content FROM data WHERE id = ?", (data_id,)).fetchone()[0], bytes)
+    assert db.read_data(data_id)[0] == "compressible text " * 20
+    assert [row[0] for row in db.search_data("compressible")] == [data_id]
+    db.close()
+    # The switch is one-way: the data table now needs the app's function
+    with pytest.raises(sqlite3.OperationalError, match="decompress_content"):
+        plain_client_writes(path)
+    db = SQLiteDB(path, compression="none")
+    assert db.read_data(data_id)[0] == "compressible text " * 20
+    db.close()
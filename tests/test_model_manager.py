@@ -0,0 +1,55 @@
+import time
+
+from agent.model_manager import ModelManager, keep_alive_seconds
+
+GB = 1024 ** 3
+
+
+def manager(resident, **kwargs):
+    m = ModelManager(**kwargs)
+    m.resident = lambda: resident
+    m.sent = []
+    m._send = lambda model, keep_alive: m.sent.append((model, keep_alive))
+    return m
+
+
+def test_keep_alive_seconds():
+    assert keep_alive_seconds("30m") == 1800
+    assert keep_alive_seconds("1h30m") == 5400
+    assert keep_alive_seconds(300) == 300
+    assert keep_alive_seconds("-1") is None
+
+
+def test_keep_alive_only_refreshed_within_window():
+    m = manager({"recent": {"size": GB}, "stale": {"size": GB}}, keep_alive="30m", idle_unload_s=0)
+    now = time.time()
+    m._last_used = {"recent": now - 60, "stale": now - 3600}
+    assert m.maintain() == []
+    assert [model for model, _ in m.sent] == ["recent"]
+    # Topped up to keep_alive after the last use, not from now
+    assert 1730 <= m.sent[0][1] <= 1741
+
+
+def test_memory_budget_leaves_other_clients_models():
+    resident = {name: {"size": 2 * GB} for name in ("a", "b", "c")}
+    resident["other"] = {"size": 3 * GB}
+    m = manager(resident, memory_budget=5 * GB, idle_unload_s=0)
+    now = time.time()
+    m._last_used = {"a": now, "b": now - 10, "c": now - 20}
+    m.unload = lambda model: True
+    assert m.maintain() == ["c", "b"]
+
+
+def test_failed_load_is_not_retried_on_every_use():
+    m = manager({})
+    loads = []
+
+    def load(model):
+        loads.append(model)
+        m._set_state(model, "error", error="connection refused")
+
+    m.load = load
+    for _ in range(3):
+        m.use("missing")
+        time.sleep(0.05)
+    assert loads == ["missing"]
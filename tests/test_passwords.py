@@ -0,0 +1,32 @@
+import threading
+
+from auth.passwords import PasswordHasher
+from auth.user_store import UserStore
+
+
+def test_rehash_does_not_overwrite_a_password_reset(tmp_path):
+    users = UserStore(str(tmp_path / "users.db"))
+    old = PasswordHasher(rounds=4)
+    old_hash = old.hash_password("secret")
+    users.create_user("ann", old_hash)
+
+    hasher = PasswordHasher(rounds=5)
+    assert hasher.verify_password("secret", old_hash) and hasher.needs_rehash(old_hash)
+    # A reset lands between the login's verify and the rehash write
+    reset_hash = hasher.hash_password("new secret")
+    users.set_password("ann", reset_hash)
+    done = threading.Event()
+    hasher.rehash_async("secret", lambda new_hash: (users.replace_password("ann", old_hash, new_hash), done.set()))
+    assert done.wait(10)
+    assert users.get_user("ann")[0] == reset_hash
+
+    # Without a reset the upgraded hash is stored
+    users.set_password("ann", old_hash)
+    done.clear()
+    hasher.rehash_async("secret", lambda new_hash: (users.replace_password("ann", old_hash, new_hash), done.set()))
+    assert done.wait(10)
+    upgraded = users.get_user("ann")[0]
+    assert not hasher.needs_rehash(upgraded) and hasher.verify_password("secret", upgraded)
+    hasher.close()
+    old.close()
+    users.close()
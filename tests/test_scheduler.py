@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from agent.scheduler import (
+    PRIORITY_ADMIN, PRIORITY_BATCH, CancelToken, GenerationCancelled, GenerationScheduler, QueueFull,
+)
+
+
+class Upstream:
+    """A fake generation that yields its chunks once ``release`` is set."""
+
+    def __init__(self, chunks=("a", "b", "c")):
+        self.chunks = chunks
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.aborted = threading.Event()
+
+    def __call__(self, stats, cancel):
+        self.calls += 1
+        cancel.on_cancel(self.aborted.set)
+        self.started.set()
+        self.release.wait(5)
+        yield from self.chunks
+
+
+def consume(scheduler, key, start, results, **kwargs):
+    stats = {}
+    try:
+        results[key, len(results)] = (list(scheduler.stream(key, "m", start, stats=stats, **kwargs)), stats)
+    except Exception as e:
+        results[key, len(results)] = (e, stats)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run(*targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_identical_requests_share_one_generation():
+    scheduler = GenerationScheduler(concurrency=1)
+    upstream = Upstream()
+    first, second = {}, {}
+    threads = run(lambda: consume(scheduler, "k", upstream, first))
+    assert upstream.started.wait(5)
+    threads += run(lambda: consume(scheduler, "k", upstream, second))
+    wait_until(lambda: scheduler.stats()["m"].get("deduplicated") == 1)
+    upstream.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert upstream.calls == 1
+    (chunks, stats), = first.values()
+    (joined_chunks, joined_stats), = second.values()
+    assert chunks == joined_chunks == ["a", "b", "c"]
+    assert (stats["deduplicated"], joined_stats["deduplicated"]) == (False, True)
+
+
+def test_cancel_aborts_upstream_only_when_no_caller_is_left():
+    scheduler = GenerationScheduler(concurrency=1)
+    upstream = Upstream()
+    cancels = [CancelToken(), CancelToken()]
+    results = {}
+    threads = run(*(lambda c=c: consume(scheduler, "k", upstream, results, cancel=c) for c in cancels))
+    assert upstream.started.wait(5)
+    wait_until(lambda: scheduler.stats()["m"].get("deduplicated") == 1)
+    cancels[0].cancel()
+    threads[0].join(5)
+    assert not upstream.aborted.is_set()
+    cancels[1].cancel()
+    assert upstream.aborted.wait(5)
+    upstream.release.set()
+    threads[1].join(5)
+    assert all(isinstance(error, GenerationCancelled) for error, _ in results.values())
+
+
+def test_queue_starts_by_priority_and_rejects_when_full():
+    scheduler = GenerationScheduler(concurrency=1, queue_limit=2)
+    order = []
+
+    def start(name):
+        def generate(stats, cancel):
+            order.append(name)
+            yield name
+        return generate
+
+    blocker = Upstream()
+    results = {}
+    threads = run(lambda: consume(scheduler, "blocker", blocker, results))
+    assert blocker.started.wait(5)
+    threads += run(lambda: consume(scheduler, "batch", start("batch"), results, priority=PRIORITY_BATCH))
+    wait_until(lambda: scheduler.stats()["m"]["queued"] == 1)
+    threads += run(lambda: consume(scheduler, "admin", start("admin"), results, priority=PRIORITY_ADMIN))
+    wait_until(lambda: scheduler.stats()["m"]["queued"] == 2)
+    with pytest.raises(QueueFull):
+        list(scheduler.stream("extra", "m", start("extra")))
+    blocker.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["admin", "batch"]
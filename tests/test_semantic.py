@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from db.async_sqlite_db import AsyncSQLiteDB
+from server.semantic import HashingEmbedder, SemanticIndex
+
+np = pytest.importorskip("numpy")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def with_index(tmp_path, body, embedder=None):
+    db = AsyncSQLiteDB(str(tmp_path / "semantic.db"), readers=1)
+    index = SemanticIndex(db, embedder or HashingEmbedder())
+    await index.start()
+    try:
+        return await body(db, index)
+    finally:
+        await index.stop()
+        await asyncio.to_thread(db.close)
+
+
+def test_rows_deleted_while_embedding_stay_out_of_the_index(tmp_path):
+    async def body(db, index):
+        kept = await db.add_data("kept row")
+        gone = await db.add_data("deleted row")
+        await db.delete_data(gone)
+        # Embedded after the delete, as when the delete lands mid-batch
+        await index._embed_and_store([(kept, "kept row"), (gone, "deleted row")])
+        return [data_id for data_id, _ in await index.search("row", k=10)]
+
+    ids = run(with_index(tmp_path, body))
+    assert ids == [1]
+
+
+def test_index_errors_do_not_stop_the_worker(tmp_path):
+    class Resized(HashingEmbedder):
+        # The embedder changed dimension since the index was loaded
+        def embed(self, texts):
+            return np.ones((len(texts), self.dim + 1), dtype=np.float32)
+
+    async def body(db, index):
+        await index._embed_and_store([(await db.add_data("first"), "first")])
+        index.embedder = Resized()
+        await index._embed_and_store([(await db.add_data("second"), "second")])
+        return len(index.index)
+
+    assert run(with_index(tmp_path, body)) == 1